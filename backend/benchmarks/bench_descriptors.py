@@ -0,0 +1,80 @@
+"""
+Descriptor Benchmarks for QSAR/QSPR/QSTR Featurization
+Per-group and end-to-end timings over the reference molecule sets
+"""
+
+from typing import Dict, List, Optional
+
+from rdkit import Chem
+
+from qsar_core.enhanced_descriptors import EnhancedDescriptors
+from qsar_core.molecule_context import MoleculeContext
+
+from .timing import summarize, time_calls, time_once
+
+DESCRIPTOR_GROUPS = {
+    '2d': '_calculate_2d_descriptors',
+    '3d': '_calculate_3d_descriptors',
+    'fingerprint': '_calculate_fingerprints',
+    'fragment': '_calculate_fragment_descriptors',
+    'estate': '_calculate_estate_descriptors'
+}
+
+def benchmark_descriptor_groups(smiles_list: List[str], include_3d: bool = True,
+                                calculator: Optional[EnhancedDescriptors] = None) -> Dict[str, Dict[str, float]]:
+    """Time each descriptor group per molecule on the valid molecules of a set"""
+    calculator = calculator or EnhancedDescriptors()
+    mols = [mol for mol in (Chem.MolFromSmiles(smiles) for smiles in smiles_list) if mol is not None]
+    
+    results = {}
+    for group, method_name in DESCRIPTOR_GROUPS.items():
+        if group == '3d' and not include_3d:
+            continue
+        
+        method = getattr(calculator, method_name)
+        failures = []
+        
+        # Group methods raise on molecules calculate_descriptors would reject.
+        # A fresh context per call keeps memoized state from other groups out of the timing.
+        def guarded(mol: Chem.Mol) -> None:
+            try:
+                method(MoleculeContext(mol))
+            except Exception:
+                failures.append(mol)
+        
+        results[group] = summarize(time_calls(guarded, mols))
+        results[group]['errors'] = len(failures)
+    
+    return results
+
+def benchmark_descriptor_batch(smiles_list: List[str], include_3d: bool = True,
+                               n_jobs: int = 1) -> Dict[str, float]:
+    """Time ``calculate_batch`` end to end, including invalid SMILES handling"""
+    calculator = EnhancedDescriptors()
+    errors = []
+    
+    def run() -> None:
+        _, batch_errors = calculator.calculate_batch(smiles_list, include_3d=include_3d, n_jobs=n_jobs)
+        errors.extend(error for error in batch_errors if error is not None)
+    
+    result = time_once(run, items=len(smiles_list))
+    result['errors'] = len(errors)
+    return result
+
+def benchmark_fingerprint_matrix(smiles_list: List[str], fp_type: str = 'morgan',
+                                 n_bits: int = 2048) -> Dict[str, float]:
+    """Time packed fingerprint matrix generation"""
+    calculator = EnhancedDescriptors()
+    return time_once(lambda: calculator.calculate_fingerprint_matrix(smiles_list, fp_type, n_bits),
+                     items=len(smiles_list))
+
+def run_descriptor_benchmarks(reference_sets: Dict[str, List[str]], include_3d: bool = True,
+                              n_jobs: int = 1) -> Dict[str, Dict[str, float]]:
+    """Run all descriptor benchmarks, keyed ``descriptors/<set>/<group>``"""
+    results = {}
+    for set_name, smiles_list in reference_sets.items():
+        for group, result in benchmark_descriptor_groups(smiles_list, include_3d).items():
+            results[f'descriptors/{set_name}/{group}'] = result
+        results[f'descriptors/{set_name}/batch'] = benchmark_descriptor_batch(smiles_list, include_3d, n_jobs)
+        results[f'descriptors/{set_name}/fingerprint_matrix'] = benchmark_fingerprint_matrix(smiles_list)
+    return results
@@ -0,0 +1,74 @@
+"""
+Modeling Benchmarks for QSAR/QSPR/QSTR Models
+Per-stage timings of EnhancedQSARModel on a fixed synthetic dataset
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+from sklearn.model_selection import cross_val_score
+
+from qsar_core.enhanced_modeling import EnhancedQSARModel
+
+from .timing import summarize, time_calls, time_once
+
+def make_dataset(n_samples: int = 2000, n_features: int = 200, task_type: str = 'regression',
+                 random_state: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Build a reproducible descriptor-like dataset with a few informative features"""
+    rng = np.random.default_rng(random_state)
+    X = rng.normal(size=(n_samples, n_features)) * rng.uniform(0.1, 100, size=n_features)
+    informative = X[:, :10] / X[:, :10].std(axis=0)
+    y = informative @ rng.normal(size=10) + rng.normal(scale=0.5, size=n_samples)
+    if task_type == 'classification':
+        y = (y > np.median(y)).astype(int)
+    return X, y
+
+def run_modeling_benchmarks(model_type: str = 'random_forest', task_type: str = 'regression',
+                            n_samples: int = 2000, n_features: int = 200, cv: int = 3,
+                            tuning_method: str = 'halving', n_jobs: int = 1,
+                            predict_rows: int = 200) -> Dict[str, Dict[str, float]]:
+    """Time each training stage, then batch and single-row prediction
+    
+    Stages run in the order ``train`` uses them, keyed ``modeling/<model>/<stage>``.
+    """
+    X, y = make_dataset(n_samples, n_features, task_type)
+    model = EnhancedQSARModel(model_type, task_type)
+    prefix = f'modeling/{model_type}'
+    results = {}
+    state = {}
+    
+    def prepare() -> None:
+        state['split'] = model.prepare_data(X, y)
+    
+    results[f'{prefix}/prepare'] = time_once(prepare, items=n_samples)
+    X_train, X_test, y_train, y_test = state['split']
+    
+    def select() -> None:
+        state['X_selected'] = model.feature_selection(X_train, y_train, k=min(50, n_features))
+    
+    results[f'{prefix}/select'] = time_once(select, items=len(y_train))
+    X_selected = state['X_selected']
+    
+    results[f'{prefix}/tune'] = time_once(
+        lambda: model.hyperparameter_tuning(X_selected, y_train, method=tuning_method, cv=cv, n_jobs=n_jobs),
+        items=len(y_train))
+    
+    model.model = model.create_model(**model.best_params)
+    results[f'{prefix}/cv'] = time_once(
+        lambda: cross_val_score(model.model, X_selected, y_train, cv=cv, scoring=model._get_scoring(),
+                                n_jobs=n_jobs),
+        items=len(y_train))
+    
+    results[f'{prefix}/fit'] = time_once(lambda: model.model.fit(X_selected, y_train), items=len(y_train))
+    
+    X_raw = X[:predict_rows]
+    results[f'{prefix}/predict_batch'] = time_once(lambda: model.predict(X_raw), items=len(X_raw))
+    results[f'{prefix}/predict_single'] = summarize(time_calls(model.predict, [row[None, :] for row in X_raw]))
+    
+    if model_type == 'random_forest':
+        compiled = model.compile()
+        results[f'{prefix}/predict_compiled_batch'] = time_once(lambda: compiled.predict(X_raw), items=len(X_raw))
+        results[f'{prefix}/predict_compiled_single'] = summarize(
+            time_calls(compiled.predict, [row[None, :] for row in X_raw]))
+    
+    return results
@@ -0,0 +1,86 @@
+"""
+Reference Molecule Sets for QSAR/QSPR/QSTR Benchmarks
+Fixed SMILES lists so timings are comparable between commits
+"""
+
+from typing import Dict, List
+
+# Small drug-like molecules (MW roughly 100-500)
+SMALL_DRUG_LIKE = [
+    'CC(=O)Oc1ccccc1C(=O)O',  # aspirin
+    'CN1C=NC2=C1C(=O)N(C(=O)N2C)C',  # caffeine
+    'CC(C)Cc1ccc(cc1)C(C)C(=O)O',  # ibuprofen
+    'CC(=O)Nc1ccc(O)cc1',  # paracetamol
+    'COc1ccc2cc(ccc2c1)C(C)C(=O)O',  # naproxen
+    'OC(=O)Cc1ccccc1Nc1c(Cl)cccc1Cl',  # diclofenac
+    'CN(C)C(=N)NC(=N)N',  # metformin
+    'CNCCC(Oc1ccc(cc1)C(F)(F)F)c1ccccc1',  # fluoxetine
+    'CN1CCC[C@H]1c1cccnc1',  # nicotine
+    'NCCc1ccc(O)c(O)c1',  # dopamine
+    'CC(C)NCC(O)COc1cccc2ccccc12',  # propranolol
+    'Clc1ccc2c(c1)C(=NCC(=O)N2C)c1ccccc1',  # diazepam
+    'CCOC(=O)C1=C(C)NC(C)=C(C1c1ccccc1[N+](=O)[O-])C(=O)OC',  # nitrendipine-like
+    'O=C(O)c1ccccc1O',  # salicylic acid
+    'Cc1ccc(cc1)S(=O)(=O)N',  # toluenesulfonamide
+    'CC12CCC3C(CCC4=CC(=O)CCC34C)C1CCC2O',  # testosterone
+    'CN1CCN(CC1)c1ccc2nc(C)c(C(=O)O)c(=O)n2c1',  # quinolone-like
+    'O=C1NC(=O)C(N1)(c1ccccc1)c1ccccc1',  # phenytoin
+    'CC(C)(C)NCC(O)c1ccc(O)c(CO)c1',  # salbutamol
+    'Nc1ccc(cc1)S(=O)(=O)Nc1ccccn1',  # sulfapyridine
+    'OC(=O)c1cccnc1',  # nicotinic acid
+    'CCN(CC)CC(=O)Nc1c(C)cccc1C',  # lidocaine
+    'COc1ccc(CCN)cc1OC',  # 3,4-dimethoxyphenethylamine
+    'Cn1cnc2c1c(=O)[nH]c(=O)n2C',  # theophylline-like
+    'O=C(O)CCc1ccccc1',  # hydrocinnamic acid
+    'c1ccc2c(c1)[nH]c1ccccc12',  # carbazole
+    'OCC1OC(O)C(O)C(O)C1O',  # glucose
+    'CC(N)Cc1ccccc1',  # amphetamine
+    'Fc1ccc(cc1)C(=O)CCCN1CCC(O)(CC1)c1ccc(Cl)cc1',  # haloperidol
+    'CS(=O)(=O)c1ccc(cc1)C1=C(C(=O)OC1)c1ccccc1',  # rofecoxib
+]
+
+# Large or flexible molecules (many rotatable bonds, macrocycles, peptides)
+LARGE_FLEXIBLE = [
+    'CC[C@H]1OC(=O)[C@H](C)[C@@H](O[C@H]2C[C@@](C)(OC)[C@@H](O)[C@H](C)O2)[C@H](C)[C@@H](O[C@@H]2O[C@H](C)C[C@H](N(C)C)[C@H]2O)[C@](C)(O)C[C@@H](C)C(=O)[C@H](C)[C@@H](O)[C@]1(C)O',  # erythromycin
+    'CC(C)C[C@H](NC(=O)[C@@H](Cc1ccccc1)NC(=O)[C@H](CCCNC(N)=N)NC(=O)[C@@H](N)CC(C)C)C(=O)N[C@@H](CO)C(=O)O',  # pentapeptide
+    'CCCCCCCCCCCCCCCCCC(=O)OCC(COC(=O)CCCCCCCCCCCCCCCCC)OC(=O)CCCCCCCCCCCCCCCCC',  # tristearin
+    'COCCOCCOCCOCCOCCOCCOCCOCCOCCOCCOC',  # PEG oligomer
+    'CC(C)CCCC(C)C1CCC2C1(CCCC2=CC=C1CC(O)CCC1=C)C',  # vitamin D3-like
+    'O=C(N[C@@H](Cc1ccccc1)C(=O)N[C@@H](Cc1ccccc1)C(=O)N[C@@H](Cc1ccccc1)C(=O)O)[C@@H](N)Cc1ccccc1',  # tetra-Phe
+    'CCCCCCCCCCCCCCCCCCCCCCCCCCCCCC',  # triacontane
+    'OC[C@H]1O[C@@H](O[C@H]2[C@H](O)[C@@H](O)[C@H](O[C@H]3[C@H](O)[C@@H](O)[C@H](O)O[C@@H]3CO)O[C@@H]2CO)[C@H](O)[C@@H](O)[C@@H]1O',  # maltotriose
+    'CC1=C(C(=O)CC1(C)C)/C=C/C(C)=C/C=C/C(C)=C/C=C/C=C(C)/C=C/C=C(C)/C=C/C1=C(C)CCCC1(C)C',  # carotenoid
+    'C1CCCCCCCCCCCCCCCCCCCCC1',  # cyclodocosane
+]
+
+# Valid molecules mixed with malformed SMILES, to time the error paths
+INVALID_MIX = [
+    'CCO',
+    'C1CC',  # unclosed ring
+    'c1ccccc1',
+    'c1cccc1',  # non-kekulizable aromatic ring
+    'CC(=O)O',
+    '[Na+',  # unterminated bracket atom
+    'C(C)(C)(C)(C)C',  # pentavalent carbon
+    'not_a_smiles',
+    'CN1C=NC2=C1C(=O)N(C(=O)N2C)C',
+    '',  # empty molecule
+    'C=1CC',  # dangling ring bond
+    'OC(=O)c1cccnc1',
+]
+
+REFERENCE_SETS = {
+    'small_drug_like': SMALL_DRUG_LIKE,
+    'large_flexible': LARGE_FLEXIBLE,
+    'invalid_mix': INVALID_MIX
+}
+
+def get_reference_set(name: str, repeat: int = 1) -> List[str]:
+    """Get a reference SMILES set, optionally repeated to lengthen the run"""
+    if name not in REFERENCE_SETS:
+        raise ValueError(f"Unknown reference set: {name}. Use one of {list(REFERENCE_SETS)}")
+    return REFERENCE_SETS[name] * repeat
+
+def get_reference_sets(repeat: int = 1) -> Dict[str, List[str]]:
+    """Get all reference SMILES sets"""
+    return {name: get_reference_set(name, repeat) for name in REFERENCE_SETS}
@@ -0,0 +1,134 @@
+"""
+Benchmark Runner for QSAR/QSPR/QSTR Hot Paths
+Writes machine-readable JSON results and compares two result files
+
+Run from the ``backend`` directory::
+    
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --compare baseline.json results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import sklearn
+from rdkit import rdBase
+
+from .bench_descriptors import run_descriptor_benchmarks
+from .bench_modeling import run_modeling_benchmarks
+from .reference_molecules import get_reference_sets
+
+# Relative change beyond which a metric counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+# Metrics compared between runs, and whether higher values are better
+COMPARED_METRICS = {
+    'items_per_second': True,
+    'p50_ms': False,
+    'p99_ms': False,
+    'peak_rss_mb': False
+}
+
+def get_git_commit() -> Optional[str]:
+    """Get the current git commit, if available"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(include_3d: bool = True, repeat: int = 1, n_jobs: int = 1,
+        model_types: Optional[List[str]] = None, skip_descriptors: bool = False,
+        skip_modeling: bool = False) -> Dict[str, Any]:
+    """Run the benchmark suite and return the results document"""
+    results = {}
+    if not skip_descriptors:
+        results.update(run_descriptor_benchmarks(get_reference_sets(repeat), include_3d, n_jobs))
+    if not skip_modeling:
+        for model_type in model_types or ['random_forest', 'ridge']:
+            results.update(run_modeling_benchmarks(model_type, n_jobs=n_jobs))
+    
+    return {
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': get_git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'rdkit': rdBase.rdkitVersion,
+            'include_3d': include_3d,
+            'repeat': repeat,
+            'n_jobs': n_jobs
+        },
+        'results': results
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Compare two result documents metric by metric"""
+    rows = []
+    for name in sorted(set(baseline['results']) & set(current['results'])):
+        before, after = baseline['results'][name], current['results'][name]
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in before or metric not in after or not before[metric]:
+                continue
+            change = (after[metric] - before[metric]) / before[metric]
+            regression = -change > threshold if higher_is_better else change > threshold
+            rows.append({'benchmark': name, 'metric': metric, 'baseline': before[metric],
+                         'current': after[metric], 'change': change, 'regression': regression})
+    return rows
+
+def print_comparison(rows: List[Dict[str, Any]]) -> None:
+    """Print a comparison table"""
+    print(f"{'benchmark':<55} {'metric':<17} {'baseline':>12} {'current':>12} {'change':>9}")
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['benchmark']:<55} {row['metric']:<17} {row['baseline']:>12.3f} "
+              f"{row['current']:>12.3f} {row['change']:>+8.1%}{flag}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='QSAR descriptor and modeling benchmarks')
+    parser.add_argument('--output', help='Write results JSON to this path (default: stdout)')
+    parser.add_argument('--no-3d', action='store_true', help='Skip 3D descriptors')
+    parser.add_argument('--repeat', type=int, default=1, help='Repeat each reference set this many times')
+    parser.add_argument('--n-jobs', type=int, default=1, help='Worker processes for batch and modeling stages')
+    parser.add_argument('--models', nargs='+', help='Model types to benchmark (default: random_forest ridge)')
+    parser.add_argument('--skip-descriptors', action='store_true')
+    parser.add_argument('--skip-modeling', action='store_true')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two results files instead of running')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative change counted as a regression when comparing')
+    args = parser.parse_args(argv)
+    
+    if args.compare:
+        with open(args.compare[0], 'r') as f:
+            baseline = json.load(f)
+        with open(args.compare[1], 'r') as f:
+            current = json.load(f)
+        rows = compare(baseline, current, args.threshold)
+        print_comparison(rows)
+        return 1 if any(row['regression'] for row in rows) else 0
+    
+    document = run(include_3d=not args.no_3d, repeat=args.repeat, n_jobs=args.n_jobs,
+                   model_types=args.models, skip_descriptors=args.skip_descriptors,
+                   skip_modeling=args.skip_modeling)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    else:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
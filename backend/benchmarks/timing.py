@@ -0,0 +1,56 @@
+"""
+Timing Utilities for QSAR/QSPR/QSTR Benchmarks
+Latency percentiles, throughput and peak memory measurement
+"""
+
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+def peak_rss_mb() -> float:
+    """Get the peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def summarize(latencies: List[float], items: Optional[int] = None) -> Dict[str, float]:
+    """Summarize per-call latencies (seconds) into throughput and percentiles"""
+    latencies = np.asarray(latencies, dtype=np.float64)
+    total = float(latencies.sum())
+    items = len(latencies) if items is None else items
+    if len(latencies) == 0:
+        return {'calls': 0, 'items': items, 'total_s': 0.0, 'items_per_second': 0.0,
+                'mean_ms': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'peak_rss_mb': peak_rss_mb()}
+    
+    return {
+        'calls': len(latencies),
+        'items': items,
+        'total_s': total,
+        'items_per_second': items / total if total > 0 else 0.0,
+        'mean_ms': float(latencies.mean() * 1000),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def time_calls(function: Callable[[Any], Any], inputs: Iterable[Any], warmup: int = 1) -> List[float]:
+    """Time ``function`` once per input, after ``warmup`` untimed calls on the first input"""
+    inputs = list(inputs)
+    for _ in range(min(warmup, len(inputs))):
+        function(inputs[0])
+    
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        function(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def time_once(function: Callable[[], Any], items: int = 1) -> Dict[str, float]:
+    """Time a single call that processes ``items`` items"""
+    start = time.perf_counter()
+    function()
+    return summarize([time.perf_counter() - start], items=items)
@@ -0,0 +1,172 @@
+"""
+Applicability Domain for QSAR/QSPR/QSTR Models
+Compact training-set statistics for vectorized bounds, leverage and kNN domain checks
+"""
+
+import numpy as np
+from typing import Any, Dict, Iterable, Optional
+
+DOMAIN_METHODS = ['bounds', 'leverage', 'knn']
+
+# Training rows used to calibrate the kNN distance threshold
+MAX_CALIBRATION_ROWS = 5000
+
+# Reference rows compared per step of a kNN query
+KNN_BLOCK_ROWS = 8192
+
+class ApplicabilityDomain:
+    """Domain-of-applicability checks in a model's scaled, selected feature space
+    
+    Fitting keeps only what scoring needs: per-feature bounds, a ``p x r``
+    leverage factor ``W`` with ``h(x) = 1/n + ||(x - mean) W||^2``, and the
+    training rows (as float32) for k-nearest-neighbour distances. A row is in
+    domain when it violates no bounds, its leverage is below the warning
+    leverage ``3(p + 1)/n`` and its mean distance to the ``k`` nearest
+    training rows is below the ``knn_percentile`` of the training rows' own.
+    """
+    
+    def __init__(self, methods: Iterable[str] = DOMAIN_METHODS, k: int = 5, knn_percentile: float = 95.0,
+                 bounds_tolerance: float = 0.0):
+        self.methods = list(methods)
+        unknown = [method for method in self.methods if method not in DOMAIN_METHODS]
+        if unknown:
+            raise ValueError(f"Invalid applicability domain methods: {unknown}. Use {DOMAIN_METHODS}")
+        
+        self.k = k
+        self.knn_percentile = knn_percentile
+        self.bounds_tolerance = bounds_tolerance
+        self.n_samples = None
+        self.lower = None
+        self.upper = None
+        self.mean = None
+        self.leverage_factor = None
+        self.leverage_threshold = None
+        self.reference = None
+        self.reference_norms = None
+        self.knn_threshold = None
+    
+    @property
+    def fitted(self) -> bool:
+        return self.n_samples is not None
+    
+    def fit(self, X: np.ndarray, random_state: int = 42) -> 'ApplicabilityDomain':
+        """Compute the training statistics from the model's (scaled, selected) training matrix"""
+        X = np.asarray(X)
+        if X.ndim != 2 or len(X) < 2:
+            raise ValueError("Applicability domain needs a 2D training matrix with at least 2 rows")
+        n, p = X.shape
+        self.n_samples = n
+        
+        if 'bounds' in self.methods:
+            self.lower = X.min(axis=0).astype(np.float64)
+            self.upper = X.max(axis=0).astype(np.float64)
+            margin = self.bounds_tolerance * (self.upper - self.lower)
+            self.lower -= margin
+            self.upper += margin
+        
+        if 'leverage' in self.methods:
+            self.mean = X.mean(axis=0, dtype=np.float64)
+            _, singular_values, vt = np.linalg.svd(X - self.mean, full_matrices=False)
+            keep = singular_values > singular_values.max(initial=0.0) * max(n, p) * np.finfo(np.float64).eps
+            self.leverage_factor = vt[keep].T / singular_values[keep]
+            self.leverage_threshold = 3.0 * (p + 1) / n
+        
+        if 'knn' in self.methods:
+            self.k = min(self.k, n - 1)
+            self.reference = np.ascontiguousarray(X, dtype=np.float32)
+            self.reference_norms = np.einsum('ij,ij->i', self.reference, self.reference, dtype=np.float64)
+            rows = np.arange(n)
+            if n > MAX_CALIBRATION_ROWS:
+                rows = np.sort(np.random.default_rng(random_state).choice(n, MAX_CALIBRATION_ROWS, replace=False))
+            distances = self._knn_distance(self.reference[rows], exclude=rows)
+            self.knn_threshold = float(np.percentile(distances, self.knn_percentile))
+        
+        return self
+    
+    def score(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """Score rows of the model's (scaled, selected) feature matrix
+        
+        Returns per-row arrays: ``in_domain`` plus, per fitted method,
+        ``bounds_violations`` (number of features out of range), ``leverage``
+        and ``knn_distance``.
+        """
+        if not self.fitted:
+            raise ValueError("Applicability domain not fitted yet")
+        
+        X = np.asarray(X)
+        in_domain = np.ones(len(X), dtype=bool)
+        result = {}
+        
+        if self.lower is not None:
+            violations = ((X < self.lower) | (X > self.upper)).sum(axis=1)
+            result['bounds_violations'] = violations
+            in_domain &= violations == 0
+        
+        if self.leverage_factor is not None:
+            projected = (X - self.mean) @ self.leverage_factor
+            leverage = 1.0 / self.n_samples + np.einsum('ij,ij->i', projected, projected)
+            result['leverage'] = leverage
+            in_domain &= leverage <= self.leverage_threshold
+        
+        if self.reference is not None:
+            distances = self._knn_distance(X)
+            result['knn_distance'] = distances
+            in_domain &= distances <= self.knn_threshold
+        
+        result['in_domain'] = in_domain
+        return result
+    
+    def _knn_distance(self, X: np.ndarray, exclude: Optional[np.ndarray] = None) -> np.ndarray:
+        """Mean Euclidean distance to the ``k`` nearest reference rows
+        
+        ``exclude[i]`` is a reference row ignored for query ``i`` (its own
+        training row during calibration).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        query_norms = np.einsum('ij,ij->i', X, X, dtype=np.float64)
+        nearest = np.full((len(X), self.k), np.inf)
+        
+        for start in range(0, len(self.reference), KNN_BLOCK_ROWS):
+            stop = min(start + KNN_BLOCK_ROWS, len(self.reference))
+            squared = (query_norms[:, None] + self.reference_norms[None, start:stop]
+                       - 2.0 * (X @ self.reference[start:stop].T))
+            if exclude is not None:
+                own = (exclude >= start) & (exclude < stop)
+                squared[np.flatnonzero(own), exclude[own] - start] = np.inf
+            candidates = np.concatenate([nearest, squared], axis=1)
+            nearest = np.partition(candidates, self.k - 1, axis=1)[:, :self.k]
+        
+        return np.sqrt(np.maximum(nearest, 0.0)).mean(axis=1)
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Get the fitted statistics as plain arrays"""
+        arrays = {
+            'methods': np.asarray(self.methods, dtype=str),
+            'k': np.asarray(self.k),
+            'knn_percentile': np.asarray(self.knn_percentile),
+            'bounds_tolerance': np.asarray(self.bounds_tolerance),
+            'n_samples': np.asarray(self.n_samples)
+        }
+        for name in ('lower', 'upper', 'mean', 'leverage_factor', 'leverage_threshold',
+                     'reference', 'reference_norms', 'knn_threshold'):
+            value = getattr(self, name)
+            if value is not None:
+                arrays[name] = np.asarray(value)
+        return arrays
+    
+    @classmethod
+    def from_arrays(cls, data: Any) -> 'ApplicabilityDomain':
+        """Rebuild a fitted domain from ``to_arrays`` output (arrays may be memory-mapped)"""
+        domain = cls(data['methods'].tolist(), int(data['k']), float(data['knn_percentile']),
+                     float(data['bounds_tolerance']))
+        domain.n_samples = int(data['n_samples'])
+        for name in ('lower', 'upper', 'mean', 'leverage_factor', 'reference', 'reference_norms'):
+            if name in data:
+                setattr(domain, name, data[name])
+        for name in ('leverage_threshold', 'knn_threshold'):
+            if name in data:
+                setattr(domain, name, float(data[name]))
+        return domain
+    
+    def __repr__(self) -> str:
+        return f"ApplicabilityDomain(methods={self.methods}, n_samples={self.n_samples})"
@@ -0,0 +1,293 @@
+"""
+Bulk Compound Ingest for QSAR/QSPR/QSTR Descriptor Calculation
+Streams SDF, CSV and SMILES files through the calculator into resumable Parquet parts
+"""
+
+import csv
+import glob
+import gzip
+import io
+import json
+import os
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+from rdkit import Chem
+
+from .enhanced_descriptors import DESCRIPTOR_SET_VERSION, EnhancedDescriptors
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+FILE_FORMATS = ['sdf', 'csv', 'smi']
+
+MANIFEST_FILE = '_ingest.json'
+
+# A record is (id, smiles, error); smiles is None when the input record could not be read
+Record = Tuple[str, Optional[str], Optional[str]]
+
+def _base_name(filepath: str) -> str:
+    """Get the lower-case path without a ``.gz`` suffix"""
+    name = filepath.lower()
+    return name[:-3] if name.endswith('.gz') else name
+
+def detect_format(filepath: str) -> str:
+    """Guess the file format from the extension (``.gz`` is looked through)"""
+    extension = os.path.splitext(_base_name(filepath))[1]
+    
+    if extension in ('.sdf', '.sd', '.mol'):
+        return 'sdf'
+    if extension in ('.csv', '.tsv'):
+        return 'csv'
+    if extension in ('.smi', '.smiles', '.txt'):
+        return 'smi'
+    raise ValueError(f"Cannot detect the format of {filepath}. Use one of {FILE_FORMATS}")
+
+def open_text(filepath: str) -> TextIO:
+    """Open a plain or gzip-compressed text file for reading"""
+    if filepath.lower().endswith('.gz'):
+        return gzip.open(filepath, 'rt', newline='')
+    return open(filepath, 'r', newline='')
+
+def read_smiles_file(filepath: str, title_line: bool = False, skip: int = 0) -> Iterator[Record]:
+    """Lazily read a ``SMILES [name]`` per line file
+    
+    Records without a name get their record number as ID. Blank lines and
+    ``#`` comments are ignored.
+    """
+    with open_text(filepath) as f:
+        if title_line:
+            next(f, None)
+        lines = (line.strip() for line in f)
+        records = (line for line in lines if line and not line.startswith('#'))
+        for number, line in enumerate(islice(records, skip, None), skip):
+            fields = line.split(None, 1)
+            yield (fields[1] if len(fields) > 1 else str(number)), fields[0], None
+
+def read_csv_file(filepath: str, smiles_column: str = 'smiles', id_column: Optional[str] = None,
+                  delimiter: Optional[str] = None, skip: int = 0) -> Iterator[Record]:
+    """Lazily read SMILES and IDs from a CSV file (tab-separated for ``.tsv``)"""
+    if delimiter is None:
+        delimiter = '\t' if _base_name(filepath).endswith('.tsv') else ','
+    
+    with open_text(filepath) as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        missing = [column for column in (smiles_column, id_column)
+                   if column is not None and column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Columns not found in {filepath}: {missing}")
+        
+        for number, row in enumerate(islice(reader, skip, None), skip):
+            record_id = row[id_column] if id_column is not None else str(number)
+            smiles = (row[smiles_column] or '').strip()
+            if smiles:
+                yield record_id, smiles, None
+            else:
+                yield record_id, None, "Missing SMILES"
+
+def read_sdf_file(filepath: str, id_property: Optional[str] = None, skip: int = 0) -> Iterator[Record]:
+    """Lazily read molecules from an SDF file and convert them to SMILES
+    
+    IDs come from ``id_property``, else the molecule name, else the record
+    number. Skipped records are split off as text and never parsed.
+    """
+    with open_text(filepath) as f:
+        for number, block in enumerate(islice(_sdf_blocks(f), skip, None), skip):
+            supplier = Chem.SDMolSupplier()
+            supplier.SetData(block)
+            mol = next(supplier, None)
+            if mol is None:
+                yield _sdf_block_name(block) or str(number), None, "Invalid SDF record"
+                continue
+            
+            record_id = None
+            if id_property is not None and mol.HasProp(id_property):
+                record_id = mol.GetProp(id_property)
+            elif mol.HasProp('_Name') and mol.GetProp('_Name').strip():
+                record_id = mol.GetProp('_Name').strip()
+            yield record_id or str(number), Chem.MolToSmiles(mol), None
+
+def read_compound_file(filepath: str, file_format: Optional[str] = None, skip: int = 0,
+                       **kwargs: Any) -> Iterator[Record]:
+    """Lazily read ``(id, smiles, error)`` records from an SDF, CSV or SMILES file"""
+    file_format = file_format or detect_format(filepath)
+    if file_format == 'sdf':
+        return read_sdf_file(filepath, skip=skip, **kwargs)
+    if file_format == 'csv':
+        return read_csv_file(filepath, skip=skip, **kwargs)
+    if file_format == 'smi':
+        return read_smiles_file(filepath, skip=skip, **kwargs)
+    raise ValueError(f"Invalid file format: {file_format}. Use one of {FILE_FORMATS}")
+
+def _sdf_blocks(f: TextIO) -> Iterator[str]:
+    """Split an SDF stream into record texts"""
+    lines = []
+    for line in f:
+        if line.startswith('$$$$'):
+            yield ''.join(lines)
+            lines = []
+        else:
+            lines.append(line)
+    if any(line.strip() for line in lines):
+        yield ''.join(lines)
+
+def _sdf_block_name(block: str) -> str:
+    return io.StringIO(block).readline().strip()
+
+class BulkIngest:
+    """Featurize a compound file chunk by chunk into Parquet part files
+    
+    Every ``chunk_rows`` input records are featurized with
+    ``EnhancedDescriptors.calculate_batch`` and written as one part file
+    (``part-00000.parquet``, ...) holding a single row group with the
+    columns ``id``, ``smiles``, ``error`` and one float column per feature.
+    Parts are written to a temporary name and renamed, so a crashed run
+    leaves only complete parts; running again with ``resume=True`` skips
+    the input records those parts already cover.
+    """
+    
+    def __init__(self, calculator: Optional[EnhancedDescriptors] = None, features: Optional[List[str]] = None,
+                 include_3d: bool = False, chunk_rows: int = 1000, n_jobs: int = 1,
+                 timeout: Optional[float] = None, dtype: type = np.float32):
+        if pa is None:
+            raise ValueError("Bulk ingest requires pyarrow")
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1")
+        
+        self.calculator = calculator or EnhancedDescriptors()
+        self.include_3d = include_3d
+        self.features = list(features) if features is not None else self.calculator.get_feature_names(include_3d)
+        self.calculator.build_plan(self.features)
+        self.chunk_rows = chunk_rows
+        self.n_jobs = n_jobs
+        self.timeout = timeout
+        self.dtype = dtype
+    
+    def run(self, input_path: str, output_dir: str, file_format: Optional[str] = None,
+            resume: bool = True, **reader_kwargs: Any) -> Dict[str, Any]:
+        """Ingest ``input_path`` into ``output_dir``
+        
+        ``reader_kwargs`` go to the format's reader (e.g. ``smiles_column``
+        and ``id_column`` for CSV, ``id_property`` for SDF). Returns a summary
+        with the number of rows, failed rows and part files.
+        """
+        file_format = file_format or detect_format(input_path)
+        manifest = {
+            'input_path': os.path.abspath(input_path),
+            'file_format': file_format,
+            'reader_kwargs': reader_kwargs,
+            'features': self.features,
+            'include_3d': self.include_3d,
+            'chunk_rows': self.chunk_rows,
+            'descriptor_set_version': DESCRIPTOR_SET_VERSION,
+            'complete': False
+        }
+        
+        os.makedirs(output_dir, exist_ok=True)
+        parts, rows, errors = self._resume_state(output_dir, manifest) if resume else self._reset(output_dir)
+        if manifest != self._read_manifest(output_dir):
+            self._write_manifest(output_dir, manifest)
+        
+        records = read_compound_file(input_path, file_format, skip=rows, **reader_kwargs)
+        while True:
+            chunk = list(islice(records, self.chunk_rows))
+            if not chunk:
+                break
+            errors += self._write_part(output_dir, len(parts), chunk)
+            parts.append(self._part_path(output_dir, len(parts)))
+            rows += len(chunk)
+        
+        manifest.update({'complete': True, 'rows': rows, 'errors': errors, 'parts': len(parts)})
+        self._write_manifest(output_dir, manifest)
+        return {'rows': rows, 'errors': errors, 'parts': parts}
+    
+    def _write_part(self, output_dir: str, index: int, chunk: List[Record]) -> int:
+        """Featurize one chunk and write it as a part file; returns the number of failed rows"""
+        ids = [record_id for record_id, _, _ in chunk]
+        readable = [row for row, (_, smiles, _) in enumerate(chunk) if smiles is not None]
+        
+        values = np.full((len(chunk), len(self.features)), np.nan, dtype=self.dtype)
+        errors = np.array([error for _, _, error in chunk], dtype=object)
+        if readable:
+            block_values, block_errors = self.calculator.calculate_batch(
+                [chunk[row][1] for row in readable], self.include_3d, dtype=self.dtype, n_jobs=self.n_jobs,
+                timeout=self.timeout, features=self.features)
+            values[readable] = block_values
+            errors[readable] = block_errors
+        
+        columns = {
+            'id': pa.array(ids, type=pa.string()),
+            'smiles': pa.array([smiles for _, smiles, _ in chunk], type=pa.string()),
+            'error': pa.array(errors.tolist(), type=pa.string())
+        }
+        for column, name in enumerate(self.features):
+            columns[name] = pa.array(values[:, column])
+        
+        path = self._part_path(output_dir, index)
+        with self.calculator.instrumentation.stage('ingest_write'):
+            pq.write_table(pa.table(columns), path + '.tmp', row_group_size=len(chunk))
+            os.replace(path + '.tmp', path)
+        return int(sum(error is not None for error in errors))
+    
+    def _resume_state(self, output_dir: str, manifest: Dict) -> Tuple[List[str], int, int]:
+        """Get the complete parts, rows and errors a previous run left behind"""
+        previous = self._read_manifest(output_dir)
+        if previous is None:
+            return self._reset(output_dir)
+        
+        settings = [key for key in manifest if key != 'complete' and previous.get(key) != manifest[key]]
+        if settings:
+            raise ValueError(f"Cannot resume ingest in {output_dir}: settings changed ({', '.join(settings)}). "
+                             "Use resume=False to start over")
+        
+        for path in glob.glob(os.path.join(output_dir, 'part-*.parquet.tmp')):
+            os.remove(path)
+        
+        parts, rows, errors = [], 0, 0
+        while os.path.exists(self._part_path(output_dir, len(parts))):
+            path = self._part_path(output_dir, len(parts))
+            table = pq.read_table(path, columns=['error'])
+            rows += table.num_rows
+            errors += table.num_rows - table.column('error').null_count
+            parts.append(path)
+        return parts, rows, errors
+    
+    def _reset(self, output_dir: str) -> Tuple[List[str], int, int]:
+        """Remove the parts and manifest of a previous run"""
+        for path in glob.glob(os.path.join(output_dir, 'part-*.parquet*')):
+            os.remove(path)
+        if os.path.exists(os.path.join(output_dir, MANIFEST_FILE)):
+            os.remove(os.path.join(output_dir, MANIFEST_FILE))
+        return [], 0, 0
+    
+    @staticmethod
+    def _part_path(output_dir: str, index: int) -> str:
+        return os.path.join(output_dir, f'part-{index:05d}.parquet')
+    
+    @staticmethod
+    def _read_manifest(output_dir: str) -> Optional[Dict]:
+        path = os.path.join(output_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _write_manifest(output_dir: str, manifest: Dict) -> None:
+        path = os.path.join(output_dir, MANIFEST_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+# Convenience functions
+def ingest_compound_file(input_path: str, output_dir: str, features: Optional[List[str]] = None,
+                         include_3d: bool = False, chunk_rows: int = 1000, n_jobs: int = 1,
+                         resume: bool = True, **reader_kwargs: Any) -> Dict[str, Any]:
+    """Featurize an SDF, CSV or SMILES file (optionally gzipped) into Parquet part files"""
+    ingest = BulkIngest(features=features, include_3d=include_3d, chunk_rows=chunk_rows, n_jobs=n_jobs)
+    return ingest.run(input_path, output_dir, resume=resume, **reader_kwargs)
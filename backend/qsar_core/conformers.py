@@ -0,0 +1,169 @@
+"""
+Conformer Generation for 3D QSAR/QSPR/QSTR Descriptors
+Budgeted ETKDG embedding and force-field optimization with fallback strategies
+"""
+
+import math
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from rdkit import Chem
+from rdkit.Chem import AllChem, rdDistGeom
+
+from .instrumentation import NULL_INSTRUMENTATION, Instrumentation
+
+class ConformerResult:
+    """Outcome of conformer generation for one molecule"""
+    
+    def __init__(self, mol: Optional[Chem.Mol], strategy: str, elapsed: float,
+                 energies: Optional[List[float]] = None):
+        self.mol = mol
+        self.strategy = strategy
+        self.elapsed = elapsed
+        self.energies = energies
+    
+    @property
+    def deterministic(self) -> bool:
+        """Whether the result would be reproduced exactly (not cut short by a time budget)"""
+        return 'budget' not in self.strategy
+    
+    def __repr__(self) -> str:
+        n_confs = self.mol.GetNumConformers() if self.mol is not None else 0
+        return f"ConformerResult(strategy={self.strategy!r}, conformers={n_confs}, elapsed={self.elapsed:.3f})"
+
+class ConformerGenerator:
+    """3D conformer generator with size limits, time budgets and fallbacks
+    
+    Strategies, recorded per molecule:
+    
+    - ``skipped:size``: more than ``max_heavy_atoms`` heavy atoms, no 3D at all
+    - ``etkdg`` / ``random_coords``: ETKDG embedding, falling back to random
+      starting coordinates when ETKDG fails
+    - ``+mmff`` / ``+uff``: force-field optimization, skipped above
+      ``max_heavy_atoms_optimize`` heavy atoms
+    - ``+budget``: the time budget ran out, remaining steps were skipped
+    - ``failed``: no conformer could be embedded
+    """
+    
+    def __init__(self, num_conformers: int = 1, time_budget: Optional[float] = 10.0,
+                 embed_max_iterations: int = 0, optimize_max_iterations: int = 200,
+                 max_heavy_atoms: Optional[int] = 150, max_heavy_atoms_optimize: Optional[int] = 80,
+                 random_seed: int = 42, instrumentation: Optional[Instrumentation] = None):
+        self.num_conformers = num_conformers
+        self.time_budget = time_budget
+        self.embed_max_iterations = embed_max_iterations
+        self.optimize_max_iterations = optimize_max_iterations
+        self.max_heavy_atoms = max_heavy_atoms
+        self.max_heavy_atoms_optimize = max_heavy_atoms_optimize
+        self.random_seed = random_seed
+        self.strategy_counts = Counter()
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+    
+    def generate(self, mol: Chem.Mol) -> ConformerResult:
+        """Generate conformers for a molecule within the configured budget"""
+        start = time.perf_counter()
+        heavy_atoms = mol.GetNumHeavyAtoms()
+        
+        if self.max_heavy_atoms is not None and heavy_atoms > self.max_heavy_atoms:
+            return self._record(ConformerResult(None, 'skipped:size', time.perf_counter() - start))
+        
+        # Add hydrogens
+        mol_h = Chem.AddHs(mol)
+        
+        # Generate conformers using ETKDG, then from random coordinates
+        strategy = None
+        with self.instrumentation.stage('conformer_embed'):
+            for embed_strategy, use_random_coords in (('etkdg', False), ('random_coords', True)):
+                remaining = self._remaining(start)
+                if remaining is not None and remaining <= 0:
+                    break
+                if self._embed(mol_h, use_random_coords, remaining) > 0:
+                    strategy = embed_strategy
+                    break
+        
+        if strategy is None:
+            failure = 'failed+budget' if self._remaining(start) == 0 else 'failed'
+            return self._record(ConformerResult(None, failure, time.perf_counter() - start))
+        
+        # Optimize conformers (or downgrade for large molecules)
+        energies = None
+        if self.max_heavy_atoms_optimize is None or heavy_atoms <= self.max_heavy_atoms_optimize:
+            with self.instrumentation.stage('conformer_optimize'):
+                force_field, energies, out_of_budget = self._optimize(mol_h, start)
+            if force_field:
+                strategy += f'+{force_field}'
+            if out_of_budget:
+                strategy += '+budget'
+        
+        if energies is not None:
+            for conf, energy in zip(mol_h.GetConformers(), energies):
+                conf.SetDoubleProp('energy', float(energy))
+        
+        return self._record(ConformerResult(mol_h, strategy, time.perf_counter() - start, energies))
+    
+    def _record(self, result: ConformerResult) -> ConformerResult:
+        """Count the strategy used for a molecule"""
+        self.strategy_counts[result.strategy] += 1
+        self.instrumentation.increment('conformer_strategy', strategy=result.strategy)
+        return result
+    
+    def _remaining(self, start: float) -> Optional[float]:
+        """Get the remaining time budget in seconds (None = unlimited)"""
+        if self.time_budget is None:
+            return None
+        return max(0.0, self.time_budget - (time.perf_counter() - start))
+    
+    def _embed(self, mol_h: Chem.Mol, use_random_coords: bool, remaining: Optional[float]) -> int:
+        """Embed conformers in place; returns the number embedded"""
+        params = rdDistGeom.ETKDGv3()
+        params.randomSeed = self.random_seed
+        params.useRandomCoords = use_random_coords
+        if self.embed_max_iterations:
+            params.maxIterations = self.embed_max_iterations
+        if remaining is not None and hasattr(params, 'timeout'):
+            params.timeout = max(1, int(math.ceil(remaining)))
+        
+        try:
+            return len(AllChem.EmbedMultipleConfs(mol_h, numConfs=self.num_conformers, params=params))
+        except Exception:
+            return 0
+    
+    def _optimize(self, mol_h: Chem.Mol, start: float):
+        """Optimize conformers one at a time until the budget runs out
+        
+        Returns ``(force_field, energies, out_of_budget)``. Conformers left
+        unoptimized when the budget runs out keep their embedded geometry and
+        single-point energy.
+        """
+        try:
+            if AllChem.MMFFHasAllMoleculeParams(mol_h):
+                name = 'mmff'
+                properties = AllChem.MMFFGetMoleculeProperties(mol_h)
+                get_force_field = lambda conf_id: AllChem.MMFFGetMoleculeForceField(
+                    mol_h, properties, confId=conf_id)
+            elif AllChem.UFFHasAllMoleculeParams(mol_h):
+                name = 'uff'
+                get_force_field = lambda conf_id: AllChem.UFFGetMoleculeForceField(mol_h, confId=conf_id)
+            else:
+                return None, None, False
+            
+            energies = []
+            out_of_budget = False
+            for conf in mol_h.GetConformers():
+                force_field = get_force_field(conf.GetId())
+                if not out_of_budget:
+                    remaining = self._remaining(start)
+                    if remaining is not None and remaining <= 0:
+                        out_of_budget = True
+                    else:
+                        force_field.Minimize(maxIts=self.optimize_max_iterations)
+                energies.append(force_field.CalcEnergy())
+            
+            return name, energies, out_of_budget
+        except Exception:
+            return None, None, False
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get how many molecules used each strategy"""
+        return dict(self.strategy_counts)
@@ -0,0 +1,208 @@
+"""
+Persistent Descriptor Cache for QSAR/QSPR/QSTR Featurization
+Content-addressed SQLite store with an in-process LRU front
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from rdkit import rdBase
+
+class DescriptorCache:
+    """Disk-backed descriptor block cache keyed by canonical SMILES
+    
+    Entries are addressed by a hash of the canonical SMILES, the block name
+    (e.g. ``'2d'`` or ``'3d'``), the descriptor-set version and the RDKit
+    version, so upgrading either invalidates stale values automatically.
+    With ``path=None`` only the in-process LRU is used.
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1000000,
+                 memory_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.rdkit_version = rdBase.rdkitVersion
+        
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._connection = None
+        self._pid = None
+        self._layouts = {}
+        self._layout_ids = {}
+        self._disk_entries = None
+        self.reset_stats()
+        
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+    
+    def __getstate__(self) -> Dict:
+        # Connections, locks and hot entries are per process
+        state = self.__dict__.copy()
+        state.update(_memory=OrderedDict(), _lock=None, _connection=None, _pid=None,
+                     _layouts={}, _layout_ids={}, _disk_entries=None)
+        return state
+    
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self.reset_stats()
+    
+    def reset_stats(self) -> None:
+        """Reset hit/miss counters"""
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+    
+    def stats(self) -> Dict[str, float]:
+        """Get hit/miss counters for this process"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'hits': hits,
+            'misses': self.misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'memory_entries': len(self._memory)
+        }
+    
+    def make_key(self, canonical_smiles: str, block: str, version: str) -> str:
+        """Build the content address of a descriptor block"""
+        payload = '\x00'.join([canonical_smiles, block, version, self.rdkit_version])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, canonical_smiles: str, block: str, version: str) -> Optional[Dict[str, float]]:
+        """Get a cached descriptor block, or None on a miss"""
+        key = self.make_key(canonical_smiles, block, version)
+        
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(self._memory[key])
+            
+            if self.path:
+                row = self._connect().execute(
+                    'SELECT layout, value FROM descriptors WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    descriptors = self._decode(row[0], row[1])
+                    self._remember(key, descriptors)
+                    self.disk_hits += 1
+                    return dict(descriptors)
+            
+            self.misses += 1
+            return None
+    
+    def put(self, canonical_smiles: str, block: str, version: str, descriptors: Dict[str, float]) -> None:
+        """Store a descriptor block"""
+        key = self.make_key(canonical_smiles, block, version)
+        
+        with self._lock:
+            self._remember(key, dict(descriptors))
+            self.writes += 1
+            
+            if self.path:
+                connection = self._connect()
+                names = tuple(descriptors)
+                values = np.asarray([descriptors[name] for name in names], dtype=np.float64)
+                layout_id = self._layout_id(names)
+                row = (layout_id, values.tobytes(), time.time(), key)
+                with connection:
+                    # Only new keys count towards max_entries; existing ones are overwritten in place
+                    inserted = connection.execute(
+                        'INSERT OR IGNORE INTO descriptors (layout, value, created, key) VALUES (?, ?, ?, ?)',
+                        row).rowcount > 0
+                    if not inserted:
+                        connection.execute(
+                            'UPDATE descriptors SET layout = ?, value = ?, created = ? WHERE key = ?', row)
+                if inserted:
+                    self._disk_entries += 1
+                    if self._disk_entries > self.max_entries:
+                        self._evict()
+    
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        with self._lock:
+            self._memory.clear()
+            if self.path:
+                connection = self._connect()
+                with connection:
+                    connection.execute('DELETE FROM descriptors')
+                self._disk_entries = 0
+    
+    def _remember(self, key: str, descriptors: Dict[str, float]) -> None:
+        """Insert into the in-process LRU, evicting the coldest entries"""
+        self._memory[key] = descriptors
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this process's SQLite connection, opening it on first use"""
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+        
+        connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS layouts (id INTEGER PRIMARY KEY, names TEXT UNIQUE)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS descriptors '
+                '(key TEXT PRIMARY KEY, layout INTEGER, value BLOB, created REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS descriptors_created ON descriptors (created)')
+        
+        self._connection = connection
+        self._pid = os.getpid()
+        self._layouts = {}
+        self._layout_ids = {}
+        self._disk_entries = connection.execute('SELECT COUNT(*) FROM descriptors').fetchone()[0]
+        return connection
+    
+    def _layout_id(self, names: Tuple[str, ...]) -> int:
+        """Get the id of a descriptor name layout, registering it if new"""
+        if names not in self._layout_ids:
+            connection = self._connect()
+            joined = '\t'.join(names)
+            with connection:
+                connection.execute('INSERT OR IGNORE INTO layouts (names) VALUES (?)', (joined,))
+            layout_id = connection.execute('SELECT id FROM layouts WHERE names = ?', (joined,)).fetchone()[0]
+            self._layout_ids[names] = layout_id
+            self._layouts[layout_id] = list(names)
+        
+        return self._layout_ids[names]
+    
+    def _decode(self, layout_id: int, blob: bytes) -> Dict[str, float]:
+        """Decode a stored block back into a descriptor dict"""
+        if layout_id not in self._layouts:
+            names = self._connect().execute('SELECT names FROM layouts WHERE id = ?', (layout_id,)).fetchone()[0]
+            self._layouts[layout_id] = names.split('\t') if names else []
+            self._layout_ids[tuple(self._layouts[layout_id])] = layout_id
+        
+        values = np.frombuffer(blob, dtype=np.float64)
+        return dict(zip(self._layouts[layout_id], values.tolist()))
+    
+    def _evict(self) -> None:
+        """Drop the oldest disk entries to get back under ``max_entries``"""
+        connection = self._connect()
+        # Evict a little extra so eviction does not run on every write
+        excess = self._disk_entries - int(self.max_entries * 0.9)
+        with connection:
+            connection.execute(
+                'DELETE FROM descriptors WHERE key IN '
+                '(SELECT key FROM descriptors ORDER BY created LIMIT ?)', (excess,))
+        self._disk_entries = connection.execute('SELECT COUNT(*) FROM descriptors').fetchone()[0]
+        self.evictions += excess
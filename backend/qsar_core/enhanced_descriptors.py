@@ -5,18 +5,147 @@ Comprehensive 2D and 3D molecular descriptor calculations
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple, Union
+from scipy import sparse
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from rdkit import Chem
 from rdkit.Chem import Descriptors, rdMolDescriptors, AllChem, rdMolDescriptors
-from rdkit.Chem.rdMolDescriptors import GetWHIM, GetGETAWAY, Get3DMoRSE
+from rdkit.Chem import rdFingerprintGenerator
+from rdkit.Chem.rdMolDescriptors import CalcWHIM, CalcGETAWAY, CalcMORSE
+from rdkit.Chem.EState.EState_VSA import EState_VSA_
+import re
+import time
 import warnings
 
+from .conformers import ConformerGenerator, ConformerResult
+from .descriptor_cache import DescriptorCache
+from .fingerprints import calculate_packed_fingerprints, fingerprint_length, packed_to_csr
+from .fragments import calculate_fragment_counts, get_fragment_matcher
+from .instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from .molecule_context import MoleculeContext
+from .parallel import run_chunked
+from .standardization import Standardizer
+
 warnings.filterwarnings('ignore')
 
+# Bump whenever a descriptor definition changes so cached values are invalidated
+DESCRIPTOR_SET_VERSION = '3'
+
+# 2D descriptor functions by name. Charge and E-state index descriptors reuse the
+# Gasteiger charges / E-state indices RDKit caches on the molecule after the first call.
+DESCRIPTORS_2D = {
+    # Basic descriptors
+    'MolWt': Descriptors.MolWt,
+    'LogP': Descriptors.MolLogP,
+    'NumHDonors': Descriptors.NumHDonors,
+    'NumHAcceptors': Descriptors.NumHAcceptors,
+    'TPSA': Descriptors.TPSA,
+    'NumRotatableBonds': Descriptors.NumRotatableBonds,
+    'NumAromaticRings': Descriptors.NumAromaticRings,
+    'NumSaturatedRings': Descriptors.NumSaturatedRings,
+    'FractionCsp3': Descriptors.FractionCSP3,
+    'HeavyAtomCount': Descriptors.HeavyAtomCount,
+    'RingCount': Descriptors.RingCount,
+    'AromaticRings': Descriptors.NumAromaticRings,
+    'SaturatedRings': Descriptors.NumSaturatedRings,
+    'AliphaticRings': Descriptors.NumAliphaticRings,
+    'NumRadicalElectrons': Descriptors.NumRadicalElectrons,
+    'NumValenceElectrons': Descriptors.NumValenceElectrons,
+    
+    # Charge descriptors
+    'MaxPartialCharge': Descriptors.MaxPartialCharge,
+    'MinPartialCharge': Descriptors.MinPartialCharge,
+    
+    # E-state descriptors
+    'MaxEStateIndex': lambda mol: Descriptors.MaxEStateIndex(mol, force=False),
+    'MinEStateIndex': lambda mol: Descriptors.MinEStateIndex(mol, force=False),
+    'MaxAbsEStateIndex': lambda mol: Descriptors.MaxAbsEStateIndex(mol, force=False),
+    'MinAbsEStateIndex': lambda mol: Descriptors.MinAbsEStateIndex(mol, force=False),
+    
+    # Advanced descriptors
+    'qed': Descriptors.qed,
+    'MolMR': Descriptors.MolMR,
+    'LabuteASA': Descriptors.LabuteASA
+}
+
+# Fingerprint functions whose on-bit counts are the *_FP descriptors
+FINGERPRINT_FUNCTIONS = {
+    # Morgan fingerprints
+    'Morgan_FP': rdFingerprintGenerator.GetMorganGenerator(radius=2, fpSize=2048).GetFingerprint,
+    # Atom pair fingerprints
+    'AtomPair_FP': rdFingerprintGenerator.GetAtomPairGenerator(fpSize=2048).GetFingerprint,
+    # Torsion fingerprints
+    'Torsion_FP': rdFingerprintGenerator.GetTopologicalTorsionGenerator(fpSize=2048).GetFingerprint,
+    # MACCS keys
+    'MACCS_FP': rdMolDescriptors.GetMACCSKeysFingerprint,
+    # RDKit fingerprints
+    'RDKit_FP': rdFingerprintGenerator.GetRDKitFPGenerator(fpSize=2048).GetFingerprint,
+    # Pattern fingerprints
+    'Pattern_FP': Chem.PatternFingerprint,
+    # Higher order Morgan fingerprints
+    'Morgan2_FP': rdFingerprintGenerator.GetMorganGenerator(radius=3, fpSize=2048).GetFingerprint,
+    'Morgan3_FP': rdFingerprintGenerator.GetMorganGenerator(radius=4, fpSize=2048).GetFingerprint
+}
+
+# RT at 298.15 K in kcal/mol, for Boltzmann weighting of MMFF/UFF conformer energies
+BOLTZMANN_RT = 0.0019872041 * 298.15
+
+CONFORMER_AGGREGATIONS = ['boltzmann', 'mean', 'lowest']
+
+# 3D descriptor sub-blocks, all computed from the same conformer ensemble
+DESCRIPTOR_3D_PATTERNS = {
+    'pmi': re.compile(r'^(PlaneOfBestFit|PBF|PMI[123](_norm)?)$'),
+    'whim': re.compile(r'^WHIM\d+$'),
+    'getaway': re.compile(r'^GETAWAY\d+$'),
+    'morse': re.compile(r'^3DMoRSE\d+$')
+}
+
+# Name prefixes of the vector-valued 3D sub-blocks
+DESCRIPTOR_3D_PREFIXES = {'whim': 'WHIM', 'getaway': 'GETAWAY', 'morse': '3DMoRSE'}
+
+def largest_fragment(mol: Chem.Mol) -> Chem.Mol:
+    """Get the fragment with the most heavy atoms (salts, solvents and counter-ions dropped)"""
+    fragments = Chem.GetMolFrags(mol, asMols=True)
+    if len(fragments) == 1:
+        return mol
+    return max(fragments, key=lambda fragment: fragment.GetNumHeavyAtoms())
+
+class DescriptorPlan:
+    """Minimal execution plan for a requested list of descriptor names"""
+    
+    def __init__(self, feature_names: List[str], groups: Dict[str, List[str]]):
+        self.feature_names = list(feature_names)
+        self.groups = groups
+    
+    @property
+    def needs_3d(self) -> bool:
+        """Whether any requested descriptor requires a 3D conformer"""
+        return '3d' in self.groups
+    
+    def __repr__(self) -> str:
+        sizes = ', '.join(f"{group}={len(names)}" for group, names in self.groups.items())
+        return f"DescriptorPlan({sizes})"
+
 class EnhancedDescriptors:
     """Enhanced molecular descriptor calculator for QSAR/QSPR/QSTR modeling"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[DescriptorCache] = None, num_conformers: int = 1,
+                 conformer_aggregation: str = 'boltzmann',
+                 conformer_generator: Optional[ConformerGenerator] = None,
+                 instrumentation: Optional[Instrumentation] = None,
+                 standardizer: Optional[Standardizer] = None):
+        if conformer_aggregation not in CONFORMER_AGGREGATIONS:
+            raise ValueError(f"Invalid conformer aggregation: {conformer_aggregation}")
+        
+        self.cache = cache
+        self.conformer_generator = conformer_generator or ConformerGenerator(num_conformers=num_conformers)
+        self.num_conformers = self.conformer_generator.num_conformers
+        self.conformer_aggregation = conformer_aggregation
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        self.standardizer = standardizer
+        if instrumentation is not None and not self.conformer_generator.instrumentation.enabled:
+            self.conformer_generator.instrumentation = instrumentation
+        self.last_conformer_strategy = None
+        self._last_conformer_result = None
         self.descriptor_names = {
             '2d': self._get_2d_descriptor_names(),
             '3d': self._get_3d_descriptor_names(),
@@ -24,6 +153,11 @@ class EnhancedDescriptors:
             'fragment': self._get_fragment_names(),
             'estate': self._get_estate_names()
         }
+        self.fragment_matcher = get_fragment_matcher()
+        # Keep the RDKit descriptor-list order for full fragment blocks
+        self._fragment_order = [name for name, _ in Descriptors._descList
+                                if name.startswith('fr_') and name in self.fragment_matcher]
+        self._plans = {}
     
     def _get_2d_descriptor_names(self) -> List[str]:
         """Get 2D molecular descriptor names"""
@@ -77,294 +211,610 @@ class EnhancedDescriptors:
             'EState_VSA9', 'EState_VSA10', 'EState_VSA11'
         ]
     
-    def calculate_descriptors(self, smiles: str, include_3d: bool = True) -> Dict[str, float]:
-        """Calculate comprehensive molecular descriptors"""
-        try:
-            mol = Chem.MolFromSmiles(smiles)
-            if mol is None:
-                raise ValueError(f"Invalid SMILES: {smiles}")
+    def get_feature_names(self, include_3d: bool = True) -> List[str]:
+        """Get the fixed column order used for descriptor matrices"""
+        groups = ['2d', '3d', 'fingerprint', 'fragment', 'estate']
+        if not include_3d:
+            groups.remove('3d')
+        
+        return [name for group in groups for name in self.descriptor_names[group]]
+    
+    def build_plan(self, feature_names: Iterable[str]) -> DescriptorPlan:
+        """Build (or reuse) the minimal plan that computes ``feature_names``"""
+        feature_names = tuple(feature_names)
+        if feature_names in self._plans:
+            return self._plans[feature_names]
+        
+        groups = {}
+        unknown = []
+        for name in feature_names:
+            group = self._descriptor_group(name)
+            if group is None:
+                unknown.append(name)
+            else:
+                groups.setdefault(group, []).append(name)
+        
+        if unknown:
+            raise ValueError(f"Unknown descriptor names: {unknown}")
+        
+        plan = DescriptorPlan(feature_names, groups)
+        self._plans[feature_names] = plan
+        return plan
+    
+    def _descriptor_group(self, name: str) -> Optional[str]:
+        """Get the descriptor group that computes ``name``"""
+        if name in DESCRIPTORS_2D:
+            return '2d'
+        if name in self.descriptor_names['fingerprint']:
+            return 'fingerprint'
+        if name in self.fragment_matcher:
+            return 'fragment'
+        if re.match(r'^EState_VSA\d+$', name):
+            return 'estate'
+        if any(pattern.match(name) for pattern in DESCRIPTOR_3D_PATTERNS.values()):
+            return '3d'
+        return None
+    
+    def calculate_batch(self, smiles_list: Iterable[str], include_3d: bool = True,
+                        as_frame: bool = False, dtype: type = np.float32, n_jobs: int = 1,
+                        chunk_size: int = 64, timeout: Optional[float] = None,
+                        features: Optional[List[str]] = None, return_strategies: bool = False,
+                        standardize: Optional[bool] = None) -> Tuple:
+        """Calculate descriptors for many SMILES as one dense matrix
+        
+        Columns follow ``get_feature_names(include_3d)``. Molecules that fail are
+        left as NaN rows and their error message is stored in the returned
+        per-row error array (``None`` for rows that succeeded) instead of raising.
+        
+        With ``n_jobs != 1`` the SMILES are sharded into ``chunk_size`` chunks
+        across a process pool; ``timeout`` is a per-molecule budget in seconds.
+        Molecules that hang or crash a worker are reported as errors.
+        
+        Passing ``features`` (e.g. a trained model's selected feature names)
+        restricts the columns to that list and computes only what it needs.
+        
+        With ``return_strategies=True`` a third array records the conformer
+        strategy used for each molecule (see ``ConformerGenerator``), ``'cached'``
+        for cache hits and ``None`` where no 3D descriptors were requested.
+        
+        With ``standardize`` (default: whether the calculator has a
+        ``standardizer``) the molecules are standardized first, each unique
+        structure is computed once and its row is copied to all duplicates.
+        """
+        smiles_list = list(smiles_list)
+        columns = list(features) if features is not None else self.get_feature_names(include_3d)
+        
+        if standardize is None:
+            standardize = self.standardizer is not None
+        if standardize:
+            standardizer = self.standardizer or Standardizer()
+            with self.instrumentation.stage('standardize'):
+                unique_smiles, inverse, standardize_errors = standardizer.deduplicate(smiles_list, n_jobs)
+            self.instrumentation.increment('standardize_duplicates',
+                                           int((inverse >= 0).sum()) - len(unique_smiles))
+        else:
+            unique_smiles = smiles_list
+        
+        values = np.full((len(unique_smiles), len(columns)), np.nan, dtype=dtype)
+        errors = np.full(len(unique_smiles), None, dtype=object)
+        strategies = np.full(len(unique_smiles), None, dtype=object)
+        
+        if n_jobs == 1:
+            self._fill_batch(unique_smiles, include_3d, columns, values, errors, features, strategies)
+        else:
+            self._fill_batch_parallel(unique_smiles, include_3d, values, errors,
+                                      n_jobs, chunk_size, timeout, features, strategies)
+        
+        if standardize:
+            # Fan the unique rows back out to the input rows; rows that failed to standardize stay NaN
+            valid = inverse >= 0
+            rows = inverse[valid]
+            batch_values = np.full((len(smiles_list), len(columns)), np.nan, dtype=dtype)
+            batch_values[valid] = values[rows]
+            batch_strategies = np.full(len(smiles_list), None, dtype=object)
+            batch_strategies[valid] = strategies[rows]
+            standardize_errors[valid] = errors[rows]
+            values, errors, strategies = batch_values, standardize_errors, batch_strategies
+        
+        if as_frame:
+            values = pd.DataFrame(values, columns=columns, copy=False)
+        
+        if return_strategies:
+            return values, errors, strategies
+        
+        return values, errors
+    
+    def _fill_batch(self, smiles_list: List[str], include_3d: bool, columns: List[str],
+                    values: np.ndarray, errors: np.ndarray, features: Optional[List[str]] = None,
+                    strategies: Optional[np.ndarray] = None) -> None:
+        """Write descriptor rows for ``smiles_list`` into preallocated arrays"""
+        column_index = {name: i for i, name in enumerate(columns)}
+        
+        for row, smiles in enumerate(smiles_list):
+            try:
+                descriptors = self.calculate_descriptors(smiles, include_3d, features)
+            except ValueError as e:
+                errors[row] = str(e)
+                continue
+            finally:
+                if strategies is not None:
+                    strategies[row] = self.last_conformer_strategy
             
-            descriptors = {}
+            out = values[row]
+            for name, value in descriptors.items():
+                col = column_index.get(name)
+                if col is not None:
+                    out[col] = value
+    
+    def _fill_batch_parallel(self, smiles_list: List[str], include_3d: bool, values: np.ndarray,
+                             errors: np.ndarray, n_jobs: int, chunk_size: int,
+                             timeout: Optional[float], features: Optional[List[str]] = None,
+                             strategies: Optional[np.ndarray] = None) -> None:
+        """Fill descriptor rows using a process pool of calculator copies"""
+        def on_result(start: int, block: Tuple[np.ndarray, np.ndarray, np.ndarray, Optional[Dict]]) -> None:
+            block_values, block_errors, block_strategies, metrics = block
+            values[start:start + len(block_values)] = block_values
+            errors[start:start + len(block_errors)] = block_errors
+            if strategies is not None:
+                strategies[start:start + len(block_strategies)] = block_strategies
+            self.instrumentation.merge(metrics)
+        
+        def on_failure(index: int, message: str) -> None:
+            errors[index] = f"Error calculating descriptors: {message}"
+        
+        run_chunked(_calculate_chunk, smiles_list, on_result, on_failure,
+                    args=(include_3d, values.dtype, features), n_jobs=n_jobs, chunk_size=chunk_size,
+                    timeout=timeout, initializer=_init_worker_calculator, initargs=(self,))
+    
+    def calculate_fingerprint_matrix(self, smiles_list: Iterable[str], fp_type: str = 'morgan',
+                                     n_bits: int = 2048, radius: int = 2, output: str = 'packed',
+                                     n_jobs: int = 1, chunk_size: int = 1024
+                                     ) -> Tuple[Union[np.ndarray, sparse.csr_matrix], np.ndarray]:
+        """Calculate full fingerprint bit vectors for many SMILES
+        
+        Unlike the ``*_FP`` descriptors, which only count on-bits, this keeps
+        every bit: ``output='packed'`` returns a packed uint8 matrix (8 bits per
+        byte) and ``output='csr'`` a float32 CSR matrix that can be passed to
+        ``EnhancedQSARModel`` without densifying. Invalid rows are all zero and
+        reported in the returned error array.
+        """
+        if output not in ('packed', 'csr'):
+            raise ValueError(f"Invalid output format: {output}")
+        
+        smiles_list = list(smiles_list)
+        length = fingerprint_length(fp_type, n_bits)
+        
+        if n_jobs == 1:
+            packed, errors = calculate_packed_fingerprints(smiles_list, fp_type, n_bits, radius)
+        else:
+            packed = np.zeros((len(smiles_list), (length + 7) // 8), dtype=np.uint8)
+            errors = np.full(len(smiles_list), None, dtype=object)
             
-            # 2D descriptors
-            descriptors.update(self._calculate_2d_descriptors(mol))
+            def on_result(start: int, block: Tuple[np.ndarray, np.ndarray]) -> None:
+                packed[start:start + len(block[0])] = block[0]
+                errors[start:start + len(block[1])] = block[1]
             
-            # 3D descriptors (if requested and possible)
-            if include_3d:
-                try:
-                    descriptors.update(self._calculate_3d_descriptors(mol))
-                except Exception as e:
-                    print(f"Warning: Could not calculate 3D descriptors: {e}")
+            def on_failure(index: int, message: str) -> None:
+                errors[index] = f"Error calculating fingerprint: {message}"
             
-            # Fingerprints
-            descriptors.update(self._calculate_fingerprints(mol))
+            run_chunked(calculate_packed_fingerprints, smiles_list, on_result, on_failure,
+                        args=(fp_type, n_bits, radius), n_jobs=n_jobs, chunk_size=chunk_size)
+        
+        if output == 'csr':
+            return packed_to_csr(packed, length), errors
+        
+        return packed, errors
+    
+    def calculate_fragment_matrix(self, smiles_list: Iterable[str], names: Optional[List[str]] = None,
+                                  dtype: type = np.float32, n_jobs: int = 1,
+                                  chunk_size: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate fragment counts for many SMILES without building descriptor dicts
+        
+        Columns follow ``names`` (default: every ``fr_*`` descriptor in RDKit
+        order). Invalid rows are all zero and reported in the returned error array.
+        """
+        smiles_list = list(smiles_list)
+        names = list(names) if names is not None else self._fragment_order
+        
+        if n_jobs == 1:
+            return calculate_fragment_counts(smiles_list, names, dtype)
+        
+        counts = np.zeros((len(smiles_list), len(names)), dtype=dtype)
+        errors = np.full(len(smiles_list), None, dtype=object)
+        
+        def on_result(start: int, block: Tuple[np.ndarray, np.ndarray]) -> None:
+            counts[start:start + len(block[0])] = block[0]
+            errors[start:start + len(block[1])] = block[1]
+        
+        def on_failure(index: int, message: str) -> None:
+            errors[index] = f"Error calculating fragments: {message}"
+        
+        run_chunked(calculate_fragment_counts, smiles_list, on_result, on_failure,
+                    args=(names, dtype), n_jobs=n_jobs, chunk_size=chunk_size)
+        return counts, errors
+    
+    def calculate_descriptors(self, smiles: Union[str, MoleculeContext], include_3d: bool = True,
+                              features: Optional[List[str]] = None) -> Dict[str, float]:
+        """Calculate comprehensive molecular descriptors
+        
+        If ``features`` is given only those descriptors are returned, and only
+        the groups and individual functions they need are computed.
+        
+        ``smiles`` may also be a ``MoleculeContext``, whose parsed molecule and
+        memoized intermediates (conformers, fingerprints, ...) are reused.
+        """
+        self.last_conformer_strategy = None
+        self._last_conformer_result = None
+        
+        instrumentation = self.instrumentation
+        try:
+            if isinstance(smiles, MoleculeContext):
+                context = smiles
+            else:
+                with instrumentation.stage('parse'):
+                    mol = Chem.MolFromSmiles(smiles)
+                if mol is None:
+                    instrumentation.increment('invalid_smiles')
+                    raise ValueError(f"Invalid SMILES: {smiles}")
+                context = MoleculeContext(mol, smiles)
+            
+            plan = self.build_plan(features) if features is not None else None
             
-            # Fragment descriptors
-            descriptors.update(self._calculate_fragment_descriptors(mol))
+            # 3D descriptors are cached separately so toggling include_3d keeps the 2D entries
+            if plan is not None:
+                blocks = ['2d', '3d'] if plan.needs_3d and include_3d else ['2d']
+            else:
+                blocks = ['2d', '3d'] if include_3d else ['2d']
+            
+            descriptors = {}
+            canonical_smiles = context.canonical_smiles if self.cache is not None else None
+            for block in blocks:
+                cached = None
+                if canonical_smiles is not None:
+                    cached = self.cache.get(canonical_smiles, self._cache_block_name(block),
+                                            DESCRIPTOR_SET_VERSION)
+                    instrumentation.increment('cache', block=block, result='hit' if cached is not None else 'miss')
+                
+                if cached is not None:
+                    if block == '3d':
+                        self.last_conformer_strategy = 'cached'
+                    descriptors.update(cached)
+                elif plan is None:
+                    cached = self._calculate_block(context, block)
+                    # Results cut short by a conformer time budget are not reproducible
+                    budget_limited = (block == '3d' and self._last_conformer_result is not None
+                                      and not self._last_conformer_result.deterministic)
+                    if canonical_smiles is not None and not budget_limited:
+                        self.cache.put(canonical_smiles, self._cache_block_name(block),
+                                       DESCRIPTOR_SET_VERSION, cached)
+                    descriptors.update(cached)
+                else:
+                    # Partial blocks are never written to the cache
+                    descriptors.update(self._calculate_block(context, block, plan))
             
-            # E-state descriptors
-            descriptors.update(self._calculate_estate_descriptors(mol))
+            if plan is not None:
+                return {name: descriptors[name] for name in plan.feature_names if name in descriptors}
             
             return descriptors
             
         except Exception as e:
             raise ValueError(f"Error calculating descriptors: {e}")
     
-    def _calculate_2d_descriptors(self, mol: Chem.Mol) -> Dict[str, float]:
-        """Calculate 2D molecular descriptors"""
+    def _cache_block_name(self, block: str) -> str:
+        """Get the cache block name, including the conformer settings for 3D blocks"""
+        if block != '3d':
+            return block
+        
+        generator = self.conformer_generator
+        name = '3d'
+        if self.num_conformers > 1:
+            name += f":{self.num_conformers}:{self.conformer_aggregation}"
+        if generator.max_heavy_atoms is not None or generator.max_heavy_atoms_optimize is not None:
+            name += f":size{generator.max_heavy_atoms}/{generator.max_heavy_atoms_optimize}"
+        return name
+    
+    def _calculate_block(self, context: MoleculeContext, block: str,
+                         plan: Optional[DescriptorPlan] = None) -> Dict[str, float]:
+        """Calculate one cacheable descriptor block ('2d' or '3d'), optionally restricted by a plan"""
         descriptors = {}
+        groups = plan.groups if plan is not None else None
+        
+        def wanted(group: str) -> bool:
+            return groups is None or group in groups
         
-        # Basic descriptors
-        descriptors['MolWt'] = Descriptors.MolWt(mol)
-        descriptors['LogP'] = Descriptors.MolLogP(mol)
-        descriptors['NumHDonors'] = Descriptors.NumHDonors(mol)
-        descriptors['NumHAcceptors'] = Descriptors.NumHAcceptors(mol)
-        descriptors['TPSA'] = Descriptors.TPSA(mol)
-        descriptors['NumRotatableBonds'] = Descriptors.NumRotatableBonds(mol)
-        descriptors['NumAromaticRings'] = Descriptors.NumAromaticRings(mol)
-        descriptors['NumSaturatedRings'] = Descriptors.NumSaturatedRings(mol)
-        descriptors['FractionCsp3'] = Descriptors.FractionCsp3(mol)
-        descriptors['HeavyAtomCount'] = Descriptors.HeavyAtomCount(mol)
-        descriptors['RingCount'] = Descriptors.RingCount(mol)
-        descriptors['AromaticRings'] = Descriptors.NumAromaticRings(mol)
-        descriptors['SaturatedRings'] = Descriptors.NumSaturatedRings(mol)
-        descriptors['AliphaticRings'] = Descriptors.NumAliphaticRings(mol)
-        descriptors['NumRadicalElectrons'] = Descriptors.NumRadicalElectrons(mol)
-        descriptors['NumValenceElectrons'] = Descriptors.NumValenceElectrons(mol)
-        
-        # Charge descriptors
-        descriptors['MaxPartialCharge'] = Descriptors.MaxPartialCharge(mol)
-        descriptors['MinPartialCharge'] = Descriptors.MinPartialCharge(mol)
+        def names(group: str) -> Optional[List[str]]:
+            return None if groups is None else groups[group]
+        
+        if block == '3d':
+            # 3D descriptors (if possible)
+            if wanted('3d'):
+                try:
+                    with self.instrumentation.stage('3d'):
+                        descriptors.update(self._calculate_3d_descriptors(context, names('3d')))
+                except Exception as e:
+                    self.instrumentation.increment('descriptor_errors', group='3d')
+                    print(f"Warning: Could not calculate 3D descriptors: {e}")
+            return descriptors
+        
+        # 2D descriptors
+        if wanted('2d'):
+            with self.instrumentation.stage('2d'):
+                descriptors.update(self._calculate_2d_descriptors(context, names('2d')))
+        
+        # Fingerprints
+        if wanted('fingerprint'):
+            with self.instrumentation.stage('fingerprint'):
+                descriptors.update(self._calculate_fingerprints(context, names('fingerprint')))
+        
+        # Fragment descriptors
+        if wanted('fragment'):
+            with self.instrumentation.stage('fragment'):
+                descriptors.update(self._calculate_fragment_descriptors(context, names('fragment')))
         
         # E-state descriptors
-        descriptors['MaxEStateIndex'] = Descriptors.MaxEStateIndex(mol)
-        descriptors['MinEStateIndex'] = Descriptors.MinEStateIndex(mol)
-        descriptors['MaxAbsEStateIndex'] = Descriptors.MaxAbsEStateIndex(mol)
-        descriptors['MinAbsEStateIndex'] = Descriptors.MinAbsEStateIndex(mol)
+        if wanted('estate'):
+            with self.instrumentation.stage('estate'):
+                descriptors.update(self._calculate_estate_descriptors(context, names('estate')))
+        
+        return descriptors
+    
+    def _calculate_2d_descriptors(self, context: MoleculeContext, names: Optional[List[str]] = None) -> Dict[str, float]:
+        """Calculate 2D molecular descriptors
         
-        # Advanced descriptors
-        descriptors['qed'] = Descriptors.qed(mol)
-        descriptors['MolMR'] = Descriptors.MolMR(mol)
-        descriptors['LabuteASA'] = Descriptors.LabuteASA(mol)
+        Names that alias the same function (e.g. ``NumAromaticRings`` and
+        ``AromaticRings``) are computed once.
+        """
+        if names is None:
+            names = self.descriptor_names['2d']
         
+        descriptors = {}
+        for name in names:
+            function = DESCRIPTORS_2D[name]
+            descriptors[name] = context.get(('2d', function), lambda: function(context.mol))
         return descriptors
     
-    def _calculate_3d_descriptors(self, mol: Chem.Mol) -> Dict[str, float]:
-        """Calculate 3D molecular descriptors"""
+    def _calculate_3d_descriptors(self, context: MoleculeContext, names: Optional[List[str]] = None) -> Dict[str, float]:
+        """Calculate 3D molecular descriptors
+        
+        Shape descriptors (PMI, normalized PMI, plane of best fit) are computed
+        for every conformer in the ensemble and aggregated according to
+        ``conformer_aggregation``; WHIM, GETAWAY and 3D-MoRSE use the lowest
+        energy conformer. Everything is computed on the largest fragment, and
+        GETAWAY is skipped once the conformer time budget is used up.
+        """
         descriptors = {}
+        if names is None:
+            names = self.descriptor_names['3d']
+        
+        # Only compute the sub-blocks that were asked for, all from one ensemble
+        blocks = {block for block, pattern in DESCRIPTOR_3D_PATTERNS.items()
+                  if any(pattern.match(name) for name in names)}
         
-        # Generate 3D conformer
-        mol_3d = self._generate_3d_conformers(mol)
-        if mol_3d is None:
+        # Generate 3D conformers
+        mol_3d = self._generate_3d_conformers(context)
+        if mol_3d is None or mol_3d.GetNumConformers() == 0:
             return descriptors
+        start = time.perf_counter()
+        
+        energies = self._conformer_energies(mol_3d)
+        best_conf_id = mol_3d.GetConformers()[int(np.argmin(energies))].GetId() if energies is not None else -1
         
         # Plane of Best Fit and PMI
-        try:
-            descriptors.update(self._calculate_pmi_descriptors(mol_3d))
-        except:
-            pass
+        if 'pmi' in blocks:
+            try:
+                descriptors.update(self._calculate_pmi_descriptors(mol_3d, energies))
+            except:
+                pass
         
-        # WHIM descriptors
-        try:
-            whim = GetWHIM(mol_3d)
-            for i, val in enumerate(whim, 1):
-                descriptors[f'WHIM{i}'] = float(val)
-        except:
-            pass
+        # WHIM, GETAWAY and 3D-MoRSE return full vectors; keep only the requested positions
+        for block, function in (('whim', CalcWHIM), ('getaway', CalcGETAWAY), ('morse', CalcMORSE)):
+            if block not in blocks:
+                continue
+            
+            # GETAWAY grows steeply with atom count and cannot be interrupted
+            if block == 'getaway' and self._3d_budget_exhausted(start):
+                self.instrumentation.increment('descriptor_skipped', group='getaway')
+                continue
+            
+            prefix = DESCRIPTOR_3D_PREFIXES[block]
+            positions = [int(name[len(prefix):]) for name in names if DESCRIPTOR_3D_PATTERNS[block].match(name)]
+            try:
+                values = function(mol_3d, confId=best_conf_id)
+                for position in positions:
+                    if position <= len(values):
+                        descriptors[f'{prefix}{position}'] = float(values[position - 1])
+            except:
+                pass
         
-        # GETAWAY descriptors
-        try:
-            getaway = GetGETAWAY(mol_3d)
-            for i, val in enumerate(getaway, 1):
-                descriptors[f'GETAWAY{i}'] = float(val)
-        except:
-            pass
+        return descriptors
+    
+    def _3d_budget_exhausted(self, start: float) -> bool:
+        """Check whether the conformer time budget is used up for the current molecule
         
-        # 3D-MoRSE descriptors
-        try:
-            morse = Get3DMoRSE(mol_3d)
-            for i, val in enumerate(morse, 1):
-                descriptors[f'3DMoRSE{i}'] = float(val)
-        except:
-            pass
+        The budget covers conformer generation plus the 3D descriptors
+        computed since ``start``. Running out marks the conformer result as
+        budget-limited so the incomplete 3D block is not cached.
+        """
+        result = self._last_conformer_result
+        budget = self.conformer_generator.time_budget
+        if result is None or budget is None:
+            return False
+        if not result.deterministic:
+            return True
         
-        return descriptors
+        if result.elapsed + (time.perf_counter() - start) < budget:
+            return False
+        self._last_conformer_result = ConformerResult(result.mol, result.strategy + '+budget',
+                                                      result.elapsed, result.energies)
+        self.last_conformer_strategy = self._last_conformer_result.strategy
+        return True
     
-    def _generate_3d_conformers(self, mol: Chem.Mol, num_confs: int = 1) -> Optional[Chem.Mol]:
-        """Generate 3D conformers for a molecule"""
-        try:
-            # Add hydrogens
-            mol_h = Chem.AddHs(mol)
-            
-            # Generate conformers using ETKDG
-            AllChem.EmbedMultipleConfs(mol_h, numConfs=num_confs, randomSeed=42)
-            
-            # Optimize conformers
-            for conf_id in range(mol_h.GetNumConfs()):
-                try:
-                    AllChem.MMFFOptimizeMolecule(mol_h, confId=conf_id)
-                except:
-                    try:
-                        AllChem.UFFOptimizeMolecule(mol_h, confId=conf_id)
-                    except:
-                        pass
-            
-            return mol_h
-        except:
+    def _generate_3d_conformers(self, context: MoleculeContext) -> Optional[Chem.Mol]:
+        """Generate 3D conformers for a molecule within the generator's budget
+        
+        Force-field energies (kcal/mol) are stored on each conformer as the
+        ``energy`` property when optimization succeeds. The strategy used is
+        kept in ``last_conformer_strategy``. The ensemble is memoized on the
+        context, per generator.
+        """
+        def generate() -> ConformerResult:
+            try:
+                return self.conformer_generator.generate(largest_fragment(context.mol))
+            except Exception as e:
+                self.instrumentation.increment('descriptor_errors', group='conformer')
+                print(f"Warning: Could not generate conformers: {e}")
+                return ConformerResult(None, 'failed', 0.0)
+        
+        result = context.get(('conformers', self.conformer_generator), generate)
+        
+        self._last_conformer_result = result
+        self.last_conformer_strategy = result.strategy
+        return result.mol
+    
+    def _conformer_energies(self, mol: Chem.Mol) -> Optional[np.ndarray]:
+        """Get conformer energies in conformer order, or None if any are missing"""
+        conformers = mol.GetConformers()
+        if not all(conf.HasProp('energy') for conf in conformers):
             return None
+        return np.array([conf.GetDoubleProp('energy') for conf in conformers])
     
-    def _calculate_pmi_descriptors(self, mol: Chem.Mol) -> Dict[str, float]:
-        """Calculate Principal Moments of Inertia descriptors"""
+    def _conformer_weights(self, n_confs: int, energies: Optional[np.ndarray]) -> np.ndarray:
+        """Get aggregation weights for an ensemble of ``n_confs`` conformers"""
+        if energies is None or self.conformer_aggregation == 'mean':
+            return np.full(n_confs, 1.0 / n_confs)
+        
+        if self.conformer_aggregation == 'lowest':
+            weights = np.zeros(n_confs)
+            weights[np.argmin(energies)] = 1.0
+            return weights
+        
+        # Boltzmann weights relative to the lowest energy conformer
+        weights = np.exp(-(energies - energies.min()) / BOLTZMANN_RT)
+        return weights / weights.sum()
+    
+    def _calculate_pmi_descriptors(self, mol: Chem.Mol, energies: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """Calculate Principal Moments of Inertia descriptors over the conformer ensemble"""
         descriptors = {}
         
         try:
-            # Get 3D coordinates
-            conf = mol.GetConformer()
-            coords = []
-            for atom in mol.GetAtoms():
-                pos = conf.GetAtomPosition(atom.GetIdx())
-                coords.append([pos.x, pos.y, pos.z])
-            
-            coords = np.array(coords)
+            # Stacked 3D coordinates, shape (n_confs, n_atoms, 3)
+            coords = np.stack([conf.GetPositions() for conf in mol.GetConformers()])
+            weights = self._conformer_weights(len(coords), energies)
             
-            # Calculate PMI
-            pmi1, pmi2, pmi3 = self._calculate_principal_moments(coords)
+            # Calculate PMI and plane of best fit for all conformers at once
+            pmi = self._batch_principal_moments(coords)
+            total_pmi = pmi.sum(axis=1, keepdims=True)
+            pmi_norm = np.divide(pmi, total_pmi, out=np.full_like(pmi, np.nan), where=total_pmi > 0)
+            pbf = self._batch_plane_of_best_fit(coords)
             
-            # Store PMI values
-            descriptors['PMI1'] = pmi1
-            descriptors['PMI2'] = pmi2
-            descriptors['PMI3'] = pmi3
+            # Store aggregated PMI values
+            pmi1, pmi2, pmi3 = weights @ pmi
+            descriptors['PMI1'] = float(pmi1)
+            descriptors['PMI2'] = float(pmi2)
+            descriptors['PMI3'] = float(pmi3)
             
             # Normalized PMI values
-            total_pmi = pmi1 + pmi2 + pmi3
-            if total_pmi > 0:
-                descriptors['PMI1_norm'] = pmi1 / total_pmi
-                descriptors['PMI2_norm'] = pmi2 / total_pmi
-                descriptors['PMI3_norm'] = pmi3 / total_pmi
+            if np.isfinite(pmi_norm).all():
+                norm1, norm2, norm3 = weights @ pmi_norm
+                descriptors['PMI1_norm'] = float(norm1)
+                descriptors['PMI2_norm'] = float(norm2)
+                descriptors['PMI3_norm'] = float(norm3)
             
             # Plane of Best Fit
-            descriptors['PlaneOfBestFit'] = self._calculate_plane_of_best_fit(coords)
+            descriptors['PlaneOfBestFit'] = float(weights @ pbf)
             descriptors['PBF'] = descriptors['PlaneOfBestFit']
             
         except Exception as e:
+            self.instrumentation.increment('descriptor_errors', group='pmi')
             print(f"Warning: Could not calculate PMI descriptors: {e}")
         
         return descriptors
     
-    def _calculate_principal_moments(self, coords: np.ndarray) -> Tuple[float, float, float]:
-        """Calculate principal moments of inertia"""
+    def _batch_principal_moments(self, coords: np.ndarray) -> np.ndarray:
+        """Calculate principal moments (descending) for stacked coordinates of shape (n_confs, n_atoms, 3)"""
         # Center coordinates
-        centered = coords - np.mean(coords, axis=0)
+        centered = coords - coords.mean(axis=1, keepdims=True)
         
-        # Calculate inertia tensor
-        inertia = np.zeros((3, 3))
-        for coord in centered:
-            x, y, z = coord
-            inertia[0, 0] += y**2 + z**2
-            inertia[1, 1] += x**2 + z**2
-            inertia[2, 2] += x**2 + y**2
-            inertia[0, 1] = inertia[1, 0] -= x * y
-            inertia[0, 2] = inertia[2, 0] -= x * z
-            inertia[1, 2] = inertia[2, 1] -= y * z
+        # Inertia tensors: I = sum(r.r) * E - sum(r r^T), one per conformer
+        outer = np.einsum('cai,caj->cij', centered, centered)
+        trace = np.einsum('cii->c', outer)
+        inertia = trace[:, None, None] * np.eye(3) - outer
         
-        # Get eigenvalues (principal moments)
-        eigenvals = np.linalg.eigvals(inertia)
-        eigenvals = np.sort(eigenvals)[::-1]  # Sort in descending order
+        # Eigenvalues (principal moments), sorted in descending order
+        return np.linalg.eigvalsh(inertia)[:, ::-1]
+    
+    def _batch_plane_of_best_fit(self, coords: np.ndarray) -> np.ndarray:
+        """Calculate the mean atom distance to the best-fit plane for stacked coordinates"""
+        centered = coords - coords.mean(axis=1, keepdims=True)
+        
+        # The plane normal is the direction of least variance
+        _, vectors = np.linalg.eigh(np.einsum('cai,caj->cij', centered, centered))
+        normal = vectors[:, :, 0]
         
-        return float(eigenvals[0]), float(eigenvals[1]), float(eigenvals[2])
+        return np.abs(np.einsum('cai,ci->ca', centered, normal)).mean(axis=1)
+    
+    def _calculate_principal_moments(self, coords: np.ndarray) -> Tuple[float, float, float]:
+        """Calculate principal moments of inertia"""
+        pmi1, pmi2, pmi3 = self._batch_principal_moments(coords[np.newaxis])[0]
+        return float(pmi1), float(pmi2), float(pmi3)
     
     def _calculate_plane_of_best_fit(self, coords: np.ndarray) -> float:
         """Calculate plane of best fit descriptor"""
         try:
-            # Center coordinates
-            centered = coords - np.mean(coords, axis=0)
-            
-            # SVD to find best fit plane
-            U, S, Vt = np.linalg.svd(centered)
-            
-            # Normal vector to best fit plane
-            normal = Vt[2, :]
-            
-            # Calculate average distance to plane
-            distances = np.abs(np.dot(centered, normal))
-            avg_distance = np.mean(distances)
-            
-            return float(avg_distance)
+            return float(self._batch_plane_of_best_fit(coords[np.newaxis])[0])
         except:
             return 0.0
     
-    def _calculate_fingerprints(self, mol: Chem.Mol) -> Dict[str, float]:
+    def _calculate_fingerprints(self, context: MoleculeContext, names: Optional[List[str]] = None) -> Dict[str, float]:
         """Calculate molecular fingerprints"""
         descriptors = {}
+        if names is None:
+            names = self.descriptor_names['fingerprint']
         
-        try:
-            # Morgan fingerprints
-            morgan_fp = rdMolDescriptors.GetMorganFingerprintAsBitVect(mol, 2)
-            descriptors['Morgan_FP'] = float(morgan_fp.GetNumOnBits())
-            
-            # Atom pair fingerprints
-            atompair_fp = rdMolDescriptors.GetAtomPairFingerprintAsBitVect(mol)
-            descriptors['AtomPair_FP'] = float(atompair_fp.GetNumOnBits())
-            
-            # Torsion fingerprints
-            torsion_fp = rdMolDescriptors.GetTopologicalTorsionFingerprintAsBitVect(mol)
-            descriptors['Torsion_FP'] = float(torsion_fp.GetNumOnBits())
-            
-            # MACCS keys
-            maccs_fp = rdMolDescriptors.GetMACCSKeysFingerprint(mol)
-            descriptors['MACCS_FP'] = float(maccs_fp.GetNumOnBits())
-            
-            # RDKit fingerprints
-            rdkit_fp = Chem.RDKFingerprint(mol)
-            descriptors['RDKit_FP'] = float(rdkit_fp.GetNumOnBits())
-            
-            # Pattern fingerprints
-            pattern_fp = Chem.PatternFingerprint(mol)
-            descriptors['Pattern_FP'] = float(pattern_fp.GetNumOnBits())
-            
-            # Higher order Morgan fingerprints
-            morgan2_fp = rdMolDescriptors.GetMorganFingerprintAsBitVect(mol, 3)
-            descriptors['Morgan2_FP'] = float(morgan2_fp.GetNumOnBits())
-            morgan3_fp = rdMolDescriptors.GetMorganFingerprintAsBitVect(mol, 4)
-            descriptors['Morgan3_FP'] = float(morgan3_fp.GetNumOnBits())
-            
-        except Exception as e:
-            print(f"Warning: Could not calculate fingerprints: {e}")
+        # A failing fingerprint only leaves its own column empty
+        for name in names:
+            try:
+                descriptors[name] = float(context.fingerprint(name, FINGERPRINT_FUNCTIONS[name]).GetNumOnBits())
+            except Exception as e:
+                self.instrumentation.increment('descriptor_errors', group='fingerprint')
+                print(f"Warning: Could not calculate {name}: {e}")
         
         return descriptors
     
-    def _calculate_fragment_descriptors(self, mol: Chem.Mol) -> Dict[str, float]:
+    def _calculate_fragment_descriptors(self, context: MoleculeContext, names: Optional[List[str]] = None) -> Dict[str, float]:
         """Calculate fragment-based descriptors"""
         descriptors = {}
         
         try:
-            # Get fragment descriptors
-            frag_descriptors = Descriptors._descList
+            # Count all requested fragments in one prefiltered pass
+            if names is None:
+                names = self._fragment_order
             
-            for desc_name, desc_func in frag_descriptors:
-                if desc_name.startswith('fr_'):
-                    try:
-                        value = desc_func(mol)
-                        descriptors[desc_name] = float(value)
-                    except:
-                        descriptors[desc_name] = 0.0
-                        
+            counts = self.fragment_matcher.count(context.mol, [name for name in names if name in self.fragment_matcher])
+            for desc_name in names:
+                descriptors[desc_name] = float(counts.get(desc_name, 0))
+                    
         except Exception as e:
+            self.instrumentation.increment('descriptor_errors', group='fragment')
             print(f"Warning: Could not calculate fragment descriptors: {e}")
         
         return descriptors
     
-    def _calculate_estate_descriptors(self, mol: Chem.Mol) -> Dict[str, float]:
+    def _calculate_estate_descriptors(self, context: MoleculeContext, names: Optional[List[str]] = None) -> Dict[str, float]:
         """Calculate E-state descriptors"""
         descriptors = {}
         
         try:
             # EState VSA descriptors
-            estate_vsa = rdMolDescriptors.EState_VSA_(mol)
+            estate_vsa = EState_VSA_(context.mol)
             for i, val in enumerate(estate_vsa, 1):
                 descriptors[f'EState_VSA{i}'] = float(val)
+            
+            if names is not None:
+                descriptors = {name: descriptors[name] for name in names if name in descriptors}
                 
         except Exception as e:
+            self.instrumentation.increment('descriptor_errors', group='estate')
             print(f"Warning: Could not calculate E-state descriptors: {e}")
         
         return descriptors
@@ -405,13 +855,50 @@ class EnhancedDescriptors:
         }
         return info
 
+# Process-pool workers
+_worker_calculator = None
+
+def _init_worker_calculator(calculator: EnhancedDescriptors) -> None:
+    """Install the calculator used by descriptor worker processes"""
+    global _worker_calculator
+    _worker_calculator = calculator
+    # Workers ship only the metrics they record themselves back to the parent
+    calculator.instrumentation.reset()
+
+def _calculate_chunk(smiles_chunk: List[str], include_3d: bool, dtype: type,
+                     features: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Optional[Dict]]:
+    """Calculate a chunk of descriptor rows (plus the metrics recorded for it) inside a worker process"""
+    calculator = _worker_calculator or EnhancedDescriptors()
+    # The parent already standardized and deduplicated the batch
+    values, errors, strategies = calculator.calculate_batch(smiles_chunk, include_3d, dtype=dtype,
+                                                            features=features, return_strategies=True,
+                                                            standardize=False)
+    return values, errors, strategies, calculator.instrumentation.collect()
+
+_shared_calculator = None
+
 # Convenience function
-def calculate_molecular_descriptors(smiles: str, include_3d: bool = True) -> Dict[str, float]:
-    """Calculate molecular descriptors for a SMILES string"""
-    calculator = EnhancedDescriptors()
-    return calculator.calculate_descriptors(smiles, include_3d)
+def get_descriptor_calculator() -> EnhancedDescriptors:
+    """Get the process-wide default calculator, creating it on first use
+    
+    The calculator keeps per-call state, so threads should create their own.
+    """
+    global _shared_calculator
+    if _shared_calculator is None:
+        _shared_calculator = EnhancedDescriptors()
+    return _shared_calculator
+
+def calculate_molecular_descriptors(smiles: Union[str, MoleculeContext], include_3d: bool = True) -> Dict[str, float]:
+    """Calculate molecular descriptors for a SMILES string or molecule context"""
+    return get_descriptor_calculator().calculate_descriptors(smiles, include_3d)
 
 def get_descriptor_information() -> Dict[str, Dict[str, str]]:
     """Get information about available descriptors"""
-    calculator = EnhancedDescriptors()
-    return calculator.get_descriptor_info() 
\ No newline at end of file
+    return get_descriptor_calculator().get_descriptor_info()
+
+def calculate_descriptor_matrix(smiles_list: Iterable[str], include_3d: bool = True,
+                                as_frame: bool = True, n_jobs: int = 1, standardize: bool = False
+                                ) -> Tuple[Union[np.ndarray, pd.DataFrame], np.ndarray]:
+    """Calculate a column-stable descriptor matrix for a list of SMILES"""
+    return get_descriptor_calculator().calculate_batch(smiles_list, include_3d, as_frame=as_frame, n_jobs=n_jobs,
+                                                       standardize=standardize)
\ No newline at end of file
@@ -5,31 +5,100 @@ Advanced machine learning and statistical modeling for molecular properties
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from typing import Dict, List, Optional, Tuple, Union, Any
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, RandomizedSearchCV
+from sklearn.model_selection import train_test_split, cross_val_score, cross_val_predict, check_cv, GridSearchCV, RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier, GradientBoostingRegressor, GradientBoostingClassifier
-from sklearn.linear_model import LinearRegression, LogisticRegression, Ridge, Lasso, ElasticNet
+from sklearn.linear_model import LinearRegression, LogisticRegression, Ridge, Lasso, ElasticNet, SGDRegressor, SGDClassifier
 from sklearn.svm import SVR, SVC
 from sklearn.neural_network import MLPRegressor, MLPClassifier
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, classification_report, roc_auc_score
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.pipeline import Pipeline
-from sklearn.feature_selection import SelectKBest, f_regression, f_classif, RFE
+from sklearn.feature_selection import SelectKBest, f_regression, f_classif, RFE, RFECV
+from sklearn.base import clone
+from scipy import stats
 import joblib
 import json
 import os
+import tracemalloc
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 
+from .applicability_domain import ApplicabilityDomain
+from .enhanced_descriptors import DESCRIPTOR_SET_VERSION
+from .fast_inference import COMPILABLE_MODELS, DEFAULT_BATCH_SIZE, CompiledForest
+from .instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from .model_artifact import FixedFeatureMask, is_artifact, read_artifact, write_artifact
+from .parallel import shared_array
+from .streaming import ShardDataset
+
+TUNING_METHODS = ['grid', 'random', 'halving']
+
+# Upper bound and minimum gain for warm-started n_estimators growth
+MAX_ESTIMATORS = 800
+GROWTH_TOLERANCE = 1e-3
+
+# Bytes of float64 columns upcast at a time when scoring features for selection
+SCORE_BLOCK_BYTES = 64 * 1024 * 1024
+
+def f_regression_blocked(X: Union[np.ndarray, sparse.spmatrix], y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """``f_regression`` that upcasts dense float32 input a block of columns at a time
+    
+    sklearn's ``f_regression`` converts the whole matrix to float64 first.
+    """
+    if sparse.issparse(X) or X.dtype == np.float64:
+        return f_regression(X, y)
+    
+    y = np.asarray(y, dtype=np.float64)
+    y_centered = y - y.mean()
+    y_norm = np.linalg.norm(y_centered)
+    n_samples = X.shape[0]
+    block_columns = max(1, SCORE_BLOCK_BYTES // (8 * max(n_samples, 1)))
+    
+    correlation = np.empty(X.shape[1])
+    for start in range(0, X.shape[1], block_columns):
+        block = np.asarray(X[:, start:start + block_columns], dtype=np.float64)
+        means = block.mean(axis=0)
+        norms = np.sqrt(np.einsum('ij,ij->j', block, block) - n_samples * means ** 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation[start:start + block.shape[1]] = y_centered @ block / norms / y_norm
+    correlation[np.isnan(correlation)] = 0.0
+    
+    degrees_of_freedom = y.size - 2
+    correlation_squared = correlation ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_statistic = correlation_squared / (1 - correlation_squared) * degrees_of_freedom
+        p_values = stats.f.sf(f_statistic, 1, degrees_of_freedom)
+    
+    f_statistic[np.isinf(f_statistic)] = np.finfo(f_statistic.dtype).max
+    not_finite = np.isnan(f_statistic)
+    f_statistic[not_finite] = 0.0
+    p_values[not_finite] = 1.0
+    return f_statistic, p_values
+
 class EnhancedQSARModel:
     """Enhanced QSAR model with advanced features"""
     
-    def __init__(self, model_type: str = 'random_forest', task_type: str = 'regression'):
+    def __init__(self, model_type: str = 'random_forest', task_type: str = 'regression',
+                 dtype: Optional[type] = np.float32, track_memory: bool = False,
+                 instrumentation: Optional[Instrumentation] = None):
         self.model_type = model_type
         self.task_type = task_type
+        self.dtype = dtype
+        self.track_memory = track_memory
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
         self.model = None
         self.scaler = StandardScaler()
         self.feature_selector = None
+        self.applicability_domain = None
+        self.calibration_residuals = None
+        self._uncertainty_forest = None
         self.feature_names = None
+        self.input_feature_names = None
+        self.descriptor_set_version = DESCRIPTOR_SET_VERSION
         self.training_history = {}
         self.best_params = {}
         self.cv_scores = []
@@ -44,14 +113,16 @@ class EnhancedQSARModel:
                 'lasso': Lasso,
                 'elastic_net': ElasticNet,
                 'svr': SVR,
-                'neural_network': MLPRegressor
+                'neural_network': MLPRegressor,
+                'sgd': SGDRegressor
             },
             'classification': {
                 'random_forest': RandomForestClassifier,
                 'gradient_boosting': GradientBoostingClassifier,
                 'logistic': LogisticRegression,
                 'svc': SVC,
-                'neural_network': MLPClassifier
+                'neural_network': MLPClassifier,
+                'sgd': SGDClassifier
             }
         }
     
@@ -66,27 +137,97 @@ class EnhancedQSARModel:
         model_class = self.model_registry[self.task_type][self.model_type]
         return model_class(**kwargs)
     
-    def prepare_data(self, X: pd.DataFrame, y: pd.Series, test_size: float = 0.2, random_state: int = 42) -> Tuple:
-        """Prepare data for training"""
-        # Store feature names
-        self.feature_names = X.columns.tolist()
+    def _as_features(self, X: Union[pd.DataFrame, np.ndarray, sparse.spmatrix]) -> Union[np.ndarray, sparse.spmatrix]:
+        """Convert features to the model's dtype, copying only when needed
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state, stratify=y if self.task_type == 'classification' else None
-        )
+        Dense inputs become C-contiguous ``self.dtype`` arrays (float32 by
+        default, which tree ensembles use natively); ``dtype=None`` keeps them
+        as they are.
+        """
+        if self.dtype is None:
+            return X.to_numpy() if hasattr(X, 'to_numpy') else X
+        if sparse.issparse(X):
+            return X.tocsr().astype(self.dtype, copy=False)
+        if hasattr(X, 'to_numpy'):
+            return np.ascontiguousarray(X.to_numpy(dtype=self.dtype))
+        return np.ascontiguousarray(X, dtype=self.dtype)
+    
+    @contextmanager
+    def _stage(self, name: str):
+        """Time a stage through ``instrumentation`` and record its peak traced memory
+        (when ``track_memory`` is set)
         
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        Only allocations in this process are seen, not those of joblib workers.
+        """
+        if not self.track_memory:
+            with self.instrumentation.stage(name):
+                yield
+            return
+        
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            with self.instrumentation.stage(name):
+                yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            if started:
+                tracemalloc.stop()
+            self.training_history.setdefault('memory', {})[name] = max(0, peak - baseline)
+    
+    def prepare_data(self, X: Union[pd.DataFrame, np.ndarray, sparse.spmatrix], y: pd.Series,
+                     test_size: float = 0.2, random_state: int = 42,
+                     feature_names: Optional[List[str]] = None) -> Tuple:
+        """Prepare data for training
+        
+        ``X`` may be a sparse matrix (e.g. fingerprint bits from
+        ``EnhancedDescriptors.calculate_fingerprint_matrix(output='csr')``); it
+        then stays sparse and is scaled without centering. The split copies are
+        scaled in place, in ``self.dtype``.
+        """
+        # Store feature names
+        if feature_names is not None:
+            self.feature_names = list(feature_names)
+        elif hasattr(X, 'columns'):
+            self.feature_names = X.columns.tolist()
+        self.input_feature_names = list(self.feature_names) if self.feature_names else None
+        
+        with self._stage('prepare_data'):
+            X = self._as_features(X)
+            
+            # Centering would densify sparse inputs
+            if sparse.issparse(X):
+                self.scaler = StandardScaler(with_mean=False)
+            
+            # Split data
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=random_state, stratify=y if self.task_type == 'classification' else None
+            )
+            
+            # Scale features (the split already made private copies)
+            self.scaler.fit(X_train)
+            X_train_scaled = self.scaler.transform(X_train, copy=False)
+            X_test_scaled = self.scaler.transform(X_test, copy=False)
         
         return X_train_scaled, X_test_scaled, y_train, y_test
     
-    def feature_selection(self, X: np.ndarray, y: np.ndarray, method: str = 'kbest', k: int = 100) -> np.ndarray:
-        """Perform feature selection"""
+    def feature_selection(self, X: np.ndarray, y: np.ndarray, method: str = 'kbest', k: int = 100,
+                          step: Union[int, float, List[int]] = 1, cv: int = 5, n_jobs: int = -1) -> np.ndarray:
+        """Perform feature selection
+        
+        For ``rfe``/``rfecv``, ``step`` is the number (int, default 1) or fraction (float) of
+        remaining features dropped per refit, or for ``rfe`` an explicit schedule
+        of feature counts to step through (e.g. ``[150, 100, 75]``) before ``k``.
+        """
+        if self.feature_names and self.input_feature_names is None:
+            self.input_feature_names = list(self.feature_names)
+        
         if method == 'kbest':
             if self.task_type == 'regression':
-                self.feature_selector = SelectKBest(score_func=f_regression, k=min(k, X.shape[1]))
+                self.feature_selector = SelectKBest(score_func=f_regression_blocked, k=min(k, X.shape[1]))
             else:
                 self.feature_selector = SelectKBest(score_func=f_classif, k=min(k, X.shape[1]))
             
@@ -99,11 +240,26 @@ class EnhancedQSARModel:
             
             return X_selected
         
-        elif method == 'rfe':
+        elif method in ('rfe', 'rfecv'):
             # Recursive feature elimination
             base_model = self.create_model()
-            self.feature_selector = RFE(base_model, n_features_to_select=k)
-            X_selected = self.feature_selector.fit_transform(X, y)
+            if method == 'rfecv':
+                # The number of features is chosen by cross-validation; ``k`` is ignored
+                self.feature_selector = RFECV(base_model, step=step, cv=cv, scoring=self._get_scoring(),
+                                              n_jobs=n_jobs)
+                X_selected = self.feature_selector.fit_transform(X, y)
+            elif isinstance(step, (list, tuple)):
+                if 'n_jobs' in base_model.get_params():
+                    base_model.set_params(n_jobs=n_jobs)
+                self.feature_selector = FixedFeatureMask(
+                    self._eliminate_by_schedule(base_model, X, y, list(step) + [k]))
+                X_selected = self.feature_selector.transform(X)
+            else:
+                # RFE refits sequentially, so parallelize inside the estimator instead
+                if 'n_jobs' in base_model.get_params():
+                    base_model.set_params(n_jobs=n_jobs)
+                self.feature_selector = RFE(base_model, n_features_to_select=min(k, X.shape[1]), step=step)
+                X_selected = self.feature_selector.fit_transform(X, y)
             
             # Update feature names
             if self.feature_names and hasattr(self.feature_selector, 'get_support'):
@@ -114,28 +270,174 @@ class EnhancedQSARModel:
         
         return X
     
-    def hyperparameter_tuning(self, X: np.ndarray, y: np.ndarray, method: str = 'grid', cv: int = 5) -> Dict:
-        """Perform hyperparameter tuning"""
+    def _eliminate_by_schedule(self, estimator: Any, X: np.ndarray, y: np.ndarray,
+                               schedule: List[int]) -> np.ndarray:
+        """Drop the least important features down to each count of a schedule in turn"""
+        mask = np.ones(X.shape[1], dtype=bool)
+        for count in sorted({count for count in schedule if count < X.shape[1]}, reverse=True):
+            indices = np.flatnonzero(mask)
+            fitted = clone(estimator).fit(X[:, indices], y)
+            if hasattr(fitted, 'feature_importances_'):
+                importances = fitted.feature_importances_
+            elif hasattr(fitted, 'coef_'):
+                coef = np.abs(fitted.coef_)
+                importances = coef.sum(axis=0) if coef.ndim > 1 else coef
+            else:
+                raise ValueError(f"Model type {self.model_type} has no feature importances for RFE")
+            
+            mask = np.zeros(X.shape[1], dtype=bool)
+            mask[indices[np.argsort(-importances, kind='stable')[:count]]] = True
+        
+        return mask
+    
+    def hyperparameter_tuning(self, X: np.ndarray, y: np.ndarray, method: str = 'grid', cv: int = 5,
+                              n_jobs: int = -1, history_path: Optional[str] = None) -> Dict:
+        """Perform hyperparameter tuning
+        
+        ``method='halving'`` runs successive halving over training-set size and
+        then grows ``n_estimators`` for forests and boosting by warm starting
+        (out-of-bag score for forests, early stopping for boosting) instead of
+        searching over it. With ``history_path`` the best parameters of each run
+        are persisted, and later runs only search the neighbourhood of the
+        previous optimum.
+        """
+        if method not in TUNING_METHODS:
+            raise ValueError(f"Invalid tuning method: {method}")
+        
+        history = self._load_search_history(history_path) if history_path else {}
+        history_key = f"{self.task_type}:{self.model_type}"
+        previous = history.get(history_key, [])
+        
         base_model = self.create_model()
+        space = self._get_param_grid() if method == 'grid' else self._get_param_distributions()
+        grow_estimators = method == 'halving' and self.model_type in ('random_forest', 'gradient_boosting')
+        if grow_estimators:
+            space = {name: values for name, values in space.items() if name != 'n_estimators'}
         
-        if method == 'grid':
-            param_grid = self._get_param_grid()
-            search = GridSearchCV(base_model, param_grid, cv=cv, scoring=self._get_scoring(), n_jobs=-1)
-        elif method == 'random':
-            param_distributions = self._get_param_distributions()
-            search = RandomizedSearchCV(base_model, param_distributions, cv=cv, scoring=self._get_scoring(), n_jobs=-1, n_iter=100)
+        seeded = bool(previous)
+        if seeded:
+            space = self._neighbourhood_grid(space, previous[-1]['best_params'])
+        
+        scoring = self._get_scoring()
+        if method == 'halving':
+            if seeded or not space:
+                search = HalvingGridSearchCV(base_model, space, cv=cv, scoring=scoring, n_jobs=n_jobs,
+                                             factor=3, random_state=42)
+            else:
+                search = HalvingRandomSearchCV(base_model, space, cv=cv, scoring=scoring, n_jobs=n_jobs,
+                                               factor=3, random_state=42)
+        elif method == 'grid' or seeded:
+            search = GridSearchCV(base_model, space, cv=cv, scoring=scoring, n_jobs=n_jobs)
         else:
-            raise ValueError(f"Invalid tuning method: {method}")
+            search = RandomizedSearchCV(base_model, space, cv=cv, scoring=scoring, n_jobs=n_jobs, n_iter=100)
         
         search.fit(X, y)
-        self.best_params = search.best_params_
+        best_params = dict(search.best_params_)
+        
+        if grow_estimators:
+            best_params['n_estimators'] = self._grow_estimators(X, y, best_params, n_jobs)
+        
+        self.best_params = best_params
+        
+        if history_path:
+            previous.append({
+                'best_params': {name: self._to_json_value(value) for name, value in best_params.items()},
+                'best_score': float(search.best_score_),
+                'method': method,
+                'n_samples': int(X.shape[0]),
+                'n_features': int(X.shape[1]),
+                'date': datetime.now().isoformat()
+            })
+            history[history_key] = previous
+            self._save_search_history(history_path, history)
         
         return {
-            'best_params': search.best_params_,
+            'best_params': best_params,
             'best_score': search.best_score_,
-            'cv_results': search.cv_results_
+            'cv_results': search.cv_results_,
+            'method': method,
+            'seeded_from_history': seeded
         }
     
+    def _grow_estimators(self, X: np.ndarray, y: np.ndarray, params: Dict, n_jobs: int = -1) -> int:
+        """Find ``n_estimators`` by growing a single warm-started ensemble"""
+        params = {name: value for name, value in params.items() if name != 'n_estimators'}
+        
+        if self.model_type == 'gradient_boosting':
+            # Boosting stops by itself once the held-out score stops improving
+            model = self.create_model(n_estimators=MAX_ESTIMATORS, n_iter_no_change=10,
+                                      validation_fraction=0.1, random_state=42, **params)
+            model.fit(X, y)
+            return int(model.n_estimators_)
+        
+        # Forests: double the number of trees while the out-of-bag score improves
+        model = self.create_model(n_estimators=50, warm_start=True, oob_score=True, bootstrap=True,
+                                  random_state=42, n_jobs=n_jobs, **params)
+        best_n_estimators, best_score = 50, -np.inf
+        n_estimators = 50
+        while n_estimators <= MAX_ESTIMATORS:
+            model.set_params(n_estimators=n_estimators)
+            model.fit(X, y)
+            if model.oob_score_ <= best_score + GROWTH_TOLERANCE:
+                break
+            best_n_estimators, best_score = n_estimators, model.oob_score_
+            n_estimators *= 2
+        
+        return best_n_estimators
+    
+    def _neighbourhood_grid(self, space: Dict, best_params: Dict) -> Dict:
+        """Restrict a search space to the previous optimum and its neighbours"""
+        grid = {}
+        for name, values in space.items():
+            values = list(values)
+            best = self._from_json_value(best_params[name]) if name in best_params else None
+            if name not in best_params:
+                grid[name] = values
+            elif best in values:
+                index = values.index(best)
+                grid[name] = values[max(0, index - 1):index + 2]
+            else:
+                grid[name] = [best]
+        return grid
+    
+    @staticmethod
+    def _to_json_value(value: Any) -> Any:
+        """Convert a parameter value to a JSON-serializable value"""
+        if isinstance(value, tuple):
+            return list(value)
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+    
+    @staticmethod
+    def _from_json_value(value: Any) -> Any:
+        """Convert a JSON parameter value back (lists were tuples)"""
+        return tuple(value) if isinstance(value, list) else value
+    
+    @staticmethod
+    def _load_search_history(history_path: str) -> Dict:
+        """Load the persisted search history, or an empty one"""
+        if not os.path.exists(history_path):
+            return {}
+        
+        try:
+            with open(history_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read search history {history_path}: {e}")
+            return {}
+    
+    @staticmethod
+    def _save_search_history(history_path: str, history: Dict) -> None:
+        """Persist the search history atomically"""
+        directory = os.path.dirname(os.path.abspath(history_path))
+        os.makedirs(directory, exist_ok=True)
+        
+        temporary_path = f"{history_path}.tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump(history, f, indent=2)
+        os.replace(temporary_path, history_path)
+    
     def _get_param_grid(self) -> Dict:
         """Get parameter grid for hyperparameter tuning"""
         if self.model_type == 'random_forest':
@@ -198,29 +500,63 @@ class EnhancedQSARModel:
             return 'accuracy'
     
     def train(self, X: np.ndarray, y: np.ndarray, feature_selection: bool = True, 
-              hyperparameter_tuning: bool = True, cv: int = 5) -> Dict:
-        """Train the QSAR model"""
-        # Feature selection
-        if feature_selection:
-            X = self.feature_selection(X, y)
-        
-        # Hyperparameter tuning
-        if hyperparameter_tuning:
-            tuning_results = self.hyperparameter_tuning(X, y, cv=cv)
-            self.training_history['tuning'] = tuning_results
-        
-        # Create and train final model
-        if self.best_params:
-            self.model = self.create_model(**self.best_params)
-        else:
-            self.model = self.create_model()
+              hyperparameter_tuning: bool = True, cv: int = 5, tuning_method: str = 'grid',
+              history_path: Optional[str] = None, selection_method: str = 'kbest',
+              n_jobs: int = -1, applicability_domain: bool = True,
+              selection_step: Union[int, float, List[int]] = 1) -> Dict:
+        """Train the QSAR model
         
-        # Cross-validation
-        cv_scores = cross_val_score(self.model, X, y, cv=cv, scoring=self._get_scoring())
-        self.cv_scores = cv_scores.tolist()
+        ``n_jobs`` applies to every stage: feature selection, tuning and
+        cross-validation. Parallel stages share one read-only memory-mapped
+        copy of the feature matrix. With ``track_memory`` set, the peak memory
+        of each stage is stored in ``training_history['memory']`` (bytes).
         
-        # Final training
-        self.model.fit(X, y)
+        With ``applicability_domain`` the training-set statistics used by
+        ``predict(..., return_domain=True)`` are computed (dense features only).
+        ``selection_step`` is passed to ``feature_selection`` as ``step``.
+        """
+        X = self._as_features(X)
+        y = np.asarray(y)
+        
+        with ExitStack() as shared:
+            X = shared.enter_context(shared_array(X, n_jobs))
+            
+            # Feature selection
+            if feature_selection:
+                with self._stage('feature_selection'):
+                    X = self.feature_selection(X, y, method=selection_method, step=selection_step,
+                                               cv=cv, n_jobs=n_jobs)
+                X = shared.enter_context(shared_array(X, n_jobs))
+            
+            # Hyperparameter tuning
+            if hyperparameter_tuning:
+                with self._stage('hyperparameter_tuning'):
+                    tuning_results = self.hyperparameter_tuning(X, y, method=tuning_method, cv=cv,
+                                                                n_jobs=n_jobs, history_path=history_path)
+                self.training_history['tuning'] = tuning_results
+            
+            # Create and train final model
+            if self.best_params:
+                self.model = self.create_model(**self.best_params)
+            else:
+                self.model = self.create_model()
+            
+            # Cross-validation
+            with self._stage('cross_validation'):
+                if self.task_type == 'regression':
+                    cv_scores = self._cross_validate_residuals(X, y, cv, n_jobs)
+                else:
+                    cv_scores = cross_val_score(self.model, X, y, cv=cv, scoring=self._get_scoring(), n_jobs=n_jobs)
+            self.cv_scores = cv_scores.tolist()
+            
+            # Final training
+            with self._stage('fit'):
+                self.model.fit(X, y)
+            
+            # Applicability domain statistics
+            if applicability_domain:
+                with self._stage('applicability_domain'):
+                    self.fit_applicability_domain(X)
         
         # Training history
         self.training_history['cv_scores'] = self.cv_scores
@@ -235,19 +571,235 @@ class EnhancedQSARModel:
             'feature_names': self.feature_names
         }
     
-    def predict(self, X: np.ndarray) -> np.ndarray:
-        """Make predictions"""
+    def _cross_validate_residuals(self, X: Union[np.ndarray, sparse.spmatrix], y: np.ndarray, cv: int,
+                                  n_jobs: int) -> np.ndarray:
+        """Cross-validate a regressor from out-of-fold predictions
+        
+        Fold scores equal ``cross_val_score``'s (negative MSE on the same
+        splits); the sorted absolute out-of-fold residuals are kept in
+        ``calibration_residuals`` for conformal intervals.
+        """
+        splits = list(check_cv(cv, y, classifier=False).split(X, y))
+        predictions = cross_val_predict(self.model, X, y, cv=splits, n_jobs=n_jobs)
+        self.calibration_residuals = np.sort(np.abs(y - predictions))
+        return np.array([-mean_squared_error(y[test], predictions[test]) for _, test in splits])
+    
+    def train_streaming(self, data: Union[str, List[str], ShardDataset], epochs: int = 5,
+                        validation_data: Optional[Union[str, List[str], ShardDataset]] = None,
+                        classes: Optional[np.ndarray] = None, random_state: int = 42,
+                        **model_params) -> Dict:
+        """Train out of core from descriptor shards on disk
+        
+        The scaler is fitted with one ``partial_fit`` pass, then the estimator
+        (``sgd`` or ``neural_network``) is trained with ``partial_fit`` for
+        ``epochs`` shuffled passes. Only one chunk is held in memory at a time;
+        feature selection is not applied.
+        """
+        data = data if isinstance(data, ShardDataset) else ShardDataset(data)
+        if validation_data is not None and not isinstance(validation_data, ShardDataset):
+            validation_data = ShardDataset(validation_data, feature_names=data.feature_names)
+        
+        self.model = self.create_model(**{**self.best_params, **model_params})
+        if not hasattr(self.model, 'partial_fit'):
+            raise ValueError(f"Model type {self.model_type} does not support incremental training")
+        
+        if data.feature_names:
+            self.feature_names = list(data.feature_names)
+            self.input_feature_names = list(data.feature_names)
+        self.feature_selector = None
+        
+        # Pass 1: scaler statistics (and the class labels, which partial_fit needs up front)
+        self.scaler = StandardScaler()
+        n_samples = 0
+        labels = set()
+        with self._stage('streaming_scaler'):
+            for X_chunk, y_chunk in data:
+                self.scaler.partial_fit(X_chunk)
+                n_samples += len(y_chunk)
+                if self.task_type == 'classification' and classes is None:
+                    labels.update(np.unique(y_chunk).tolist())
+        if self.task_type == 'classification' and classes is None:
+            classes = np.array(sorted(labels))
+        
+        fit_kwargs = {'classes': classes} if self.task_type == 'classification' else {}
+        validation_scores = []
+        for epoch in range(epochs):
+            with self._stage('streaming_epoch'):
+                for X_chunk, y_chunk in data.iter_chunks(shuffle=True, random_state=random_state + epoch):
+                    self.model.partial_fit(self.scaler.transform(X_chunk), y_chunk, **fit_kwargs)
+            
+            if validation_data is not None:
+                validation_scores.append(self._streaming_score(validation_data))
+        
+        self.training_history['streaming'] = {
+            'epochs': epochs,
+            'n_samples': n_samples,
+            'n_shards': len(data.paths),
+            'validation_scores': validation_scores
+        }
+        self.training_history['feature_names'] = self.feature_names
+        self.training_history['training_date'] = datetime.now().isoformat()
+        
+        return {
+            'n_samples': n_samples,
+            'validation_scores': validation_scores,
+            'feature_names': self.feature_names
+        }
+    
+    def _streaming_score(self, data: ShardDataset) -> Dict[str, float]:
+        """Evaluate chunk by chunk (R^2/MSE for regression, accuracy for classification)"""
+        n_samples = 0
+        if self.task_type == 'regression':
+            squared_error = target_sum = target_squared_sum = 0.0
+            for X_chunk, y_chunk in data:
+                y_chunk = np.asarray(y_chunk, dtype=np.float64)
+                y_pred = self.predict(X_chunk)
+                squared_error += float(np.sum((y_chunk - y_pred) ** 2))
+                target_sum += float(np.sum(y_chunk))
+                target_squared_sum += float(np.sum(y_chunk ** 2))
+                n_samples += len(y_chunk)
+            total = target_squared_sum - target_sum ** 2 / max(n_samples, 1)
+            return {
+                'mse': squared_error / max(n_samples, 1),
+                'r2': 1 - squared_error / total if total > 0 else 0.0
+            }
+        
+        correct = 0
+        for X_chunk, y_chunk in data:
+            correct += int(np.sum(self.predict(X_chunk) == y_chunk))
+            n_samples += len(y_chunk)
+        return {'accuracy': correct / max(n_samples, 1)}
+    
+    def _transform_features(self, X: Union[pd.DataFrame, np.ndarray, sparse.spmatrix]) -> Union[np.ndarray, sparse.spmatrix]:
+        """Scale and select features for prediction
+        
+        For dense inputs and a fitted ``StandardScaler`` the selected columns
+        are gathered first and only they are scaled, in place on that copy.
+        """
+        if hasattr(X, 'to_numpy'):
+            X = X.to_numpy()
+        
+        scaler = self.scaler
+        if sparse.issparse(X) or not isinstance(scaler, StandardScaler) or not hasattr(scaler, 'n_features_in_'):
+            # Scale features
+            X_scaled = scaler.transform(X)
+            
+            # Feature selection if applicable
+            if self.feature_selector:
+                X_scaled = self.feature_selector.transform(X_scaled)
+            
+            return X_scaled
+        
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != scaler.n_features_in_:
+            raise ValueError(f"Expected {scaler.n_features_in_} features, got {X.shape[-1]}")
+        
+        if self.feature_selector:
+            columns = self.feature_selector.get_support(indices=True)
+            X_scaled = X[:, columns]
+        else:
+            columns = slice(None)
+            X_scaled = X.copy()
+        
+        if not np.issubdtype(X_scaled.dtype, np.floating):
+            X_scaled = X_scaled.astype(np.float64)
+        if scaler.with_mean:
+            X_scaled -= scaler.mean_[columns]
+        if scaler.with_std:
+            X_scaled /= scaler.scale_[columns]
+        return X_scaled
+    
+    def fit_applicability_domain(self, X: Union[np.ndarray, sparse.spmatrix],
+                                 **kwargs) -> Optional[ApplicabilityDomain]:
+        """Fit the applicability domain on the scaled, selected training matrix
+        
+        ``kwargs`` are passed to ``ApplicabilityDomain``.
+        """
+        if sparse.issparse(X):
+            print("Warning: Applicability domain is not available for sparse features")
+            self.applicability_domain = None
+        else:
+            self.applicability_domain = ApplicabilityDomain(**kwargs).fit(X)
+        return self.applicability_domain
+    
+    def applicability(self, X: np.ndarray) -> Dict[str, np.ndarray]:
+        """Score raw feature rows against the training domain (see ``ApplicabilityDomain.score``)"""
+        return self._domain_scores(self._transform_features(X))
+    
+    def _domain_scores(self, X_scaled: np.ndarray) -> Dict[str, np.ndarray]:
+        if self.applicability_domain is None:
+            raise ValueError("Model has no applicability domain; train it with applicability_domain=True")
+        
+        with self.instrumentation.stage('applicability_domain'):
+            return self.applicability_domain.score(X_scaled)
+    
+    def predict(self, X: np.ndarray, return_domain: bool = False
+                ) -> Union[np.ndarray, Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+        """Make predictions
+        
+        With ``return_domain=True`` also returns the per-row applicability
+        domain scores, computed from the same transformed features.
+        """
         if self.model is None:
             raise ValueError("Model not trained yet")
         
-        # Scale features
-        X_scaled = self.scaler.transform(X)
+        with self.instrumentation.stage('predict'):
+            X_scaled = self._transform_features(X)
+            predictions = self.model.predict(X_scaled)
         
-        # Feature selection if applicable
-        if self.feature_selector:
-            X_scaled = self.feature_selector.transform(X_scaled)
+        if return_domain:
+            return predictions, self._domain_scores(X_scaled)
+        return predictions
+    
+    def conformal_radius(self, alpha: float = 0.1) -> float:
+        """Get the half-width of ``1 - alpha`` conformal intervals from the out-of-fold residuals"""
+        if self.calibration_residuals is None or len(self.calibration_residuals) == 0:
+            raise ValueError("Model has no calibration residuals; train a regression model first")
+        
+        n = len(self.calibration_residuals)
+        rank = int(np.ceil((n + 1) * (1 - alpha)))
+        if rank > n:
+            return np.inf
+        return float(self.calibration_residuals[max(rank, 1) - 1])
+    
+    def predict_uncertainty(self, X: np.ndarray, quantiles: Tuple[float, ...] = (0.05, 0.95),
+                            alpha: Optional[float] = 0.1, batch_size: int = DEFAULT_BATCH_SIZE
+                            ) -> Dict[str, np.ndarray]:
+        """Make regression predictions with per-row uncertainty
         
-        return self.model.predict(X_scaled)
+        Returns ``mean`` plus, for random/extra-trees forests, the spread of
+        the per-tree predictions (``std`` and ``quantiles``, one column per
+        requested quantile) from one compiled pass over all trees. With
+        ``alpha`` (and out-of-fold residuals from ``train``) the conformal
+        interval ``lower``/``upper`` with ``1 - alpha`` coverage is added.
+        Other estimators, gradient boosting included, get ``mean`` and the
+        conformal interval only: boosting stages are corrections, not
+        independent ensemble members, so their spread is no uncertainty.
+        """
+        if self.task_type != 'regression':
+            raise ValueError("Uncertainty estimates are only available for regression")
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+        
+        with self.instrumentation.stage('predict_uncertainty'):
+            X_scaled = self._transform_features(X)
+            if isinstance(self.model, COMPILABLE_MODELS):
+                result = self._compiled_forest().predict_distribution(X_scaled, quantiles, batch_size)
+            else:
+                result = {'mean': np.asarray(self.model.predict(X_scaled), dtype=np.float64)}
+            
+            if alpha is not None and self.calibration_residuals is not None:
+                radius = self.conformal_radius(alpha)
+                result['lower'] = result['mean'] - radius
+                result['upper'] = result['mean'] + radius
+        
+        return result
+    
+    def _compiled_forest(self) -> CompiledForest:
+        """Get the forest compiled for already transformed features, compiling it once per estimator"""
+        if self._uncertainty_forest is None or self._uncertainty_forest[0] is not self.model:
+            self._uncertainty_forest = (self.model, CompiledForest.from_estimator(self.model))
+        return self._uncertainty_forest[1]
     
     def predict_proba(self, X: np.ndarray) -> np.ndarray:
         """Make probability predictions (classification only)"""
@@ -257,15 +809,9 @@ class EnhancedQSARModel:
         if self.model is None:
             raise ValueError("Model not trained yet")
         
-        # Scale features
-        X_scaled = self.scaler.transform(X)
-        
-        # Feature selection if applicable
-        if self.feature_selector:
-            X_scaled = self.feature_selector.transform(X_scaled)
-        
         if hasattr(self.model, 'predict_proba'):
-            return self.model.predict_proba(X_scaled)
+            with self.instrumentation.stage('predict_proba'):
+                return self.model.predict_proba(self._transform_features(X))
         else:
             raise ValueError("Model does not support probability prediction")
     
@@ -326,11 +872,40 @@ class EnhancedQSARModel:
         else:
             return {}
     
+    def compile(self, filepath: Optional[str] = None) -> CompiledForest:
+        """Compile a trained forest, scaler and selector for fast inference
+        
+        The compiled model takes raw descriptor values for either all training
+        features or only the selected ones. With ``filepath`` it is also saved
+        as an .npz archive.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+        
+        compiled = CompiledForest.from_estimator(self.model, self.scaler, self.feature_selector)
+        if filepath:
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            compiled.save(filepath)
+        
+        return compiled
+    
     def save_model(self, filepath: str) -> None:
-        """Save the trained model"""
+        """Save the trained model
+        
+        Paths ending in ``.pkl``/``.joblib`` keep the legacy layout (estimator
+        plus ``_metadata.json``), which cannot restore the scaler or feature
+        selector. Any other path is written as a versioned artifact directory
+        that reloads losslessly (see ``model_artifact``).
+        """
         if self.model is None:
             raise ValueError("Model not trained yet")
         
+        if not filepath.endswith(('.pkl', '.joblib')):
+            self._save_artifact(filepath)
+            return
+        
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
@@ -338,7 +913,7 @@ class EnhancedQSARModel:
         joblib.dump(self.model, filepath)
         
         # Save metadata
-        metadata_file = filepath.replace('.pkl', '_metadata.json')
+        metadata_file = os.path.splitext(filepath)[0] + '_metadata.json'
         metadata = {
             'model_type': self.model_type,
             'task_type': self.task_type,
@@ -360,14 +935,97 @@ class EnhancedQSARModel:
         with open(metadata_file, 'w') as f:
             json.dump(metadata, f, indent=2)
     
+    def _save_artifact(self, directory: str) -> None:
+        """Save the model and its full preprocessing as an artifact directory"""
+        arrays = {}
+        scaler_state = {'type': type(self.scaler).__name__,
+                        'with_mean': getattr(self.scaler, 'with_mean', True),
+                        'with_std': getattr(self.scaler, 'with_std', True),
+                        'fitted': hasattr(self.scaler, 'n_features_in_')}
+        for attribute in ('mean_', 'var_', 'scale_', 'n_samples_seen_'):
+            value = getattr(self.scaler, attribute, None)
+            if value is not None:
+                arrays[f'scaler_{attribute[:-1]}'] = np.asarray(value)
+        
+        if self.feature_selector is not None:
+            arrays['selector_mask'] = np.asarray(self.feature_selector.get_support(), dtype=bool)
+        if self.feature_names:
+            arrays['feature_names'] = np.asarray(self.feature_names, dtype=str)
+        if self.input_feature_names:
+            arrays['input_feature_names'] = np.asarray(self.input_feature_names, dtype=str)
+        if self.calibration_residuals is not None:
+            arrays['calibration_residuals'] = np.asarray(self.calibration_residuals)
+        if self.applicability_domain is not None:
+            for name, value in self.applicability_domain.to_arrays().items():
+                arrays[f'domain_{name}'] = value
+        
+        manifest = {
+            'model_type': self.model_type,
+            'task_type': self.task_type,
+            'estimator_class': type(self.model).__name__,
+            'descriptor_set_version': self.descriptor_set_version,
+            'scaler': scaler_state,
+            'best_params': self.best_params,
+            'cv_scores': self.cv_scores,
+            'training_date': self.training_history.get('training_date'),
+            'created': datetime.now().isoformat()
+        }
+        write_artifact(directory, manifest, arrays, self.model)
+    
     @classmethod
-    def load_model(cls, filepath: str) -> 'EnhancedQSARModel':
-        """Load a trained model"""
+    def _load_artifact(cls, directory: str, mmap_mode: Optional[str] = None,
+                       verify: bool = True) -> 'EnhancedQSARModel':
+        """Load a model saved as an artifact directory"""
+        manifest, arrays, model = read_artifact(directory, verify=verify, mmap_mode=mmap_mode)
+        
+        instance = cls(manifest['model_type'], manifest['task_type'])
+        instance.model = model
+        instance.best_params = manifest.get('best_params') or {}
+        instance.cv_scores = manifest.get('cv_scores') or []
+        instance.descriptor_set_version = manifest.get('descriptor_set_version')
+        instance.training_history = {'cv_scores': instance.cv_scores,
+                                     'training_date': manifest.get('training_date')}
+        
+        if 'feature_names' in arrays:
+            instance.feature_names = arrays['feature_names'].tolist()
+            instance.training_history['feature_names'] = instance.feature_names
+        if 'input_feature_names' in arrays:
+            instance.input_feature_names = arrays['input_feature_names'].tolist()
+        if 'selector_mask' in arrays:
+            instance.feature_selector = FixedFeatureMask(arrays['selector_mask'])
+        if 'calibration_residuals' in arrays:
+            instance.calibration_residuals = arrays['calibration_residuals']
+        domain_arrays = {name[len('domain_'):]: value for name, value in arrays.items() if name.startswith('domain_')}
+        if domain_arrays:
+            instance.applicability_domain = ApplicabilityDomain.from_arrays(domain_arrays)
+        
+        scaler_state = manifest['scaler']
+        if scaler_state['type'] != 'StandardScaler':
+            raise ValueError(f"Unsupported scaler type in artifact: {scaler_state['type']}")
+        instance.scaler = StandardScaler(with_mean=scaler_state['with_mean'], with_std=scaler_state['with_std'])
+        if scaler_state['fitted']:
+            for name in ('mean', 'var', 'scale'):
+                setattr(instance.scaler, f'{name}_', arrays.get(f'scaler_{name}'))
+            n_samples_seen = arrays['scaler_n_samples_seen']
+            instance.scaler.n_samples_seen_ = int(n_samples_seen) if n_samples_seen.ndim == 0 else n_samples_seen
+            n_features = next(arrays[f'scaler_{name}'].shape[0] for name in ('scale', 'var', 'mean')
+                              if f'scaler_{name}' in arrays)
+            instance.scaler.n_features_in_ = n_features
+        
+        return instance
+    
+    @classmethod
+    def load_model(cls, filepath: str, mmap_mode: Optional[str] = None,
+                   verify: bool = True) -> 'EnhancedQSARModel':
+        """Load a trained model (``mmap_mode`` is passed to ``joblib.load``)"""
+        if is_artifact(filepath):
+            return cls._load_artifact(filepath, mmap_mode, verify)
+        
         # Load model
-        model = joblib.load(filepath)
+        model = joblib.load(filepath, mmap_mode=mmap_mode)
         
         # Load metadata
-        metadata_file = filepath.replace('.pkl', '_metadata.json')
+        metadata_file = os.path.splitext(filepath)[0] + '_metadata.json'
         if os.path.exists(metadata_file):
             with open(metadata_file, 'r') as f:
                 metadata = json.load(f)
@@ -382,6 +1040,9 @@ class EnhancedQSARModel:
             
             return instance
         
+        # Without metadata only the estimator itself is known
+        instance = cls()
+        instance.model = model
         return instance
 
 # Convenience functions
@@ -393,5 +1054,6 @@ def train_qsar_model(X: pd.DataFrame, y: pd.Series, model_type: str = 'random_fo
                     task_type: str = 'regression', **kwargs) -> EnhancedQSARModel:
     """Create and train a QSAR model"""
     model = EnhancedQSARModel(model_type, task_type)
-    model.train(X.values, y.values, **kwargs)
+    model.feature_names = X.columns.tolist()
+    model.train(X.to_numpy(dtype=model.dtype), y.to_numpy(), **kwargs)
     return model 
\ No newline at end of file
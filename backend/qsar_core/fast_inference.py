@@ -0,0 +1,308 @@
+"""
+Compiled Fast-Path Inference for QSAR/QSPR/QSTR Forest Models
+Flattened tree node arrays with vectorized, micro-batched traversal
+"""
+
+import struct
+import zipfile
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple, Union
+from scipy import sparse
+from sklearn.ensemble import (RandomForestRegressor, RandomForestClassifier,
+                              ExtraTreesRegressor, ExtraTreesClassifier)
+
+COMPILABLE_MODELS = (RandomForestRegressor, RandomForestClassifier, ExtraTreesRegressor, ExtraTreesClassifier)
+
+# Rows traversed together; bounds the (rows x trees) node index matrix
+DEFAULT_BATCH_SIZE = 1024
+
+class CompiledForest:
+    """A trained forest plus its scaler and feature selector as flat NumPy arrays
+    
+    All trees share one set of node arrays; ``roots`` holds each tree's first
+    node. Leaves point to themselves with an infinite threshold, so every row
+    can be advanced a fixed number of levels without branching on leaves.
+    Scaling is applied in float64 and the result cast to float32 before the
+    threshold comparison, exactly as sklearn does.
+    """
+    
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children_left: np.ndarray,
+                 children_right: np.ndarray, value: np.ndarray, roots: np.ndarray, max_depth: int,
+                 task_type: str, n_features_in: int, input_indices: np.ndarray,
+                 offset: np.ndarray, scale: np.ndarray, classes: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.task_type = task_type
+        self.n_features_in = n_features_in
+        self.input_indices = input_indices
+        self.offset = offset
+        self.scale = scale
+        self.classes = classes
+    
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+    
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+    
+    def __repr__(self) -> str:
+        return (f"CompiledForest(task_type={self.task_type!r}, trees={self.n_trees}, "
+                f"nodes={self.n_nodes}, inputs={len(self.input_indices)}/{self.n_features_in})")
+    
+    @classmethod
+    def from_estimator(cls, estimator: Any, scaler: Any = None, feature_selector: Any = None,
+                       n_features_in: Optional[int] = None) -> 'CompiledForest':
+        """Compile a fitted forest with an optional fitted scaler and selector"""
+        if not isinstance(estimator, COMPILABLE_MODELS):
+            raise ValueError(f"Cannot compile model of type {type(estimator).__name__}")
+        if not hasattr(estimator, 'estimators_'):
+            raise ValueError("Model not trained yet")
+        if getattr(estimator, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+        
+        task_type = 'classification' if hasattr(estimator, 'classes_') else 'regression'
+        
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree_estimator in estimator.estimators_:
+            tree = tree_estimator.tree_
+            nodes = np.arange(tree.node_count, dtype=np.int32)
+            is_leaf = tree.children_left < 0
+            
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left).astype(np.int32) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right).astype(np.int32) + offset)
+            
+            value = tree.value[:, 0, :]
+            if task_type == 'classification':
+                # Leaf class fractions, as averaged by predict_proba
+                totals = value.sum(axis=1, keepdims=True)
+                value = value / np.where(totals == 0, 1, totals)
+            else:
+                value = value[:, 0]
+            values.append(value)
+            
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+        
+        n_selected = estimator.n_features_in_
+        if feature_selector is not None:
+            input_indices = feature_selector.get_support(indices=True).astype(np.int64)
+            n_features_in = n_features_in or feature_selector.n_features_in_
+        else:
+            input_indices = np.arange(n_selected, dtype=np.int64)
+            n_features_in = n_features_in or n_selected
+        
+        # Fold the scaler into per-input offsets and scales
+        scaler_offset = np.zeros(n_features_in)
+        scaler_scale = np.ones(n_features_in)
+        if scaler is not None and hasattr(scaler, 'scale_'):
+            if getattr(scaler, 'with_mean', True) and getattr(scaler, 'mean_', None) is not None:
+                scaler_offset = np.asarray(scaler.mean_, dtype=np.float64)
+            if getattr(scaler, 'with_std', True) and scaler.scale_ is not None:
+                scaler_scale = np.asarray(scaler.scale_, dtype=np.float64)
+        
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children_left=np.concatenate(lefts),
+            children_right=np.concatenate(rights),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=int(max_depth),
+            task_type=task_type,
+            n_features_in=int(n_features_in),
+            input_indices=input_indices,
+            offset=np.ascontiguousarray(scaler_offset[input_indices]),
+            scale=np.ascontiguousarray(scaler_scale[input_indices]),
+            classes=np.asarray(estimator.classes_) if task_type == 'classification' else None
+        )
+    
+    def _prepare(self, X: Union[np.ndarray, sparse.spmatrix]) -> np.ndarray:
+        """Select, scale and cast a block of rows to the float32 tree input"""
+        if X.shape[1] == self.n_features_in:
+            X = X[:, self.input_indices]
+        elif X.shape[1] != len(self.input_indices):
+            raise ValueError(f"Expected {self.n_features_in} features (or the {len(self.input_indices)} "
+                             f"selected ones), got {X.shape[1]}")
+        
+        X = X.toarray() if sparse.issparse(X) else np.array(X, dtype=np.float64)
+        X = X.astype(np.float64, copy=False)
+        X -= self.offset
+        X /= self.scale
+        return X.astype(np.float32)
+    
+    def _traverse(self, X32: np.ndarray) -> np.ndarray:
+        """Get the leaf reached in every tree for every row, shape (rows, trees)"""
+        rows = np.arange(X32.shape[0])[:, None]
+        nodes = np.repeat(self.roots[None, :], X32.shape[0], axis=0)
+        
+        for _ in range(self.max_depth):
+            go_left = X32[rows, self.feature[nodes]] <= self.threshold[nodes]
+            next_nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+        
+        return nodes
+    
+    @staticmethod
+    def _as_rows(X: Union[np.ndarray, sparse.spmatrix]) -> Union[np.ndarray, sparse.spmatrix]:
+        if not sparse.issparse(X):
+            X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+    
+    def _predict_values(self, X: Union[np.ndarray, sparse.spmatrix], batch_size: int) -> np.ndarray:
+        """Average leaf values over trees, one micro-batch of rows at a time"""
+        X = self._as_rows(X)
+        n_rows = X.shape[0]
+        output = np.empty((n_rows,) + self.value.shape[1:], dtype=np.float64)
+        for start in range(0, n_rows, batch_size):
+            leaves = self._traverse(self._prepare(X[start:start + batch_size]))
+            output[start:start + len(leaves)] = self.value[leaves].mean(axis=1)
+        
+        return output
+    
+    def predict(self, X: Union[np.ndarray, sparse.spmatrix], batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        """Make predictions from raw (unscaled) descriptor values"""
+        values = self._predict_values(X, batch_size)
+        if self.task_type == 'classification':
+            return self.classes[np.argmax(values, axis=1)]
+        return values
+    
+    def predict_proba(self, X: Union[np.ndarray, sparse.spmatrix],
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        """Make probability predictions (classification only)"""
+        if self.task_type != 'classification':
+            raise ValueError("Probability prediction only available for classification")
+        return self._predict_values(X, batch_size)
+    
+    def predict_distribution(self, X: Union[np.ndarray, sparse.spmatrix], quantiles: Tuple[float, ...] = (0.05, 0.95),
+                             batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, np.ndarray]:
+        """Summarize the per-tree predictions of each row (regression only)
+        
+        Returns ``mean``, ``std`` and ``quantiles`` (shape ``(rows, len(quantiles))``).
+        The per-tree outputs are stacked for one micro-batch of rows at a time,
+        so memory stays at ``batch_size x trees`` values.
+        """
+        if self.task_type != 'regression':
+            raise ValueError("Prediction distributions are only available for regression forests")
+        
+        X = self._as_rows(X)
+        n_rows = X.shape[0]
+        mean = np.empty(n_rows)
+        std = np.empty(n_rows)
+        tree_quantiles = np.empty((n_rows, len(quantiles)))
+        for start in range(0, n_rows, batch_size):
+            tree_values = self.value[self._traverse(self._prepare(X[start:start + batch_size]))]
+            stop = start + len(tree_values)
+            mean[start:stop] = tree_values.mean(axis=1)
+            std[start:stop] = tree_values.std(axis=1)
+            tree_quantiles[start:stop] = np.quantile(tree_values, quantiles, axis=1).T
+        
+        return {'mean': mean, 'std': std, 'quantiles': tree_quantiles}
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Get all compiled state as plain arrays"""
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children_left': self.children_left,
+            'children_right': self.children_right,
+            'value': self.value,
+            'roots': self.roots,
+            'max_depth': np.asarray(self.max_depth),
+            'task_type': np.asarray(self.task_type),
+            'n_features_in': np.asarray(self.n_features_in),
+            'input_indices': self.input_indices,
+            'offset': self.offset,
+            'scale': self.scale
+        }
+        if self.classes is not None:
+            arrays['classes'] = self.classes
+        return arrays
+    
+    def save(self, filepath: str) -> None:
+        """Save the compiled model as an uncompressed .npz archive"""
+        np.savez(filepath, **self.to_arrays())
+    
+    @classmethod
+    def load(cls, filepath: str, mmap_mode: Optional[str] = None) -> 'CompiledForest':
+        """Load a compiled model saved with ``save``
+        
+        With ``mmap_mode='r'`` the node arrays are memory-mapped from the
+        archive, so processes loading the same file share its pages.
+        """
+        if mmap_mode:
+            data = memmap_npz(filepath, mmap_mode)
+            return cls._from_arrays(data, list(data))
+        
+        with np.load(filepath, allow_pickle=False) as data:
+            return cls._from_arrays(data, data.files)
+    
+    @classmethod
+    def _from_arrays(cls, data: Any, names: List[str]) -> 'CompiledForest':
+        """Build a compiled model from a mapping of saved arrays"""
+        return cls(
+            feature=data['feature'],
+            threshold=data['threshold'],
+            children_left=data['children_left'],
+            children_right=data['children_right'],
+            value=data['value'],
+            roots=data['roots'],
+            max_depth=int(data['max_depth']),
+            task_type=str(data['task_type']),
+            n_features_in=int(data['n_features_in']),
+            input_indices=data['input_indices'],
+            offset=data['offset'],
+            scale=data['scale'],
+            classes=data['classes'] if 'classes' in names else None
+        )
+
+def memmap_npz(filepath: str, mmap_mode: str = 'r') -> Dict[str, np.ndarray]:
+    """Memory-map the arrays of an uncompressed .npz archive (as written by ``np.savez``)"""
+    arrays = {}
+    with zipfile.ZipFile(filepath) as archive, open(filepath, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Cannot memory-map compressed member {info.filename} of {filepath}")
+            
+            # The data follows the local file header, whose name/extra lengths may differ
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"Cannot memory-map object array {info.filename} of {filepath}")
+            
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if not shape or 0 in shape:
+                # np.memmap cannot map empty or zero-dimensional arrays
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            else:
+                arrays[name] = np.memmap(filepath, dtype=dtype, mode=mmap_mode, offset=f.tell(),
+                                         shape=shape, order='F' if fortran_order else 'C')
+    
+    return arrays
+
+# Convenience functions
+def load_compiled_model(filepath: str, mmap_mode: Optional[str] = None) -> CompiledForest:
+    """Load a compiled forest model"""
+    return CompiledForest.load(filepath, mmap_mode)
@@ -0,0 +1,115 @@
+"""
+Fingerprint Bit Matrices for QSAR/QSPR/QSTR Modeling
+Packed-bit and sparse CSR fingerprint matrices for whole compound libraries
+"""
+
+import numpy as np
+from typing import Callable, Iterable, List, Tuple, Union
+from scipy import sparse
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator, rdMolDescriptors
+
+FINGERPRINT_TYPES = ['morgan', 'atompair', 'torsion', 'rdkit', 'maccs', 'pattern']
+
+# MACCS keys always have 167 bits regardless of the requested length
+MACCS_BITS = 167
+
+# Rows packed per step when converting between packed bits and CSR
+PACK_CHUNK_ROWS = 4096
+
+_generators = {}
+
+def fingerprint_length(fp_type: str, n_bits: int) -> int:
+    """Get the actual bit length produced for a fingerprint type"""
+    return MACCS_BITS if fp_type == 'maccs' else n_bits
+
+def get_fingerprint_function(fp_type: str = 'morgan', n_bits: int = 2048,
+                             radius: int = 2) -> Callable[[Chem.Mol], np.ndarray]:
+    """Get a function mapping a molecule to its dense 0/1 uint8 bit vector"""
+    key = (fp_type, n_bits, radius)
+    if key in _generators:
+        return _generators[key]
+    
+    if fp_type == 'morgan':
+        generator = rdFingerprintGenerator.GetMorganGenerator(radius=radius, fpSize=n_bits)
+    elif fp_type == 'atompair':
+        generator = rdFingerprintGenerator.GetAtomPairGenerator(fpSize=n_bits)
+    elif fp_type == 'torsion':
+        generator = rdFingerprintGenerator.GetTopologicalTorsionGenerator(fpSize=n_bits)
+    elif fp_type == 'rdkit':
+        generator = rdFingerprintGenerator.GetRDKitFPGenerator(fpSize=n_bits)
+    elif fp_type in ('maccs', 'pattern'):
+        generator = None
+    else:
+        raise ValueError(f"Invalid fingerprint type: {fp_type}. Use one of {FINGERPRINT_TYPES}")
+    
+    if generator is not None:
+        function = generator.GetFingerprintAsNumPy
+    else:
+        length = fingerprint_length(fp_type, n_bits)
+        
+        def function(mol: Chem.Mol) -> np.ndarray:
+            if fp_type == 'maccs':
+                fp = rdMolDescriptors.GetMACCSKeysFingerprint(mol)
+            else:
+                fp = Chem.PatternFingerprint(mol, fpSize=n_bits)
+            bits = np.zeros(length, dtype=np.uint8)
+            bits[list(fp.GetOnBits())] = 1
+            return bits
+    
+    _generators[key] = function
+    return function
+
+def calculate_packed_fingerprints(mols: Iterable[Union[str, Chem.Mol]], fp_type: str = 'morgan',
+                                  n_bits: int = 2048, radius: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate fingerprints as a packed uint8 bit matrix
+    
+    Returns ``(packed, errors)`` where ``packed`` has shape
+    ``(n_molecules, ceil(n_bits / 8))`` in ``np.packbits`` bit order. Rows for
+    invalid molecules are all zero and carry a message in ``errors``.
+    """
+    mols = list(mols)
+    function = get_fingerprint_function(fp_type, n_bits, radius)
+    length = fingerprint_length(fp_type, n_bits)
+    
+    packed = np.zeros((len(mols), (length + 7) // 8), dtype=np.uint8)
+    errors = np.full(len(mols), None, dtype=object)
+    
+    for row, mol in enumerate(mols):
+        if isinstance(mol, str):
+            smiles, mol = mol, Chem.MolFromSmiles(mol)
+            if mol is None:
+                errors[row] = f"Invalid SMILES: {smiles}"
+                continue
+        try:
+            packed[row] = np.packbits(function(mol))
+        except Exception as e:
+            errors[row] = f"Error calculating fingerprint: {e}"
+    
+    return packed, errors
+
+def unpack_fingerprints(packed: np.ndarray, n_bits: int) -> np.ndarray:
+    """Expand a packed bit matrix into a dense 0/1 uint8 matrix"""
+    return np.unpackbits(packed, axis=1, count=n_bits)
+
+def packed_to_csr(packed: np.ndarray, n_bits: int, dtype: type = np.float32) -> sparse.csr_matrix:
+    """Convert a packed bit matrix to a CSR matrix without a dense float copy"""
+    indptr = [np.zeros(1, dtype=np.int64)]
+    indices = []
+    offset = 0
+    
+    for start in range(0, packed.shape[0], PACK_CHUNK_ROWS):
+        bits = np.unpackbits(packed[start:start + PACK_CHUNK_ROWS], axis=1, count=n_bits)
+        rows, cols = np.nonzero(bits)
+        counts = np.bincount(rows, minlength=bits.shape[0])
+        indptr.append(offset + np.cumsum(counts))
+        indices.append(cols.astype(np.int32))
+        offset += len(cols)
+    
+    indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32)
+    data = np.ones(len(indices), dtype=dtype)
+    return sparse.csr_matrix((data, indices, np.concatenate(indptr)), shape=(packed.shape[0], n_bits))
+
+def fingerprint_feature_names(fp_type: str = 'morgan', n_bits: int = 2048) -> List[str]:
+    """Get column names for fingerprint bit features"""
+    return [f'{fp_type}_{i}' for i in range(fingerprint_length(fp_type, n_bits))]
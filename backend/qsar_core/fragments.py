@@ -0,0 +1,283 @@
+"""
+Fragment Descriptors for QSAR/QSPR/QSTR Modeling
+Precompiled RDKit fragment (fr_*) SMARTS counts with an atom-type prefilter
+"""
+
+import re
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from rdkit import Chem
+from rdkit.Chem import Fragments
+
+FRAGMENT_PATTERN_FILE = Fragments.defaultPatternFileName
+
+# Atom types are atomic numbers, plus 1000 for aromatic atoms (as in RDKit's AtomType queries)
+AROMATIC_OFFSET = 1000
+MAX_ATOM_TYPE = AROMATIC_OFFSET + 119
+
+_ELEMENT_QUERY = re.compile(r'(AtomAtomicNum|AtomType) (\d+) = val')
+
+def load_fragment_patterns(filepath: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Read ``(name, smarts)`` pairs from an RDKit FragmentDescriptors.csv file
+    
+    Names are normalized the way ``rdkit.Chem.Fragments`` does, so they match
+    the ``fr_*`` entries of ``Descriptors._descList``.
+    """
+    patterns = []
+    with open(filepath or FRAGMENT_PATTERN_FILE, 'r') as f:
+        for line in f:
+            if not line or line[0] == '#':
+                continue
+            fields = line.split('\t')
+            if len(fields) >= 3:
+                name = fields[0].replace('=', '_').replace('-', '_')
+                patterns.append((name, fields[2]))
+    return patterns
+
+class FragmentMatcher:
+    """Fragment counter with SMARTS patterns compiled once
+    
+    Counts equal the ``fr_*`` functions in ``rdkit.Chem.Descriptors`` (unique
+    substructure matches). Before matching, each molecule's atom-type counts
+    are compared in one vectorized step against the minimum atom types every
+    pattern needs (derived from its query atoms, recursive SMARTS included),
+    and patterns that cannot match are skipped with a count of zero.
+    """
+    
+    def __init__(self, patterns: Optional[Sequence[Tuple[str, str]]] = None):
+        self._pattern_specs = list(patterns) if patterns is not None else load_fragment_patterns()
+        self.names = [name for name, _ in self._pattern_specs]
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.patterns = []
+        for name, smarts in self._pattern_specs:
+            pattern = Chem.MolFromSmarts(smarts)
+            if pattern is None or pattern.GetNumAtoms() == 0:
+                raise ValueError(f"Invalid SMARTS for fragment {name}: {smarts!r}")
+            self.patterns.append(pattern)
+        
+        self._build_prefilter([_pattern_requirements(pattern) for pattern in self.patterns])
+    
+    def __getstate__(self) -> Dict:
+        # Query molecules are rebuilt from SMARTS rather than pickled
+        return {'patterns': self._pattern_specs}
+    
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(state['patterns'])
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def _build_prefilter(self, requirements: List[Dict[frozenset, int]]) -> None:
+        """Build the atom-type -> requirement and pattern -> minimum count matrices"""
+        keys = sorted({key for requirement in requirements for key in requirement}, key=sorted)
+        types = sorted({atom_type for key in keys for atom_type in key})
+        
+        # Map every atom type to a compact column; unused types go to a spare last column
+        self._type_columns = np.full(MAX_ATOM_TYPE, len(types), dtype=np.intp)
+        self._type_columns[types] = np.arange(len(types))
+        
+        self._type_to_key = np.zeros((len(types) + 1, len(keys)), dtype=np.int32)
+        for j, key in enumerate(keys):
+            self._type_to_key[[types.index(atom_type) for atom_type in key], j] = 1
+        
+        self._min_counts = np.array([[requirement.get(key, 0) for key in keys] for requirement in requirements],
+                                    dtype=np.int32).reshape(len(requirements), len(keys))
+    
+    def _atom_type_counts(self, mol: Chem.Mol) -> np.ndarray:
+        """Count a molecule's atoms per prefilter column"""
+        atom_types = [min(atom.GetAtomicNum() + AROMATIC_OFFSET * atom.GetIsAromatic(), MAX_ATOM_TYPE - 1)
+                      for atom in mol.GetAtoms()]
+        columns = self._type_columns[atom_types] if atom_types else np.zeros(0, dtype=np.intp)
+        return np.bincount(columns, minlength=self._type_to_key.shape[0])
+    
+    def _atom_type_count_matrix(self, mols: List[Chem.Mol]) -> np.ndarray:
+        """Count the atoms of many molecules per prefilter column in one pass"""
+        atom_types = np.array([atom.GetAtomicNum() + AROMATIC_OFFSET * atom.GetIsAromatic()
+                               for mol in mols for atom in mol.GetAtoms()], dtype=np.intp)
+        rows = np.repeat(np.arange(len(mols)), [mol.GetNumAtoms() for mol in mols])
+        n_columns = self._type_to_key.shape[0]
+        columns = self._type_columns[np.minimum(atom_types, MAX_ATOM_TYPE - 1)]
+        return np.bincount(rows * n_columns + columns, minlength=len(mols) * n_columns).reshape(len(mols), n_columns)
+    
+    def _resolve(self, names: Optional[Iterable[str]]) -> np.ndarray:
+        """Get pattern indices for fragment names (all patterns when None)"""
+        if names is None:
+            return np.arange(len(self.names))
+        try:
+            return np.array([self._index[name] for name in names], dtype=np.intp)
+        except KeyError as e:
+            raise ValueError(f"Unknown fragment descriptor: {e.args[0]}")
+    
+    def candidates(self, mol: Chem.Mol, names: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Get a mask of the patterns (in ``names`` order) that can possibly match"""
+        indices = self._resolve(names)
+        key_counts = self._atom_type_counts(mol) @ self._type_to_key
+        return (key_counts >= self._min_counts[indices]).all(axis=1)
+    
+    def count(self, mol: Chem.Mol, names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Count fragment occurrences in one molecule"""
+        indices = self._resolve(names)
+        key_counts = self._atom_type_counts(mol) @ self._type_to_key
+        possible = (key_counts >= self._min_counts[indices]).all(axis=1)
+        
+        counts = {}
+        for index, match in zip(indices, possible):
+            counts[self.names[index]] = len(mol.GetSubstructMatches(self.patterns[index])) if match else 0
+        return counts
+    
+    def count_matrix(self, mols: Iterable[Optional[Chem.Mol]], names: Optional[Iterable[str]] = None,
+                     dtype: type = np.float32) -> np.ndarray:
+        """Count fragments for many molecules as an ``(n_molecules, n_fragments)`` matrix
+        
+        The prefilter runs once over the whole batch; ``None`` molecules give
+        zero rows.
+        """
+        mols = list(mols)
+        names = list(names) if names is not None else None
+        indices = self._resolve(names)
+        counts = np.zeros((len(mols), len(indices)), dtype=dtype)
+        
+        for row, column in zip(*np.nonzero(self.candidate_matrix(mols, names))):
+            counts[row, column] = len(mols[row].GetSubstructMatches(self.patterns[indices[column]]))
+        return counts
+    
+    def candidate_matrix(self, mols: Iterable[Optional[Chem.Mol]], names: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Get an ``(n_molecules, n_patterns)`` mask of the patterns each molecule can possibly match
+        
+        The prefilter runs once over the whole batch; ``None`` molecules match
+        nothing.
+        """
+        mols = list(mols)
+        indices = self._resolve(names)
+        possible = np.zeros((len(mols), len(indices)), dtype=bool)
+        
+        valid = [row for row, mol in enumerate(mols) if mol is not None]
+        if not valid:
+            return possible
+        
+        key_counts = self._atom_type_count_matrix([mols[row] for row in valid]) @ self._type_to_key
+        possible[valid] = (key_counts[:, None, :] >= self._min_counts[indices][None, :, :]).all(axis=2)
+        return possible
+
+def _query_tree(description: str) -> Tuple[str, List]:
+    """Parse ``Atom.DescribeQuery()`` output into a ``(label, children)`` tree"""
+    lines = [line for line in description.splitlines() if line.strip()]
+    
+    def build(position: int, depth: int) -> Tuple[Tuple[str, List], int]:
+        label = lines[position].strip()
+        children = []
+        position += 1
+        while position < len(lines) and (len(lines[position]) - len(lines[position].lstrip())) // 2 > depth:
+            child, position = build(position, depth + 1)
+            children.append(child)
+        return (label, children), position
+    
+    return build(0, 0)[0]
+
+def _recursive_smarts(smarts: str) -> List[str]:
+    """Get the ``$(...)`` sub-patterns of an atom SMARTS, in order"""
+    found = []
+    start = smarts.find('$(')
+    while start >= 0:
+        depth = 0
+        for end in range(start + 1, len(smarts)):
+            if smarts[end] == '(':
+                depth += 1
+            elif smarts[end] == ')':
+                depth -= 1
+                if depth == 0:
+                    break
+        found.append(smarts[start + 2:end])
+        start = smarts.find('$(', end)
+    return found
+
+def _atom_requirements(node: Tuple[str, List], recursive: List[str]) -> Tuple[Optional[frozenset], Dict[frozenset, int]]:
+    """Get ``(own, extra)`` for a query atom
+    
+    ``own`` is the set of atom types the atom itself must have (None if
+    unconstrained); ``extra`` holds molecule-wide minimum counts implied by
+    recursive SMARTS.
+    """
+    label, children = node
+    
+    if label == 'AtomAnd':
+        results = [_atom_requirements(child, recursive) for child in children]
+        owns = [own for own, _ in results if own is not None]
+        extra = {}
+        for _, child_extra in results:
+            for key, count in child_extra.items():
+                extra[key] = max(extra.get(key, 0), count)
+        return (min(owns, key=len) if owns else None), extra
+    
+    if label == 'AtomOr':
+        results = [_atom_requirements(child, recursive) for child in children]
+        own = None
+        if all(child_own is not None for child_own, _ in results):
+            own = frozenset().union(*(child_own for child_own, _ in results))
+        common = set(results[0][1])
+        for _, child_extra in results[1:]:
+            common &= set(child_extra)
+        return own, {key: min(child_extra[key] for _, child_extra in results) for key in common}
+    
+    if label.startswith('RecursiveStructure'):
+        smarts = recursive.pop(0) if recursive else None
+        if smarts is None or 'not in' in label:
+            return None, {}
+        inner = Chem.MolFromSmarts(smarts)
+        return None, (_pattern_requirements(inner) if inner is not None else {})
+    
+    match = _ELEMENT_QUERY.fullmatch(label)
+    if match is None:
+        return None, {}
+    value = int(match.group(2))
+    if match.group(1) == 'AtomType':
+        return frozenset({value}), {}
+    return frozenset({value, value + AROMATIC_OFFSET}), {}
+
+def _pattern_requirements(pattern: Chem.Mol) -> Dict[frozenset, int]:
+    """Get the minimum number of atoms per atom-type set a molecule needs to match a pattern"""
+    requirements = {}
+    extra = {}
+    for atom in pattern.GetAtoms():
+        own, atom_extra = _atom_requirements(_query_tree(atom.DescribeQuery()), _recursive_smarts(atom.GetSmarts()))
+        if own is not None:
+            requirements[own] = requirements.get(own, 0) + 1
+        for key, count in atom_extra.items():
+            extra[key] = max(extra.get(key, 0), count)
+    
+    for key, count in extra.items():
+        requirements[key] = max(requirements.get(key, 0), count)
+    return requirements
+
+_default_matcher = None
+
+# Convenience functions
+def get_fragment_matcher() -> FragmentMatcher:
+    """Get the process-wide matcher for RDKit's fragment descriptors, building it on first use"""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = FragmentMatcher()
+    return _default_matcher
+
+def calculate_fragment_counts(mols: Iterable[Union[str, Chem.Mol]], names: Optional[List[str]] = None,
+                              dtype: type = np.float32) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate fragment counts for many molecules
+    
+    Returns ``(counts, errors)``; rows for invalid molecules are zero and
+    carry a message in ``errors``.
+    """
+    mols = list(mols)
+    errors = np.full(len(mols), None, dtype=object)
+    
+    parsed = []
+    for row, mol in enumerate(mols):
+        if isinstance(mol, str):
+            smiles, mol = mol, Chem.MolFromSmiles(mol)
+            if mol is None:
+                errors[row] = f"Invalid SMILES: {smiles}"
+        parsed.append(mol)
+    
+    return get_fragment_matcher().count_matrix(parsed, names, dtype), errors
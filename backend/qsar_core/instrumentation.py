@@ -0,0 +1,228 @@
+"""
+Instrumentation for QSAR/QSPR/QSTR Pipelines
+Per-stage timing histograms, failure and event counters with JSON/Prometheus export
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+StageCallback = Callable[[str, float, bool], None]
+
+class StageHistogram:
+    """Duration histogram and failure count of one stage"""
+    
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.failures = 0
+    
+    def observe(self, seconds: float, failed: bool = False) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if failed:
+            self.failures += 1
+    
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket that contains it"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+    
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add the counts of another histogram's snapshot (same buckets)"""
+        for i, count in enumerate(snapshot['bucket_counts']):
+            self.counts[i] += count
+        self.count += snapshot['count']
+        self.total += snapshot['sum']
+        self.failures += snapshot['failures']
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'failures': self.failures,
+            'p50_upper_bound': self.quantile(0.5),
+            'p99_upper_bound': self.quantile(0.99),
+            'buckets': list(self.buckets),
+            'bucket_counts': list(self.counts)
+        }
+
+class Instrumentation:
+    """Collects per-stage durations, failures and event counters
+    
+    Use ``stage(name)`` as a context manager around a unit of work and
+    ``increment(name, **labels)`` for events such as cache hits. Callbacks
+    registered with ``add_callback`` receive ``(stage, seconds, failed)`` for
+    every stage in the process where it ran; metrics from process-pool
+    workers are merged back into the parent's histograms.
+    """
+    
+    enabled = True
+    
+    def __init__(self, namespace: str = 'qsar', buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 callbacks: Optional[List[StageCallback]] = None):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self.callbacks = list(callbacks or [])
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state['_lock'] = None
+        return state
+    
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def reset(self) -> None:
+        """Clear all recorded metrics"""
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+    
+    def add_callback(self, callback: StageCallback) -> None:
+        """Register a function called with ``(stage, seconds, failed)`` after each stage"""
+        self.callbacks.append(callback)
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block of work as stage ``name``; exceptions count as failures and propagate"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, failed)
+    
+    def record(self, name: str, seconds: float, failed: bool = False) -> None:
+        """Record one stage duration"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = StageHistogram(self.buckets)
+            histogram.observe(seconds, failed)
+        
+        for callback in self.callbacks:
+            callback(name, seconds, failed)
+    
+    def increment(self, name: str, value: int = 1, **labels: str) -> None:
+        """Increment an event counter, e.g. ``increment('cache', result='hit')``"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get all metrics as plain data"""
+        with self._lock:
+            return {
+                'stages': {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self.counters.items())]
+            }
+    
+    def collect(self) -> Optional[Dict[str, Any]]:
+        """Get a snapshot and reset, for shipping metrics out of a worker process"""
+        snapshot = self.snapshot()
+        self.reset()
+        return snapshot
+    
+    def merge(self, snapshot: Optional[Dict[str, Any]]) -> None:
+        """Add a snapshot (e.g. from a worker process) to these metrics"""
+        if not snapshot:
+            return
+        
+        with self._lock:
+            for name, data in snapshot['stages'].items():
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = StageHistogram(data['buckets'])
+                histogram.merge(data)
+            for counter in snapshot['counters']:
+                key = (counter['name'], tuple(sorted(counter['labels'].items())))
+                self.counters[key] = self.counters.get(key, 0) + counter['value']
+    
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """Export metrics as JSON"""
+        return json.dumps(self.snapshot(), indent=indent)
+    
+    def to_prometheus(self) -> str:
+        """Export metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        prefix = self.namespace
+        lines = []
+        
+        if snapshot['stages']:
+            metric = f'{prefix}_stage_duration_seconds'
+            lines += [f'# HELP {metric} Duration of pipeline stages.', f'# TYPE {metric} histogram']
+            for name, data in snapshot['stages'].items():
+                cumulative = 0
+                for bound, count in zip(data['buckets'] + ['+Inf'], data['bucket_counts']):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {data["sum"]}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {data["count"]}')
+            
+            metric = f'{prefix}_stage_failures_total'
+            lines += [f'# HELP {metric} Pipeline stages that raised.', f'# TYPE {metric} counter']
+            for name, data in snapshot['stages'].items():
+                lines.append(f'{metric}{{stage="{name}"}} {data["failures"]}')
+        
+        written = set()
+        for counter in snapshot['counters']:
+            metric = f'{prefix}_{counter["name"]}_total'
+            if metric not in written:
+                lines.append(f'# TYPE {metric} counter')
+                written.add(metric)
+            labels = ','.join(f'{key}="{_escape_label(value)}"' for key, value in counter['labels'].items())
+            lines.append(f'{metric}{{{labels}}} {counter["value"]}' if labels else f'{metric} {counter["value"]}')
+        
+        return '\n'.join(lines) + '\n'
+
+class NullInstrumentation(Instrumentation):
+    """Instrumentation that records nothing (the default)"""
+    
+    enabled = False
+    
+    def __init__(self):
+        super().__init__(callbacks=[])
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        yield
+    
+    def record(self, name: str, seconds: float, failed: bool = False) -> None:
+        pass
+    
+    def increment(self, name: str, value: int = 1, **labels: str) -> None:
+        pass
+    
+    def collect(self) -> Optional[Dict[str, Any]]:
+        return None
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+def _escape_label(value: Any) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,132 @@
+"""
+Versioned Model Artifacts for QSAR/QSPR/QSTR Models
+Directory format with a checksummed manifest, raw preprocessing arrays and the estimator
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+
+ARTIFACT_FORMAT_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+PREPROCESSING_FILE = 'preprocessing.npz'
+ESTIMATOR_FILE = 'estimator.joblib'
+
+class FixedFeatureMask:
+    """Feature selector restored from a saved boolean column mask"""
+    
+    def __init__(self, mask: np.ndarray):
+        self.mask = np.asarray(mask, dtype=bool)
+        self.n_features_in_ = len(self.mask)
+    
+    def get_support(self, indices: bool = False) -> np.ndarray:
+        return np.flatnonzero(self.mask) if indices else self.mask
+    
+    def transform(self, X: Any) -> Any:
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+        return X[:, self.mask]
+    
+    def __repr__(self) -> str:
+        return f"FixedFeatureMask(selected={int(self.mask.sum())}/{self.n_features_in_})"
+
+def is_artifact(path: str) -> bool:
+    """Check whether a path is a model artifact directory"""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+def file_checksum(filepath: str) -> str:
+    """Get the SHA-256 checksum of a file"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def to_json_safe(value: Any) -> Any:
+    """Convert nested values (NumPy arrays and scalars included) for JSON"""
+    if isinstance(value, dict):
+        return {str(key): to_json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(item) for item in value]
+    if isinstance(value, np.ma.MaskedArray):
+        return to_json_safe(value.tolist())
+    if isinstance(value, np.ndarray):
+        return to_json_safe(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def write_artifact(directory: str, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray],
+                   estimator: Any) -> None:
+    """Write an artifact directory, replacing any existing one atomically"""
+    directory = os.path.abspath(directory)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    
+    staging = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    
+    try:
+        np.savez(os.path.join(staging, PREPROCESSING_FILE), **arrays)
+        joblib.dump(estimator, os.path.join(staging, ESTIMATOR_FILE))
+        
+        manifest = dict(manifest, format_version=ARTIFACT_FORMAT_VERSION, checksums={
+            name: file_checksum(os.path.join(staging, name)) for name in (PREPROCESSING_FILE, ESTIMATOR_FILE)
+        })
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(to_json_safe(manifest), f, indent=2)
+        
+        if os.path.exists(directory):
+            previous = f"{directory}.old-{os.getpid()}"
+            os.replace(directory, previous)
+            os.replace(staging, directory)
+            shutil.rmtree(previous, ignore_errors=True)
+        else:
+            os.replace(staging, directory)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+def read_artifact(directory: str, verify: bool = True,
+                  mmap_mode: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, np.ndarray], Any]:
+    """Read an artifact directory as ``(manifest, arrays, estimator)``
+    
+    Preprocessing arrays are loaded without pickle. With ``verify`` every
+    file is checked against the manifest checksums before it is loaded.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"Not a model artifact: {directory}")
+    
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    
+    format_version = manifest.get('format_version')
+    if format_version != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {format_version}")
+    
+    if verify:
+        for name, checksum in manifest['checksums'].items():
+            if file_checksum(os.path.join(directory, name)) != checksum:
+                raise ValueError(f"Checksum mismatch for {name} in {directory}")
+    
+    with np.load(os.path.join(directory, PREPROCESSING_FILE), allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    
+    estimator = joblib.load(os.path.join(directory, ESTIMATOR_FILE), mmap_mode=mmap_mode)
+    return manifest, arrays, estimator
+
+def artifact_size(directory: str) -> int:
+    """Get the total size of the files in an artifact directory"""
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
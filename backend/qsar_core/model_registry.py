@@ -0,0 +1,286 @@
+"""
+Model Registry for QSAR/QSPR/QSTR Serving
+Indexes saved models by name/version/task with memory-mapped loading and an LRU cache
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+
+import joblib
+
+from .enhanced_modeling import EnhancedQSARModel
+from .fast_inference import CompiledForest
+from .model_artifact import MANIFEST_FILE, artifact_size, is_artifact
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+MODEL_EXTENSIONS = ('.pkl', '.joblib', '.npz')
+
+TASK_TYPES = ('regression', 'classification')
+
+# e.g. random_forest_regression_20250810_201701.joblib
+_DATED_NAME = re.compile(r'^(?P<name>.+)_(?P<version>\d{8}_\d{6})$')
+# e.g. cv_random_forest_1754906743.pkl
+_TIMESTAMPED_NAME = re.compile(r'^(?P<name>.+)_(?P<timestamp>\d{9,})$')
+
+class ModelEntry:
+    """A saved model file known to the registry"""
+    
+    def __init__(self, name: str, version: str, path: str, task_type: Optional[str] = None,
+                 model_type: Optional[str] = None, metadata_path: Optional[str] = None):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.task_type = task_type
+        self.model_type = model_type
+        self.metadata_path = metadata_path
+        self.size = artifact_size(path) if os.path.isdir(path) else os.path.getsize(path)
+    
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.version}"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'version': self.version,
+            'task_type': self.task_type,
+            'model_type': self.model_type,
+            'path': self.path,
+            'size': self.size
+        }
+    
+    def __repr__(self) -> str:
+        return f"ModelEntry({self.key!r}, task_type={self.task_type!r})"
+
+class ModelRegistry:
+    """Index of saved models with an in-process, memory-bounded LRU of loaded ones
+    
+    Files and artifact directories are indexed from their names
+    (``<name>_<YYYYmmdd_HHMMSS>`` or ``<name>_<unix time>``) and their
+    ``manifest.json`` or, for legacy files, ``_metadata.json``.
+    Loading uses joblib's ``mmap_mode`` so plain NumPy arrays in a model file
+    (and compiled ``.npz`` forests) are memory-mapped and shared between
+    worker processes through the page cache. sklearn trees copy their nodes
+    when unpickled, so compile forests for serving to get the sharing.
+    The memory bound is approximated by on-disk file sizes.
+    """
+    
+    def __init__(self, model_dir: str = DEFAULT_MODEL_DIR, max_memory_bytes: int = 512 * 1024 * 1024,
+                 mmap_mode: Optional[str] = 'r'):
+        self.model_dir = os.path.abspath(model_dir)
+        self.max_memory_bytes = max_memory_bytes
+        self.mmap_mode = mmap_mode
+        
+        self._entries = {}
+        self._loaded = OrderedDict()
+        self._loaded_bytes = 0
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self.refresh()
+    
+    def refresh(self) -> None:
+        """Rescan the model directory"""
+        entries = {}
+        if os.path.isdir(self.model_dir):
+            for filename in sorted(os.listdir(self.model_dir)):
+                path = os.path.join(self.model_dir, filename)
+                if filename.endswith(MODEL_EXTENSIONS) or is_artifact(path):
+                    entry = self._index_file(path)
+                    entries.setdefault(entry.name, {})[entry.version] = entry
+        
+        with self._lock:
+            self._entries = entries
+    
+    def _index_file(self, path: str) -> ModelEntry:
+        """Build the registry entry for one model file"""
+        artifact = is_artifact(path)
+        stem = os.path.basename(path) if artifact else os.path.splitext(os.path.basename(path))[0]
+        
+        match = _DATED_NAME.match(stem)
+        if match:
+            name, version = match.group('name'), match.group('version')
+        else:
+            match = _TIMESTAMPED_NAME.match(stem)
+            if match:
+                name = match.group('name')
+                timestamp = int(match.group('timestamp'))
+            else:
+                name = stem
+                timestamp = os.path.getmtime(path)
+            version = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y%m%d_%H%M%S')
+        
+        task_type = None
+        model_type = name
+        for task in TASK_TYPES:
+            if name.endswith(f'_{task}'):
+                task_type, model_type = task, name[:-len(task) - 1]
+        
+        if artifact:
+            metadata_path = os.path.join(path, MANIFEST_FILE)
+        else:
+            metadata_path = os.path.splitext(path)[0] + '_metadata.json'
+        if os.path.exists(metadata_path):
+            try:
+                with open(metadata_path, 'r') as f:
+                    metadata = json.load(f)
+                task_type = metadata.get('task_type', task_type)
+                model_type = metadata.get('model_type', model_type)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read model metadata {metadata_path}: {e}")
+                metadata_path = None
+        else:
+            metadata_path = None
+        
+        return ModelEntry(name, version, path, task_type, model_type, metadata_path)
+    
+    def list_models(self, name: Optional[str] = None, task_type: Optional[str] = None) -> List[ModelEntry]:
+        """List indexed models, oldest version first"""
+        with self._lock:
+            entries = [entry for versions in self._entries.values() for entry in versions.values()]
+        
+        return sorted((entry for entry in entries
+                       if (name is None or entry.name == name) and
+                       (task_type is None or entry.task_type == task_type)),
+                      key=lambda entry: (entry.name, entry.version))
+    
+    def resolve(self, name: str, version: Optional[str] = None, task_type: Optional[str] = None) -> ModelEntry:
+        """Find a model entry; the latest version unless ``version`` is given"""
+        entries = self.list_models(name, task_type)
+        if version not in (None, 'latest'):
+            entries = [entry for entry in entries if entry.version == version]
+        
+        if not entries:
+            raise ValueError(f"Model not found: {name}" + (f"@{version}" if version else ""))
+        
+        return entries[-1]
+    
+    def get(self, name: str, version: Optional[str] = None, task_type: Optional[str] = None) -> Any:
+        """Get a loaded model, loading and caching it on first use
+        
+        Loading happens outside the registry lock, so a cold load only blocks
+        other callers waiting for the same model.
+        """
+        entry = self.resolve(name, version, task_type)
+        
+        with self._lock:
+            model = self._cached(entry.key)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(entry.key, threading.Lock())
+        
+        with load_lock:
+            # Another caller may have finished loading while this one waited
+            with self._lock:
+                model = self._cached(entry.key)
+                if model is not None:
+                    return model
+                self.misses += 1
+            
+            try:
+                model = self._load(entry)
+            except BaseException:
+                with self._lock:
+                    self._load_locks.pop(entry.key, None)
+                raise
+            
+            with self._lock:
+                self._loaded[entry.key] = (model, entry.size)
+                self._loaded_bytes += entry.size
+                self._load_locks.pop(entry.key, None)
+                self._evict()
+            return model
+    
+    def _cached(self, key: str) -> Any:
+        """Get a loaded model and mark it most recently used, or None (call with the lock held)"""
+        if key not in self._loaded:
+            return None
+        self._loaded.move_to_end(key)
+        self.hits += 1
+        return self._loaded[key][0]
+    
+    def _load(self, entry: ModelEntry) -> Any:
+        """Load a model file"""
+        if entry.path.endswith('.npz'):
+            return CompiledForest.load(entry.path, mmap_mode=self.mmap_mode)
+        if entry.metadata_path or os.path.isdir(entry.path):
+            return EnhancedQSARModel.load_model(entry.path, mmap_mode=self.mmap_mode)
+        return joblib.load(entry.path, mmap_mode=self.mmap_mode)
+    
+    def _evict(self) -> None:
+        """Drop least recently used models until under the memory bound"""
+        # Always keep the most recent model, even if it alone exceeds the bound
+        while self._loaded_bytes > self.max_memory_bytes and len(self._loaded) > 1:
+            _, (_, size) = self._loaded.popitem(last=False)
+            self._loaded_bytes -= size
+            self.evictions += 1
+    
+    def preload(self, config: Union[str, List[Union[str, Dict[str, str]]]]) -> List[ModelEntry]:
+        """Load configured models ahead of the first request
+        
+        ``config`` is a list of model names or ``{'name', 'version', 'task_type'}``
+        dicts, or the path to a JSON file holding such a list (optionally
+        under a ``'preload'`` key).
+        """
+        if isinstance(config, str):
+            with open(config, 'r') as f:
+                config = json.load(f)
+            if isinstance(config, dict):
+                config = config.get('preload', [])
+        
+        loaded = []
+        for spec in config:
+            if isinstance(spec, str):
+                spec = {'name': spec}
+            entry = self.resolve(spec['name'], spec.get('version'), spec.get('task_type'))
+            try:
+                self.get(entry.name, entry.version)
+                loaded.append(entry)
+            except Exception as e:
+                print(f"Warning: Could not preload model {entry.key}: {e}")
+        
+        return loaded
+    
+    def unload(self, name: Optional[str] = None) -> None:
+        """Drop loaded models (all of them, or all versions of ``name``)"""
+        with self._lock:
+            for key in list(self._loaded):
+                if name is None or key.split('@')[0] == name:
+                    _, size = self._loaded.pop(key)
+                    self._loaded_bytes -= size
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        with self._lock:
+            return {
+                'indexed_models': sum(len(versions) for versions in self._entries.values()),
+                'loaded_models': list(self._loaded),
+                'loaded_bytes': self._loaded_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+_default_registry = None
+
+# Convenience functions
+def get_model_registry(model_dir: str = DEFAULT_MODEL_DIR) -> ModelRegistry:
+    """Get the process-wide model registry, creating it on first use"""
+    global _default_registry
+    if _default_registry is None or _default_registry.model_dir != os.path.abspath(model_dir):
+        _default_registry = ModelRegistry(model_dir)
+    return _default_registry
+
+def load_registered_model(name: str, version: Optional[str] = None, task_type: Optional[str] = None) -> Any:
+    """Load a model through the process-wide registry"""
+    return get_model_registry().get(name, version, task_type)
@@ -0,0 +1,88 @@
+"""
+Molecule Context for QSAR/QSPR/QSTR Descriptor Calculation
+Parse a molecule once and memoize the intermediates shared by descriptor groups
+"""
+
+from typing import Any, Callable, Hashable, Optional, Union
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import rdPartialCharges
+
+class MoleculeContext:
+    """A parsed molecule plus lazily computed, memoized derived state
+    
+    Pass one context through every descriptor group (and on to other
+    consumers such as a prediction) instead of re-parsing the SMILES or
+    recomputing hydrogens, charges, ring perception and fingerprints.
+    Contexts are not thread-safe; use one per thread.
+    """
+    
+    def __init__(self, mol: Chem.Mol, smiles: Optional[str] = None):
+        if mol is None:
+            raise ValueError(f"Invalid SMILES: {smiles}")
+        self.mol = mol
+        self.smiles = smiles
+        self._memo = {}
+    
+    @classmethod
+    def from_smiles(cls, smiles: str) -> 'MoleculeContext':
+        """Parse and sanitize a SMILES string"""
+        return cls(Chem.MolFromSmiles(smiles), smiles)
+    
+    @classmethod
+    def coerce(cls, molecule: Union[str, Chem.Mol, 'MoleculeContext']) -> 'MoleculeContext':
+        """Wrap a SMILES string or molecule in a context (contexts pass through)"""
+        if isinstance(molecule, cls):
+            return molecule
+        if isinstance(molecule, str):
+            return cls.from_smiles(molecule)
+        return cls(molecule)
+    
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Get a memoized value, computing it with ``factory`` on first use"""
+        if key not in self._memo:
+            self._memo[key] = factory()
+        return self._memo[key]
+    
+    def __contains__(self, key: Hashable) -> bool:
+        """Check whether a value is already memoized"""
+        return key in self._memo
+    
+    def clear(self) -> None:
+        """Drop all memoized state"""
+        self._memo.clear()
+    
+    @property
+    def canonical_smiles(self) -> str:
+        return self.get('canonical_smiles', lambda: Chem.MolToSmiles(self.mol))
+    
+    @property
+    def mol_h(self) -> Chem.Mol:
+        """The molecule with explicit hydrogens (do not modify; copy it first)"""
+        return self.get('mol_h', lambda: Chem.AddHs(self.mol))
+    
+    @property
+    def ring_info(self) -> Chem.RingInfo:
+        return self.get('ring_info', self.mol.GetRingInfo)
+    
+    @property
+    def gasteiger_charges(self) -> np.ndarray:
+        """Gasteiger partial charges per heavy atom
+        
+        Reuses the charges RDKit's ``MinPartialCharge``/``MaxPartialCharge``
+        leave on ``mol`` when those ran first.
+        """
+        def compute() -> np.ndarray:
+            if not hasattr(self.mol, '_chargeDescriptors'):
+                rdPartialCharges.ComputeGasteigerCharges(self.mol)
+            return np.array([float(atom.GetProp('_GasteigerCharge')) for atom in self.mol.GetAtoms()])
+        
+        return self.get('gasteiger_charges', compute)
+    
+    def fingerprint(self, name: str, function: Callable[[Chem.Mol], Any]) -> Any:
+        """Get a memoized fingerprint computed by ``function`` from ``mol``"""
+        return self.get(('fingerprint', name), lambda: function(self.mol))
+    
+    def __repr__(self) -> str:
+        return f"MoleculeContext({self.smiles or self.canonical_smiles!r})"
@@ -0,0 +1,211 @@
+"""
+Parallel Execution Utilities for QSAR/QSPR/QSTR Workloads
+Chunked process-pool execution with crash and timeout isolation
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+# Number of times a chunk may be resubmitted whole after a pool failure it was
+# not observed to be part of, before it is bisected like a suspect chunk
+MAX_REQUEUES = 2
+
+# Arrays smaller than this are cheaper to pickle than to memory-map
+SHARED_MIN_BYTES = 1024 * 1024
+
+def resolve_n_jobs(n_jobs: Optional[int]) -> int:
+    """Resolve a joblib-style worker count (-1 = all cores) to a positive integer"""
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, cpu_count + 1 + n_jobs)
+    return n_jobs
+
+def kill_executor(executor: ProcessPoolExecutor) -> None:
+    """Terminate the worker processes of a hung or broken executor"""
+    kill_workers = getattr(executor, 'kill_workers', None)
+    if kill_workers is not None:
+        try:
+            kill_workers()
+        except Exception:
+            pass
+    else:
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+    executor.shutdown(wait=False, cancel_futures=True)
+
+@contextmanager
+def shared_array(X: Any, n_jobs: Optional[int], min_bytes: int = SHARED_MIN_BYTES) -> Iterator[Any]:
+    """Yield a read-only memory-mapped copy of a dense array for parallel stages
+    
+    joblib passes memmaps to its workers by file reference, so every task of
+    every stage (tuning, cross-validation, RFE) reads the same pages instead of
+    receiving its own pickled copy. Small, sparse or serial inputs are yielded
+    unchanged. The backing file is removed on exit.
+    """
+    if (resolve_n_jobs(n_jobs) == 1 or not isinstance(X, np.ndarray) or isinstance(X, np.memmap)
+            or X.nbytes < min_bytes):
+        yield X
+        return
+    
+    folder = tempfile.mkdtemp(prefix='qsar_shared_')
+    try:
+        path = os.path.join(folder, 'features.joblib')
+        joblib.dump(np.ascontiguousarray(X), path)
+        yield joblib.load(path, mmap_mode='r')
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def run_chunked(worker: Callable, items: Sequence, on_result: Callable[[int, Any], None],
+                on_failure: Callable[[int, str], None], args: Tuple = (), n_jobs: int = -1,
+                chunk_size: int = 64, timeout: Optional[float] = None,
+                initializer: Optional[Callable] = None, initargs: Tuple = ()) -> None:
+    """Run ``worker(items[start:stop], *args)`` over chunks in a process pool
+    
+    ``on_result(start, result)`` is called in the parent for every chunk that
+    completes; results can therefore be written back in input order. ``timeout``
+    is a per-item budget in seconds, so a chunk may run for ``timeout * len(chunk)``.
+    Chunks whose worker crashes, raises or exceeds its budget are bisected and
+    retried; single items that still fail are run in their own process and,
+    if they fail again, reported through ``on_failure(index, message)``.
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    chunk_size = max(1, int(chunk_size))
+    
+    queue = [(start, min(start + chunk_size, len(items))) for start in range(0, len(items), chunk_size)]
+    requeues = {}
+    isolated = []
+    
+    while queue:
+        failed, interrupted = _run_pool_round(worker, items, queue, args, n_jobs, timeout,
+                                              on_result, initializer, initargs)
+        queue = []
+        
+        for start, stop in interrupted:
+            requeues[(start, stop)] = requeues.get((start, stop), 0) + 1
+            if requeues[(start, stop)] > MAX_REQUEUES:
+                failed.append((start, stop))
+            else:
+                queue.append((start, stop))
+        
+        # Bisect failed chunks until the offending items are isolated
+        for start, stop in failed:
+            if stop - start == 1:
+                isolated.append(start)
+            else:
+                middle = (start + stop) // 2
+                queue.extend([(start, middle), (middle, stop)])
+    
+    if isolated:
+        _run_isolated(worker, items, sorted(isolated), args, n_jobs, initializer, initargs,
+                      timeout, on_result, on_failure)
+
+def _run_pool_round(worker: Callable, items: Sequence, ranges: List[Tuple[int, int]], args: Tuple,
+                    n_jobs: int, timeout: Optional[float], on_result: Callable[[int, Any], None],
+                    initializer: Optional[Callable] = None, initargs: Tuple = ()) -> Tuple[List, List]:
+    """Run one pool over ``ranges``; return (failed, interrupted) ranges
+    
+    Workers record when they pick up a chunk in a shared array. The executor
+    reports look-ahead chunks still waiting in its call queue as running, so
+    ``future.running()`` cannot tell when a chunk's budget starts.
+    """
+    failed, interrupted = [], []
+    poll_interval = None if timeout is None else min(0.5, max(0.01, timeout / 4))
+    
+    start_times = multiprocessing.RawArray('d', len(ranges))
+    executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_pool_worker,
+                                   initargs=(start_times, initializer, initargs))
+    pending = {executor.submit(_run_timed, slot, worker, items[start:stop], args): (slot, start, stop)
+               for slot, (start, stop) in enumerate(ranges)}
+    broken = killed = False
+    
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            now = time.time()
+            
+            for future in done:
+                slot, start, stop = pending.pop(future)
+                try:
+                    on_result(start, future.result())
+                except BrokenProcessPool:
+                    broken = True
+                    # Only chunks that were actually executing can have caused the crash
+                    (failed if start_times[slot] > 0 else interrupted).append((start, stop))
+                except Exception:
+                    failed.append((start, stop))
+            
+            hung = []
+            if timeout is not None:
+                for future, (slot, start, stop) in pending.items():
+                    if start_times[slot] > 0 and now - start_times[slot] > timeout * (stop - start):
+                        hung.append(future)
+            
+            if hung or broken:
+                for future in hung:
+                    failed.append(pending.pop(future)[1:])
+                for slot, start, stop in pending.values():
+                    (failed if broken and start_times[slot] > 0 else interrupted).append((start, stop))
+                pending = {}
+                kill_executor(executor)
+                killed = True
+    finally:
+        if not killed:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    return failed, interrupted
+
+_start_times = None
+
+def _init_pool_worker(start_times: Any, initializer: Optional[Callable], initargs: Tuple) -> None:
+    """Install the shared start-time array, then run the caller's initializer"""
+    global _start_times
+    _start_times = start_times
+    if initializer is not None:
+        initializer(*initargs)
+
+def _run_timed(slot: int, worker: Callable, chunk: Sequence, args: Tuple) -> Any:
+    """Record when a chunk actually starts executing, then run it"""
+    _start_times[slot] = time.time()
+    return worker(chunk, *args)
+
+def _run_isolated(worker: Callable, items: Sequence, indices: List[int], args: Tuple, n_jobs: int,
+                  initializer: Optional[Callable], initargs: Tuple, timeout: Optional[float],
+                  on_result: Callable[[int, Any], None], on_failure: Callable[[int, str], None]) -> None:
+    """Run each item in its own single-worker process so failures are attributable"""
+    for batch_start in range(0, len(indices), n_jobs):
+        running = []
+        for index in indices[batch_start:batch_start + n_jobs]:
+            executor = ProcessPoolExecutor(max_workers=1, initializer=initializer, initargs=initargs)
+            running.append((index, executor, executor.submit(worker, items[index:index + 1], *args)))
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for index, executor, future in running:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                on_result(index, future.result(timeout=remaining))
+                executor.shutdown(wait=True)
+            except FutureTimeoutError:
+                on_failure(index, f"Timed out after {timeout} s")
+                kill_executor(executor)
+            except BrokenProcessPool:
+                on_failure(index, "Worker process crashed")
+                kill_executor(executor)
+            except Exception as e:
+                on_failure(index, f"Worker error: {e}")
+                kill_executor(executor)
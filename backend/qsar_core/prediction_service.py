@@ -0,0 +1,313 @@
+"""
+Asynchronous Prediction Service for QSAR/QSPR/QSTR Models
+Coalesces single-molecule requests into micro-batches run in a worker pool
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .enhanced_descriptors import EnhancedDescriptors
+from .instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from .model_registry import get_model_registry
+from .parallel import kill_executor, resolve_n_jobs
+
+EXECUTOR_TYPES = ['process', 'thread']
+
+class ServiceOverloadedError(RuntimeError):
+    """Raised when the request queue stays full for longer than ``max_queue_wait``"""
+
+class PredictionService:
+    """Featurize-and-predict service for concurrent single-molecule requests
+    
+    Requests are queued (at most ``max_queue_size`` waiting) and coalesced
+    into batches of up to ``max_batch_size`` SMILES, waiting at most
+    ``max_wait`` seconds after the first request of a batch. At most
+    ``max_workers`` batches run at once, so under load requests accumulate
+    into larger batches and, once the queue is full, callers wait up to
+    ``max_queue_wait`` seconds (``None`` = indefinitely) before
+    ``ServiceOverloadedError`` is raised.
+    
+    With ``executor='process'`` each worker process holds its own copy of
+    the calculator and model, so a slow 3D embedding only occupies one
+    worker; a molecule that crashes a worker is retried alone and reported
+    as an error. With ``executor='thread'`` featurization is serialized (the
+    calculator is not thread-safe) and prediction runs in parallel.
+    """
+    
+    def __init__(self, model: Any, calculator: Optional[EnhancedDescriptors] = None,
+                 features: Optional[List[str]] = None, include_3d: Optional[bool] = None,
+                 max_batch_size: int = 32, max_wait: float = 0.005, max_queue_size: int = 1024,
+                 max_queue_wait: Optional[float] = 1.0, executor: str = 'process',
+                 max_workers: Optional[int] = None, return_proba: bool = False,
+                 instrumentation: Optional[Instrumentation] = None):
+        if executor not in EXECUTOR_TYPES:
+            raise ValueError(f"Invalid executor: {executor}. Use one of {EXECUTOR_TYPES}")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        
+        self.features = list(features) if features is not None else getattr(model, 'input_feature_names', None)
+        if not self.features:
+            raise ValueError("Model has no input feature names; pass the descriptor names as features")
+        
+        self.model = model
+        self.calculator = calculator or EnhancedDescriptors()
+        if include_3d is None:
+            include_3d = self.calculator.build_plan(self.features).needs_3d
+        self.include_3d = include_3d
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self.max_queue_wait = max_queue_wait
+        self.executor_type = executor
+        self.max_workers = resolve_n_jobs(max_workers if max_workers is not None else -1)
+        self.return_proba = return_proba
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        
+        self._queue = None
+        self._slots = None
+        self._batcher = None
+        self._executor = None
+        self._batches = set()
+        self._featurize_lock = threading.Lock()
+        
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._batcher is not None
+    
+    async def __aenter__(self) -> 'PredictionService':
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+    
+    async def start(self) -> None:
+        """Start the worker pool and the batching loop"""
+        if self.running:
+            return
+        
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._executor = self._create_executor()
+        self._batcher = asyncio.create_task(self._batch_loop())
+    
+    async def stop(self) -> None:
+        """Finish running batches, fail queued requests and shut the pool down"""
+        if not self.running:
+            return
+        
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._batcher = None
+        
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction service stopped"))
+        
+        self._executor.shutdown(wait=True)
+        self._executor = None
+    
+    async def predict(self, smiles: str) -> Dict[str, Any]:
+        """Predict one molecule
+        
+        Returns ``{'smiles', 'prediction', 'error'}`` (plus ``'probabilities'``
+        with ``return_proba``); invalid molecules get ``prediction=None`` and
+        an error message rather than an exception.
+        """
+        if not self.running:
+            raise RuntimeError("Prediction service is not running")
+        
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        try:
+            if self.max_queue_wait == 0:
+                self._queue.put_nowait((smiles, future))
+            else:
+                await asyncio.wait_for(self._queue.put((smiles, future)), self.max_queue_wait)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.rejected += 1
+            self.instrumentation.increment('service_rejected')
+            raise ServiceOverloadedError(f"Prediction queue is full ({self.max_queue_size} requests waiting)")
+        
+        return await future
+    
+    async def predict_many(self, smiles_list: Iterable[str]) -> List[Dict[str, Any]]:
+        """Predict several molecules, batched together with other callers' requests"""
+        return list(await asyncio.gather(*(self.predict(smiles) for smiles in smiles_list)))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get queue and batching counters"""
+        return {
+            'running': self.running,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_size': self.max_queue_size,
+            'batches_in_flight': len(self._batches),
+            'max_workers': self.max_workers,
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.0
+        }
+    
+    def _create_executor(self) -> Executor:
+        if self.executor_type == 'thread':
+            return ThreadPoolExecutor(max_workers=self.max_workers)
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_service_worker,
+                                   initargs=(self.calculator, self.model, self.features,
+                                             self.include_3d, self.return_proba))
+    
+    async def _batch_loop(self) -> None:
+        """Collect queued requests into batches and dispatch them to free workers"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            # Take a worker slot first so that requests keep accumulating while all are busy
+            await self._slots.acquire()
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except BaseException:
+                # Requests already taken off the queue would otherwise never resolve
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Prediction service stopped"))
+                self._slots.release()
+                raise
+            
+            # Callers that gave up are not computed
+            batch = [(smiles, future) for smiles, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Run one batch in the pool and resolve its callers' futures"""
+        smiles_list = [smiles for smiles, _ in batch]
+        self.batches += 1
+        self.batched_requests += len(batch)
+        
+        try:
+            with self.instrumentation.stage('service_batch'):
+                results = await self._execute(smiles_list)
+        except Exception as e:
+            results = [_error_result(smiles, f"Prediction failed: {e}") for smiles in smiles_list]
+        finally:
+            self._slots.release()
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+    
+    async def _execute(self, smiles_list: List[str]) -> List[Dict[str, Any]]:
+        """Run featurization and prediction for a batch, isolating molecules that crash a worker"""
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        
+        try:
+            if self.executor_type == 'thread':
+                return await loop.run_in_executor(executor, self._predict_in_thread, smiles_list)
+            return await loop.run_in_executor(executor, _run_service_batch, smiles_list)
+        except BrokenProcessPool:
+            # Replace the pool once, even if several in-flight batches saw it break
+            if self._executor is executor:
+                kill_executor(executor)
+                self._executor = self._create_executor()
+        
+        if len(smiles_list) == 1:
+            return [_error_result(smiles_list[0], "Prediction failed: worker process crashed")]
+        
+        results = []
+        for smiles in smiles_list:
+            results.extend(await self._execute([smiles]))
+        return results
+    
+    def _predict_in_thread(self, smiles_list: List[str]) -> List[Dict[str, Any]]:
+        with self._featurize_lock:
+            values, errors = self.calculator.calculate_batch(smiles_list, self.include_3d,
+                                                             features=self.features)
+        return _predict_rows(self.model, smiles_list, values, errors, self.return_proba)
+
+def _error_result(smiles: str, message: str) -> Dict[str, Any]:
+    return {'smiles': smiles, 'prediction': None, 'error': message}
+
+def _to_python(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+def _predict_rows(model: Any, smiles_list: List[str], values: np.ndarray, errors: np.ndarray,
+                  return_proba: bool) -> List[Dict[str, Any]]:
+    """Predict the rows that featurized to finite values and build one result per molecule"""
+    valid = np.array([error is None for error in errors], dtype=bool)
+    results = [_error_result(smiles, error) for smiles, error in zip(smiles_list, errors)]
+    
+    # Descriptors that came out NaN/inf would make the model fail for the whole batch
+    finite = np.isfinite(values).all(axis=1)
+    for row in np.flatnonzero(valid & ~finite):
+        results[row]['error'] = "Non-finite descriptor values"
+    valid &= finite
+    if not valid.any():
+        return results
+    
+    rows = np.flatnonzero(valid)
+    predictions = model.predict(values[rows])
+    probabilities = model.predict_proba(values[rows]) if return_proba else None
+    
+    for position, row in enumerate(rows):
+        results[row]['prediction'] = _to_python(predictions[position])
+        if probabilities is not None:
+            results[row]['probabilities'] = probabilities[position].tolist()
+    return results
+
+# Process-pool workers
+_service_state = None
+
+def _init_service_worker(calculator: EnhancedDescriptors, model: Any, features: List[str],
+                         include_3d: bool, return_proba: bool) -> None:
+    """Install the calculator and model used by service worker processes"""
+    global _service_state
+    _service_state = (calculator, model, features, include_3d, return_proba)
+
+def _run_service_batch(smiles_list: List[str]) -> List[Dict[str, Any]]:
+    """Featurize and predict a batch inside a worker process"""
+    calculator, model, features, include_3d, return_proba = _service_state
+    values, errors = calculator.calculate_batch(smiles_list, include_3d, features=features)
+    return _predict_rows(model, smiles_list, values, errors, return_proba)
+
+# Convenience functions
+def create_prediction_service(name: str, version: Optional[str] = None, task_type: Optional[str] = None,
+                              **kwargs) -> PredictionService:
+    """Create a prediction service for a model from the process-wide registry"""
+    model = get_model_registry().get(name, version, task_type)
+    return PredictionService(model, **kwargs)
@@ -0,0 +1,303 @@
+"""
+Fingerprint Similarity Index for QSAR/QSPR/QSTR Compound Libraries
+Memory-mapped packed fingerprints with pruned Tanimoto top-k and threshold search
+"""
+
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from rdkit import Chem
+
+from .fast_inference import memmap_npz
+from .fingerprints import calculate_packed_fingerprints, fingerprint_length, get_fingerprint_function
+from .parallel import resolve_n_jobs, run_chunked
+
+INDEX_FORMAT_VERSION = 1
+
+# Rows compared per vectorized step (bounds the temporary AND/popcount arrays)
+SCAN_BLOCK_ROWS = 65536
+
+# Below this many rows a scan is not split across threads
+PARALLEL_MIN_ROWS = 16384
+
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcount_rows(words: np.ndarray) -> np.ndarray:
+    """Count the set bits of each row of a uint64 matrix"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+def pack_words(packed: np.ndarray) -> np.ndarray:
+    """Convert packed uint8 fingerprint rows to uint64 words, zero-padding each row"""
+    packed = np.atleast_2d(packed)
+    n_words = (packed.shape[1] + 7) // 8
+    words = np.zeros((packed.shape[0], n_words * 8), dtype=np.uint8)
+    words[:, :packed.shape[1]] = packed
+    return words.view(np.uint64)
+
+class SimilarityIndex:
+    """Tanimoto search over a packed-bit fingerprint database
+    
+    Rows are stored as uint64 words sorted by popcount. Since
+    ``tanimoto(a, b) <= min(|a|, |b|) / max(|a|, |b|)``, threshold queries only
+    scan the popcount window that can reach the threshold, and top-k queries
+    scan outward from the query's popcount until no remaining row can beat
+    the current k-th best. Scans of large windows are split across
+    ``n_jobs`` threads (NumPy releases the GIL in the bitwise kernels).
+    """
+    
+    def __init__(self, fingerprints: np.ndarray, popcounts: np.ndarray, order: np.ndarray,
+                 fp_type: str = 'morgan', n_bits: int = 2048, radius: int = 2,
+                 ids: Optional[np.ndarray] = None, n_jobs: int = 1):
+        self.fingerprints = fingerprints
+        self.popcounts = popcounts
+        self.order = order
+        self.fp_type = fp_type
+        self.n_bits = n_bits
+        self.radius = radius
+        self.ids = ids
+        self.n_jobs = resolve_n_jobs(n_jobs)
+        self._executor = None
+    
+    def __len__(self) -> int:
+        return len(self.popcounts)
+    
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        return state
+    
+    @classmethod
+    def from_packed(cls, packed: np.ndarray, fp_type: str = 'morgan', n_bits: int = 2048, radius: int = 2,
+                    ids: Optional[Sequence[str]] = None, n_jobs: int = 1) -> 'SimilarityIndex':
+        """Build an index from a packed uint8 fingerprint matrix (row i = compound i)"""
+        words = pack_words(packed)
+        popcounts = popcount_rows(words)
+        order = np.argsort(popcounts, kind='stable')
+        return cls(np.ascontiguousarray(words[order]), popcounts[order], order, fp_type, n_bits, radius,
+                   np.asarray(ids, dtype=str) if ids is not None else None, n_jobs)
+    
+    @classmethod
+    def build(cls, smiles_list: Iterable[str], fp_type: str = 'morgan', n_bits: int = 2048, radius: int = 2,
+              ids: Optional[Sequence[str]] = None, n_jobs: int = 1,
+              chunk_size: int = 1024) -> Tuple['SimilarityIndex', np.ndarray]:
+        """Fingerprint a SMILES library and index it
+        
+        Returns ``(index, errors)``. Invalid SMILES are left out of the index;
+        results always refer to positions in ``smiles_list`` (and ``ids``,
+        which default to the SMILES themselves).
+        """
+        smiles_list = list(smiles_list)
+        length = fingerprint_length(fp_type, n_bits)
+        
+        if n_jobs == 1:
+            packed, errors = calculate_packed_fingerprints(smiles_list, fp_type, n_bits, radius)
+        else:
+            packed = np.zeros((len(smiles_list), (length + 7) // 8), dtype=np.uint8)
+            errors = np.full(len(smiles_list), None, dtype=object)
+            
+            def on_result(start: int, block: Tuple[np.ndarray, np.ndarray]) -> None:
+                packed[start:start + len(block[0])] = block[0]
+                errors[start:start + len(block[1])] = block[1]
+            
+            def on_failure(index: int, message: str) -> None:
+                errors[index] = f"Error calculating fingerprint: {message}"
+            
+            run_chunked(calculate_packed_fingerprints, smiles_list, on_result, on_failure,
+                        args=(fp_type, n_bits, radius), n_jobs=n_jobs, chunk_size=chunk_size)
+        
+        valid = np.flatnonzero([error is None for error in errors])
+        index = cls.from_packed(packed[valid], fp_type, n_bits, radius, n_jobs=n_jobs)
+        # Map index rows back to positions in the input library
+        index.order = valid[index.order]
+        index.ids = np.asarray(ids if ids is not None else smiles_list, dtype=str)
+        return index, errors
+    
+    def save(self, filepath: str) -> None:
+        """Save as an uncompressed .npz that ``load`` can memory-map"""
+        metadata = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'fp_type': self.fp_type,
+            'n_bits': self.n_bits,
+            'radius': self.radius
+        }
+        arrays = {
+            'fingerprints': np.asarray(self.fingerprints),
+            'popcounts': np.asarray(self.popcounts),
+            'order': np.asarray(self.order),
+            'metadata': np.array(json.dumps(metadata))
+        }
+        if self.ids is not None:
+            arrays['ids'] = np.asarray(self.ids)
+        
+        directory = os.path.dirname(os.path.abspath(filepath))
+        os.makedirs(directory, exist_ok=True)
+        np.savez(filepath, **arrays)
+    
+    @classmethod
+    def load(cls, filepath: str, mmap_mode: Optional[str] = 'r', n_jobs: int = 1) -> 'SimilarityIndex':
+        """Load a saved index, memory-mapping its arrays unless ``mmap_mode`` is None"""
+        if mmap_mode is not None:
+            arrays = memmap_npz(filepath, mmap_mode)
+        else:
+            with np.load(filepath, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        
+        metadata = json.loads(str(arrays['metadata']))
+        if metadata.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported similarity index format version: {metadata.get('format_version')}")
+        
+        return cls(arrays['fingerprints'], arrays['popcounts'], arrays['order'], metadata['fp_type'],
+                   metadata['n_bits'], metadata['radius'], arrays.get('ids'), n_jobs)
+    
+    def query_fingerprint(self, query: Union[str, Chem.Mol, np.ndarray]) -> np.ndarray:
+        """Get the uint64 fingerprint words of a SMILES, molecule or packed uint8 row"""
+        if isinstance(query, np.ndarray):
+            if query.dtype == np.uint64:
+                return query.reshape(-1)
+            return pack_words(query.astype(np.uint8, copy=False))[0]
+        
+        mol = Chem.MolFromSmiles(query) if isinstance(query, str) else query
+        if mol is None:
+            raise ValueError(f"Invalid SMILES: {query}")
+        
+        bits = get_fingerprint_function(self.fp_type, self.n_bits, self.radius)(mol)
+        return pack_words(np.packbits(bits))[0]
+    
+    def search(self, query: Union[str, Chem.Mol, np.ndarray], k: Optional[int] = 10,
+               threshold: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the most similar compounds
+        
+        Returns ``(indices, similarities)`` sorted by decreasing Tanimoto
+        similarity, where indices refer to the original library order. With
+        ``k=None`` every compound with similarity >= ``threshold`` is
+        returned; otherwise at most ``k`` of them.
+        """
+        words = self.query_fingerprint(query)
+        count = int(popcount_rows(words[None, :])[0])
+        
+        if k is None:
+            rows, similarities = self._threshold_search(words, count, threshold)
+        else:
+            rows, similarities = self._top_k_search(words, count, k, threshold)
+        
+        ranking = np.lexsort((rows, -similarities))
+        rows, similarities = rows[ranking], similarities[ranking]
+        return np.asarray(self.order)[rows], similarities
+    
+    def search_many(self, queries: Iterable[Union[str, Chem.Mol, np.ndarray]], k: Optional[int] = 10,
+                    threshold: float = 0.0) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Run ``search`` for several queries; invalid queries give empty results"""
+        results = []
+        for query in queries:
+            try:
+                results.append(self.search(query, k, threshold))
+            except ValueError:
+                results.append((np.zeros(0, dtype=np.int64), np.zeros(0)))
+        return results
+    
+    def _window(self, count: int, threshold: float) -> Tuple[int, int]:
+        """Get the sorted-row range whose popcounts can reach ``threshold``"""
+        if threshold <= 0:
+            return 0, len(self)
+        low = math.ceil(threshold * count - 1e-9)
+        high = math.floor(count / threshold + 1e-9)
+        return (int(np.searchsorted(self.popcounts, low, side='left')),
+                int(np.searchsorted(self.popcounts, high, side='right')))
+    
+    def _threshold_search(self, words: np.ndarray, count: int,
+                          threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        start, stop = self._window(count, threshold)
+        similarities = self._similarities(words, count, start, stop)
+        keep = np.flatnonzero(similarities >= threshold)
+        return keep + start, similarities[keep]
+    
+    def _top_k_search(self, words: np.ndarray, count: int, k: int,
+                      threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Scan outward from the query's popcount, best bound first, until the bound drops below the k-th best"""
+        start, stop = self._window(count, threshold)
+        center = int(np.searchsorted(self.popcounts, count, side='left'))
+        low = high = min(max(center, start), stop)
+        block = max(SCAN_BLOCK_ROWS, k)
+        
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_similarities = np.zeros(0)
+        while low > start or high < stop:
+            # Upper bounds of the nearest unscanned rows on each side
+            left_bound = self._bound(count, int(self.popcounts[low - 1])) if low > start else -1.0
+            right_bound = self._bound(count, int(self.popcounts[high])) if high < stop else -1.0
+            kth_best = best_similarities.min() if len(best_similarities) >= k else threshold
+            if max(left_bound, right_bound) < kth_best:
+                break
+            
+            if left_bound >= right_bound:
+                scan_start, scan_stop = max(start, low - block), low
+                low = scan_start
+            else:
+                scan_start, scan_stop = high, min(stop, high + block)
+                high = scan_stop
+            
+            similarities = self._similarities(words, count, scan_start, scan_stop)
+            keep = np.flatnonzero(similarities >= threshold)
+            best_rows = np.concatenate([best_rows, keep + scan_start])
+            best_similarities = np.concatenate([best_similarities, similarities[keep]])
+            if len(best_similarities) > k:
+                top = np.argpartition(-best_similarities, k - 1)[:k]
+                best_rows, best_similarities = best_rows[top], best_similarities[top]
+        
+        return best_rows, best_similarities
+    
+    @staticmethod
+    def _bound(count: int, other: int) -> float:
+        if count == 0 and other == 0:
+            return 0.0
+        return min(count, other) / max(count, other)
+    
+    def _similarities(self, words: np.ndarray, count: int, start: int, stop: int) -> np.ndarray:
+        """Tanimoto similarities of the query to sorted rows ``start:stop``"""
+        if self.n_jobs > 1 and stop - start >= PARALLEL_MIN_ROWS:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.n_jobs)
+            bounds = np.linspace(start, stop, self.n_jobs + 1).astype(int)
+            parts = self._executor.map(lambda part: self._scan(words, count, part[0], part[1]),
+                                       zip(bounds[:-1], bounds[1:]))
+            return np.concatenate(list(parts))
+        return self._scan(words, count, start, stop)
+    
+    def _scan(self, words: np.ndarray, count: int, start: int, stop: int) -> np.ndarray:
+        similarities = np.empty(stop - start)
+        for block_start in range(start, stop, SCAN_BLOCK_ROWS):
+            block_stop = min(stop, block_start + SCAN_BLOCK_ROWS)
+            common = popcount_rows(np.bitwise_and(self.fingerprints[block_start:block_stop], words))
+            union = count + self.popcounts[block_start:block_stop] - common
+            np.divide(common, union, out=similarities[block_start - start:block_stop - start],
+                      where=union > 0)
+            similarities[block_start - start:block_stop - start][union == 0] = 0.0
+        return similarities
+    
+    def close(self) -> None:
+        """Shut down the scan threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+# Convenience functions
+def build_similarity_index(smiles_list: Iterable[str], filepath: Optional[str] = None,
+                           **kwargs: Any) -> SimilarityIndex:
+    """Build a similarity index from SMILES, saving it when ``filepath`` is given"""
+    index, errors = SimilarityIndex.build(smiles_list, **kwargs)
+    n_errors = sum(error is not None for error in errors)
+    if n_errors:
+        print(f"Warning: {n_errors} molecules could not be fingerprinted and were not indexed")
+    if filepath is not None:
+        index.save(filepath)
+    return index
+
+def load_similarity_index(filepath: str, n_jobs: int = 1) -> SimilarityIndex:
+    """Load a saved similarity index, memory-mapped"""
+    return SimilarityIndex.load(filepath, n_jobs=n_jobs)
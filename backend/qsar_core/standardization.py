@@ -0,0 +1,162 @@
+"""
+Structure Standardization for QSAR/QSPR/QSTR Descriptor Calculation
+Salt stripping, neutralization and duplicate collapsing ahead of featurization
+"""
+
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from rdkit import Chem
+from rdkit.Chem.MolStandardize import rdMolStandardize
+
+from .parallel import run_chunked
+
+KEY_TYPES = ['inchikey', 'smiles']
+
+# SMILES per process-pool task when standardizing in parallel
+STANDARDIZE_CHUNK_SIZE = 512
+
+class Standardizer:
+    """Standardize molecules and collapse a batch to its unique structures
+    
+    Each molecule is cleaned up (RDKit normalization, reionization and metal
+    disconnection), reduced to its largest organic fragment, neutralized
+    and optionally given its canonical tautomer. Duplicates are detected by
+    canonical SMILES or InChIKey of the standardized structure; by default
+    the InChIKey is used only when tautomers are canonicalized, since the
+    standard InChIKey merges mobile-H tautomers whose descriptors differ.
+    """
+    
+    def __init__(self, remove_salts: bool = True, neutralize: bool = True,
+                 canonicalize_tautomers: bool = False, key: Optional[str] = None):
+        if key is None:
+            key = 'inchikey' if canonicalize_tautomers else 'smiles'
+        if key not in KEY_TYPES:
+            raise ValueError(f"Invalid key type: {key}. Use one of {KEY_TYPES}")
+        
+        self.remove_salts = remove_salts
+        self.neutralize = neutralize
+        self.canonicalize_tautomers = canonicalize_tautomers
+        self.key = key
+        self._fragment_chooser = rdMolStandardize.LargestFragmentChooser(preferOrganic=True)
+        self._uncharger = rdMolStandardize.Uncharger(canonicalOrder=True)
+        self._tautomer_enumerator = rdMolStandardize.TautomerEnumerator() if canonicalize_tautomers else None
+    
+    def __getstate__(self) -> Dict:
+        # RDKit standardizer objects cannot be pickled; rebuild them from the settings
+        return {'remove_salts': self.remove_salts, 'neutralize': self.neutralize,
+                'canonicalize_tautomers': self.canonicalize_tautomers, 'key': self.key}
+    
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(**state)
+    
+    def standardize_mol(self, mol: Chem.Mol) -> Chem.Mol:
+        """Get the standardized parent of a molecule"""
+        mol = rdMolStandardize.Cleanup(mol)
+        if self.remove_salts:
+            mol = self._fragment_chooser.choose(mol)
+        if self.neutralize:
+            mol = self._uncharger.uncharge(mol)
+        if self._tautomer_enumerator is not None:
+            mol = self._tautomer_enumerator.Canonicalize(mol)
+        return mol
+    
+    def structure_key(self, mol: Chem.Mol, smiles: str) -> str:
+        """Get the duplicate-detection key of a standardized molecule"""
+        if self.key == 'inchikey':
+            # Fixed-H layer keeps tautomers apart unless they were canonicalized
+            options = '' if self.canonicalize_tautomers else '/FixedH'
+            inchikey = Chem.MolToInchiKey(mol, options=options)
+            # Structures InChI cannot represent fall back to canonical SMILES
+            if inchikey:
+                return inchikey
+        return smiles
+    
+    def standardize(self, smiles: str) -> Tuple[str, str]:
+        """Standardize a SMILES string, returning ``(standardized_smiles, key)``"""
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        if mol is None:
+            raise ValueError(f"Invalid SMILES: {smiles}")
+        
+        try:
+            mol = self.standardize_mol(mol)
+        except Exception as e:
+            raise ValueError(f"Error standardizing {smiles}: {e}")
+        if mol.GetNumAtoms() == 0:
+            raise ValueError(f"No atoms left after standardizing {smiles}")
+        
+        standardized = Chem.MolToSmiles(mol)
+        return standardized, self.structure_key(mol, standardized)
+    
+    def standardize_batch(self, smiles_list: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Standardize many SMILES, returning ``(standardized_smiles, keys, errors)``
+        
+        Failed rows are ``None`` in the first two arrays and carry a message in
+        ``errors``. Repeated input strings are standardized once.
+        """
+        smiles_list = list(smiles_list)
+        standardized = np.full(len(smiles_list), None, dtype=object)
+        keys = np.full(len(smiles_list), None, dtype=object)
+        errors = np.full(len(smiles_list), None, dtype=object)
+        
+        seen = {}
+        for row, smiles in enumerate(smiles_list):
+            if smiles not in seen:
+                try:
+                    seen[smiles] = self.standardize(smiles) + (None,)
+                except ValueError as e:
+                    seen[smiles] = (None, None, str(e))
+            standardized[row], keys[row], errors[row] = seen[smiles]
+        
+        return standardized, keys, errors
+    
+    def deduplicate(self, smiles_list: Iterable[str], n_jobs: int = 1) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Collapse a batch to its unique standardized structures
+        
+        Returns ``(unique_smiles, inverse, errors)`` where row ``i`` of the
+        batch is ``unique_smiles[inverse[i]]``; rows that fail get
+        ``inverse = -1`` and a message in ``errors``. With ``n_jobs != 1``
+        large batches are standardized in a process pool.
+        """
+        smiles_list = list(smiles_list)
+        if n_jobs == 1 or len(smiles_list) <= STANDARDIZE_CHUNK_SIZE:
+            standardized, keys, errors = self.standardize_batch(smiles_list)
+        else:
+            standardized = np.full(len(smiles_list), None, dtype=object)
+            keys = np.full(len(smiles_list), None, dtype=object)
+            errors = np.full(len(smiles_list), None, dtype=object)
+            
+            def on_result(start: int, block: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+                stop = start + len(block[0])
+                standardized[start:stop], keys[start:stop], errors[start:stop] = block
+            
+            def on_failure(index: int, message: str) -> None:
+                errors[index] = f"Error standardizing {smiles_list[index]}: {message}"
+            
+            run_chunked(_standardize_chunk, smiles_list, on_result, on_failure, args=(self,),
+                        n_jobs=n_jobs, chunk_size=STANDARDIZE_CHUNK_SIZE)
+        
+        inverse = np.full(len(smiles_list), -1, dtype=np.int64)
+        unique_smiles = []
+        positions = {}
+        for row, key in enumerate(keys):
+            if key is None:
+                continue
+            if key not in positions:
+                positions[key] = len(unique_smiles)
+                unique_smiles.append(standardized[row])
+            inverse[row] = positions[key]
+        
+        return unique_smiles, inverse, errors
+
+def _standardize_chunk(smiles_chunk: List[str], standardizer: Standardizer) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Standardize a chunk of SMILES inside a worker process"""
+    return standardizer.standardize_batch(smiles_chunk)
+
+# Convenience functions
+def standardize_smiles(smiles: str) -> str:
+    """Standardize a SMILES string with the default settings"""
+    return Standardizer().standardize(smiles)[0]
+
+def deduplicate_smiles(smiles_list: Iterable[str]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Collapse SMILES to their unique standardized structures with the default settings"""
+    return Standardizer().deduplicate(smiles_list)
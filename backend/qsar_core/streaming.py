@@ -0,0 +1,145 @@
+"""
+Out-of-Core Data Streaming for QSAR/QSPR/QSTR Training
+Chunked readers over Parquet, NPZ and NPY descriptor shards on disk
+"""
+
+import glob
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .fast_inference import memmap_npz
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+SHARD_EXTENSIONS = ('.parquet', '.npz', '.npy')
+
+def list_shards(paths: Union[str, Sequence[str]]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of shard files"""
+    if isinstance(paths, str):
+        paths = [paths]
+    
+    shards = []
+    for path in paths:
+        if os.path.isdir(path):
+            shards.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.endswith(SHARD_EXTENSIONS) and not name.endswith('_y.npy')))
+        elif any(character in path for character in '*?['):
+            shards.extend(sorted(name for name in glob.glob(path) if not name.endswith('_y.npy')))
+        else:
+            shards.append(path)
+    
+    if not shards:
+        raise ValueError(f"No shards found in {paths}")
+    
+    return shards
+
+class ShardDataset:
+    """Descriptor matrix split over shard files, read one chunk at a time
+    
+    Supported shards:
+    
+    - ``.parquet``: one column per feature plus ``target_column`` (needs pyarrow)
+    - ``.npz``: arrays ``X`` and ``y`` (memory-mapped when saved uncompressed)
+    - ``.npy``: the feature matrix, with targets in ``<stem>_y.npy`` next to it
+    
+    Only ``chunk_rows`` rows are materialized at a time, as ``dtype``.
+    """
+    
+    def __init__(self, paths: Union[str, Sequence[str]], target_column: str = 'target',
+                 feature_names: Optional[List[str]] = None, chunk_rows: int = 10000,
+                 dtype: type = np.float32):
+        self.paths = list_shards(paths)
+        self.target_column = target_column
+        self.chunk_rows = chunk_rows
+        self.dtype = dtype
+        self.feature_names = list(feature_names) if feature_names is not None else self._read_feature_names()
+    
+    def _read_feature_names(self) -> Optional[List[str]]:
+        """Get feature names from the first Parquet shard, if any"""
+        path = self.paths[0]
+        if path.endswith('.parquet'):
+            schema = self._parquet_file(path).schema_arrow
+            return [name for name in schema.names if name != self.target_column]
+        return None
+    
+    @staticmethod
+    def _parquet_file(path: str):
+        if pq is None:
+            raise ValueError("Reading Parquet shards requires pyarrow")
+        return pq.ParquetFile(path)
+    
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        return self.iter_chunks()
+    
+    def iter_chunks(self, shuffle: bool = False,
+                    random_state: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield ``(X, y)`` chunks; ``shuffle`` permutes shard order and rows within chunks"""
+        rng = np.random.default_rng(random_state)
+        paths = list(self.paths)
+        if shuffle:
+            rng.shuffle(paths)
+        
+        for path in paths:
+            for X, y in self._read_shard(path):
+                if shuffle:
+                    order = rng.permutation(len(y))
+                    X, y = X[order], y[order]
+                yield X, y
+    
+    def _read_shard(self, path: str) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield the chunks of one shard"""
+        if path.endswith('.parquet'):
+            yield from self._read_parquet(path)
+            return
+        
+        if path.endswith('.npz'):
+            try:
+                arrays = memmap_npz(path)
+            except ValueError:
+                # Compressed archives cannot be memory-mapped
+                with np.load(path, allow_pickle=False) as data:
+                    arrays = {name: data[name] for name in data.files}
+            X, y = arrays['X'], arrays['y']
+        elif path.endswith('.npy'):
+            X = np.load(path, mmap_mode='r', allow_pickle=False)
+            y = np.load(path[:-4] + '_y.npy', mmap_mode='r', allow_pickle=False)
+        else:
+            raise ValueError(f"Unsupported shard format: {path}")
+        
+        if len(X) != len(y):
+            raise ValueError(f"Shard {path} has {len(X)} rows but {len(y)} targets")
+        
+        for start in range(0, len(y), self.chunk_rows):
+            yield (np.ascontiguousarray(X[start:start + self.chunk_rows], dtype=self.dtype),
+                   np.asarray(y[start:start + self.chunk_rows]))
+    
+    def _read_parquet(self, path: str) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield the chunks of one Parquet shard, reading only the needed columns"""
+        parquet_file = self._parquet_file(path)
+        feature_names = self.feature_names or [name for name in parquet_file.schema_arrow.names
+                                               if name != self.target_column]
+        columns = feature_names + [self.target_column]
+        
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_rows, columns=columns):
+            X = np.empty((batch.num_rows, len(feature_names)), dtype=self.dtype)
+            for i, name in enumerate(feature_names):
+                X[:, i] = batch.column(name).to_numpy(zero_copy_only=False)
+            y = batch.column(self.target_column).to_numpy(zero_copy_only=False)
+            yield X, y
+
+# Convenience functions
+def save_npz_shards(X: np.ndarray, y: np.ndarray, directory: str, shard_rows: int = 100000,
+                    prefix: str = 'shard') -> List[str]:
+    """Split an in-memory matrix into uncompressed .npz shards"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index, start in enumerate(range(0, len(y), shard_rows)):
+        path = os.path.join(directory, f'{prefix}_{index:05d}.npz')
+        np.savez(path, X=X[start:start + shard_rows], y=y[start:start + shard_rows])
+        paths.append(path)
+    return paths
@@ -0,0 +1,227 @@
+"""
+Structural Alert Screening for QSTR Toxicity Assessment
+Precompiled SMARTS alerts with atom-type and pattern-fingerprint prefilters and sparse hit matrices
+"""
+
+import csv
+import numpy as np
+from scipy import sparse
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from rdkit import Chem
+
+from .fragments import FragmentMatcher
+from .molecule_context import MoleculeContext
+from .parallel import run_chunked
+
+# Pattern fingerprint size; matches the Pattern_FP descriptor so memoized fingerprints are reused
+PATTERN_FP_SIZE = 2048
+
+# Default alerts: (name, SMARTS, description), after the Benigni-Bossa and Kazius mutagenicity/carcinogenicity rules
+DEFAULT_ALERTS = [
+    ('aromatic_nitro', '[a][N+](=O)[O-]', 'Aromatic nitro group'),
+    ('aliphatic_nitro', '[CX4][N+](=O)[O-]', 'Aliphatic nitro group'),
+    ('aromatic_amine', '[a][NX3;H2,H1;!$(N[C,S]=[O,S,N])]', 'Primary or secondary aromatic amine'),
+    ('aromatic_hydroxylamine', '[a][NX3][OX2H1]', 'Aromatic hydroxylamine'),
+    ('n_nitroso', '[#7][NX2]=O', 'N-nitroso group'),
+    ('aromatic_nitroso', '[a][NX2]=O', 'Aromatic nitroso group'),
+    ('alkyl_nitrite', '[CX4]O[NX2]=O', 'Alkyl nitrite'),
+    ('epoxide', 'C1OC1', 'Epoxide'),
+    ('aziridine', 'C1NC1', 'Aziridine'),
+    ('alkyl_halide', '[CX4;!$(C([F,Cl,Br,I])([F,Cl,Br,I])[F,Cl,Br,I])][Cl,Br,I]', 'Aliphatic halide'),
+    ('alpha_haloketone', '[CX4]([Cl,Br,I])[CX3](=O)[#6]', 'Alpha-halo ketone'),
+    ('acyl_halide', '[CX3](=O)[F,Cl,Br,I]', 'Acyl halide'),
+    ('nitrogen_mustard', '[NX3]CC[Cl,Br,I]', 'Nitrogen mustard'),
+    ('sulfur_mustard', '[SX2]CC[Cl,Br,I]', 'Sulfur mustard'),
+    ('michael_acceptor', '[CX3;H1,H2]=[CX3][CX3,SX4]=[OX1]', 'Alpha,beta-unsaturated carbonyl (Michael acceptor)'),
+    ('aldehyde', '[CX3H1](=O)[#6]', 'Aliphatic or aromatic aldehyde'),
+    ('azo', '[#6][NX2]=[NX2][#6]', 'Azo group'),
+    ('diazo', '[#6]=[N+]=[N-]', 'Diazo group'),
+    ('azide', '[NX2]=[N+]=[N-]', 'Azide'),
+    ('hydrazine', '[NX3;!$(N[C,S]=[O,S])][NX3;!$(N[C,S]=[O,S])]', 'Hydrazine'),
+    ('isocyanate', '[NX2]=C=O', 'Isocyanate'),
+    ('isothiocyanate', '[NX2]=C=S', 'Isothiocyanate'),
+    ('peroxide', '[OX2][OX2]', 'Peroxide'),
+    ('alkyl_sulfonate', '[CX4]O[SX4](=O)(=O)[#6]', 'Alkyl sulfonate ester'),
+    ('alkyl_sulfate', '[CX4]O[SX4](=O)(=O)O', 'Alkyl sulfate ester'),
+    ('beta_lactone', 'O=C1CCO1', 'Beta-propiolactone'),
+    ('quinone', 'O=[#6]1[#6]=,:[#6][#6](=O)[#6]=,:[#6]1', 'Para-quinone'),
+    ('thiocarbonyl', '[#6,#7][CX3]=[SX1]', 'Thiocarbonyl'),
+    ('polycyclic_aromatic', 'c1ccc2cc3ccccc3cc2c1', 'Anthracene-type polycyclic aromatic system'),
+    ('polycyclic_aromatic_angular', 'c1ccc2c(c1)ccc1ccccc12', 'Phenanthrene-type polycyclic aromatic system')
+]
+
+def load_alert_library(filepath: str) -> List[Tuple[str, str, str]]:
+    """Read ``(name, smarts, description)`` alerts from a CSV file
+    
+    The file needs ``name`` and ``smarts`` columns; ``description`` is
+    optional. Rows whose name starts with ``#`` are skipped.
+    """
+    alerts = []
+    with open(filepath, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        if not {'name', 'smarts'} <= set(reader.fieldnames or []):
+            raise ValueError(f"Alert library {filepath} needs 'name' and 'smarts' columns")
+        for row in reader:
+            if not row['name'] or row['name'].startswith('#'):
+                continue
+            alerts.append((row['name'], row['smarts'], row.get('description') or ''))
+    return alerts
+
+class AlertScreener:
+    """Screen molecules against a library of SMARTS structural alerts
+    
+    Alerts are compiled once. Each batch is first checked in one vectorized
+    step against the minimum atom types every alert needs (as for fragment
+    descriptors), then against the alerts' pattern fingerprints: an alert
+    whose fingerprint bits are not all set in the molecule's cannot match.
+    Only the remaining candidates run a full substructure match.
+    
+    Computing a pattern fingerprint costs more than it saves, so by default
+    (``use_fingerprint=None``) the fingerprint check only runs for
+    ``MoleculeContext`` inputs that already hold a memoized ``Pattern_FP``
+    (e.g. after descriptor calculation); ``True``/``False`` force it on/off.
+    """
+    
+    def __init__(self, alerts: Optional[Sequence[Tuple[str, str, str]]] = None,
+                 use_fingerprint: Optional[bool] = None):
+        self.alerts = [tuple(alert) for alert in (alerts if alerts is not None else DEFAULT_ALERTS)]
+        self.names = [alert[0] for alert in self.alerts]
+        self.descriptions = {alert[0]: (alert[2] if len(alert) > 2 else '') for alert in self.alerts}
+        self.use_fingerprint = use_fingerprint
+        self.matcher = FragmentMatcher([(alert[0], alert[1]) for alert in self.alerts])
+        self._query_words = self._pack(Chem.PatternFingerprint(pattern, fpSize=PATTERN_FP_SIZE)
+                                       for pattern in self.matcher.patterns)
+    
+    def __getstate__(self) -> Dict:
+        # Query molecules are rebuilt from SMARTS rather than pickled
+        return {'alerts': self.alerts, 'use_fingerprint': self.use_fingerprint}
+    
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(state['alerts'], state['use_fingerprint'])
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    @staticmethod
+    def _pack(fingerprints: Iterable) -> np.ndarray:
+        """Pack RDKit bit vectors into a ``(n, PATTERN_FP_SIZE / 64)`` uint64 matrix"""
+        fingerprints = list(fingerprints)
+        bits = np.zeros((len(fingerprints), PATTERN_FP_SIZE), dtype=np.uint8)
+        for row, fingerprint in enumerate(fingerprints):
+            bits[row, list(fingerprint.GetOnBits())] = 1
+        return np.packbits(bits, axis=1).view(np.uint64)
+    
+    def _fingerprint_candidates(self, fingerprint: object) -> np.ndarray:
+        """Get the alerts whose pattern-fingerprint bits are all set in a molecule's"""
+        words = self._pack([fingerprint])
+        return ~np.bitwise_and(self._query_words, ~words).any(axis=1)
+    
+    def screen_molecule(self, molecule: Union[str, Chem.Mol, MoleculeContext]) -> np.ndarray:
+        """Get a boolean alert-hit vector (in ``names`` order) for one molecule"""
+        context = MoleculeContext.coerce(molecule)
+        candidates = self.matcher.candidate_matrix([context.mol])[0]
+        return self._match(context, candidates)
+    
+    def _match(self, context: MoleculeContext, candidates: np.ndarray) -> np.ndarray:
+        use_fingerprint = self.use_fingerprint
+        if use_fingerprint is None:
+            use_fingerprint = ('fingerprint', 'Pattern_FP') in context
+        if use_fingerprint and candidates.any():
+            candidates &= self._fingerprint_candidates(context.fingerprint('Pattern_FP', Chem.PatternFingerprint))
+        
+        hits = np.zeros(len(self.names), dtype=bool)
+        for column in np.flatnonzero(candidates):
+            hits[column] = context.mol.HasSubstructMatch(self.matcher.patterns[column])
+        return hits
+    
+    def screen(self, molecules: Iterable[Union[str, Chem.Mol, MoleculeContext]], n_jobs: int = 1,
+               chunk_size: int = 1024) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Screen many molecules
+        
+        Returns ``(hits, errors)``: ``hits`` is an ``(n_molecules, n_alerts)``
+        sparse uint8 matrix with ones where an alert matches, and ``errors``
+        holds a message for molecules that could not be screened (their rows
+        are empty). With ``n_jobs != 1`` SMILES are screened in ``chunk_size``
+        chunks across a process pool.
+        """
+        molecules = list(molecules)
+        if n_jobs == 1:
+            return self._screen_chunk(molecules)
+        
+        blocks = {}
+        errors = np.full(len(molecules), None, dtype=object)
+        
+        def on_result(start: int, block: Tuple[sparse.csr_matrix, np.ndarray]) -> None:
+            blocks[start] = block[0]
+            errors[start:start + len(block[1])] = block[1]
+        
+        def on_failure(index: int, message: str) -> None:
+            blocks[index] = sparse.csr_matrix((1, len(self.names)), dtype=np.uint8)
+            errors[index] = f"Error screening alerts: {message}"
+        
+        run_chunked(_screen_chunk, molecules, on_result, on_failure, n_jobs=n_jobs, chunk_size=chunk_size,
+                    initializer=_init_worker_screener, initargs=(self,))
+        hits = sparse.vstack([blocks[start] for start in sorted(blocks)], format='csr', dtype=np.uint8)
+        return hits, errors
+    
+    def _screen_chunk(self, molecules: List[Union[str, Chem.Mol, MoleculeContext]]
+                      ) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Screen a list of molecules into a CSR hit block"""
+        errors = np.full(len(molecules), None, dtype=object)
+        contexts = []
+        for row, molecule in enumerate(molecules):
+            try:
+                contexts.append(MoleculeContext.coerce(molecule))
+            except ValueError as e:
+                errors[row] = str(e)
+                contexts.append(None)
+        
+        candidates = self.matcher.candidate_matrix([context.mol if context is not None else None
+                                                    for context in contexts])
+        indices = []
+        indptr = [0]
+        for row, context in enumerate(contexts):
+            if context is not None:
+                try:
+                    indices.extend(np.flatnonzero(self._match(context, candidates[row])))
+                except Exception as e:
+                    errors[row] = f"Error screening alerts: {e}"
+            indptr.append(len(indices))
+        
+        hits = sparse.csr_matrix((np.ones(len(indices), dtype=np.uint8), np.asarray(indices, dtype=np.int32),
+                                  np.asarray(indptr, dtype=np.int64)), shape=(len(molecules), len(self.names)))
+        return hits, errors
+    
+    def summarize(self, hits: sparse.spmatrix) -> Dict[str, int]:
+        """Count the molecules hit by each alert"""
+        counts = np.asarray(hits.sum(axis=0)).ravel()
+        return {name: int(count) for name, count in zip(self.names, counts)}
+
+# Process-pool workers
+_worker_screener = None
+
+def _init_worker_screener(screener: AlertScreener) -> None:
+    """Install the screener used by alert worker processes"""
+    global _worker_screener
+    _worker_screener = screener
+
+def _screen_chunk(molecules: List[Union[str, Chem.Mol]]) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """Screen a chunk of molecules inside a worker process"""
+    return _worker_screener._screen_chunk(molecules)
+
+_default_screener = None
+
+# Convenience functions
+def get_alert_screener() -> AlertScreener:
+    """Get the process-wide screener for the default alerts, building it on first use"""
+    global _default_screener
+    if _default_screener is None:
+        _default_screener = AlertScreener()
+    return _default_screener
+
+def screen_structural_alerts(smiles: Union[str, MoleculeContext]) -> List[Dict[str, str]]:
+    """List the default alerts a molecule triggers, with their descriptions"""
+    screener = get_alert_screener()
+    hits = screener.screen_molecule(smiles)
+    return [{'name': name, 'description': screener.descriptions[name]}
+            for name, hit in zip(screener.names, hits) if hit]
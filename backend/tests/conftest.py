@@ -0,0 +1,37 @@
+"""
+Shared fixtures for the QSAR/QSPR/QSTR core tests
+Run from the ``backend`` directory with ``python -m pytest tests``
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SMILES = [
+    'CCO', 'CC(=O)Oc1ccccc1C(=O)O', 'c1ccccc1O', 'CCN(CC)CC', 'CC(=O)[O-].[Na+]',
+    'O=C(O)c1ccccc1', 'CCCCCC1CCCCC1.O', 'c1ccc2ccccc2c1', 'CC(C)Cc1ccc(C(C)C(=O)O)cc1',
+    'Cn1cnc2c1c(=O)n(C)c(=O)n2C', 'OCC(O)CO', 'Clc1ccc(Cl)cc1', 'NCCc1ccc(O)c(O)c1',
+    'CC(=O)Nc1ccc(O)cc1', 'C1CCNCC1', 'O=[N+]([O-])c1ccc(N)cc1'
+]
+
+@pytest.fixture
+def smiles_list():
+    return list(SMILES)
+
+@pytest.fixture
+def regression_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(120, 8))
+    y = 2.0 * X[:, 0] - X[:, 1] + 0.1 * rng.normal(size=120)
+    return X, y
+
+@pytest.fixture
+def classification_data():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(120, 8))
+    y = (X[:, 0] + X[:, 2] > 0).astype(int)
+    return X, y
@@ -0,0 +1,103 @@
+"""
+Tests for applicability-domain scoring against direct reference calculations
+"""
+
+import numpy as np
+import pytest
+
+from qsar_core import applicability_domain
+from qsar_core.applicability_domain import ApplicabilityDomain
+from qsar_core.enhanced_modeling import EnhancedQSARModel
+
+def _reference_leverage(X_train, X):
+    centered = X_train - X_train.mean(axis=0)
+    inverse = np.linalg.pinv(centered.T @ centered)
+    offsets = X - X_train.mean(axis=0)
+    return 1.0 / len(X_train) + np.einsum('ij,jk,ik->i', offsets, inverse, offsets)
+
+def _reference_knn(X_train, X, k, exclude_self=False):
+    distances = np.sqrt(((X[:, None, :] - X_train[None, :, :]) ** 2).sum(axis=2))
+    if exclude_self:
+        np.fill_diagonal(distances, np.inf)
+    return np.sort(distances, axis=1)[:, :k].mean(axis=1)
+
+def test_scores_match_reference_calculations(monkeypatch):
+    # Small blocks exercise the blocked kNN merge
+    monkeypatch.setattr(applicability_domain, 'KNN_BLOCK_ROWS', 17)
+    rng = np.random.default_rng(0)
+    X_train = rng.normal(size=(80, 5))
+    X = np.vstack([X_train[:10], rng.normal(size=(10, 5)), rng.normal(loc=6.0, size=(5, 5))])
+    
+    domain = ApplicabilityDomain(k=4).fit(X_train)
+    scores = domain.score(X)
+    
+    np.testing.assert_allclose(scores['leverage'], _reference_leverage(X_train, X), rtol=1e-8)
+    np.testing.assert_allclose(scores['knn_distance'], _reference_knn(X_train, X, 4), rtol=1e-4, atol=1e-4)
+    expected_violations = ((X < X_train.min(axis=0)) | (X > X_train.max(axis=0))).sum(axis=1)
+    np.testing.assert_array_equal(scores['bounds_violations'], expected_violations)
+    
+    calibration = _reference_knn(X_train, X_train, 4, exclude_self=True)
+    assert domain.knn_threshold == pytest.approx(np.percentile(calibration, 95.0), rel=1e-4)
+    assert domain.leverage_threshold == pytest.approx(3.0 * 6 / 80)
+    assert not scores['in_domain'][-5:].any()
+    np.testing.assert_array_equal(scores['in_domain'], (expected_violations == 0)
+                                  & (scores['leverage'] <= domain.leverage_threshold)
+                                  & (scores['knn_distance'] <= domain.knn_threshold))
+
+def test_selected_methods_and_validation():
+    rng = np.random.default_rng(1)
+    X_train = rng.normal(size=(30, 3))
+    scores = ApplicabilityDomain(methods=['bounds']).fit(X_train).score(X_train)
+    assert set(scores) == {'bounds_violations', 'in_domain'} and scores['in_domain'].all()
+    
+    # k is capped so a row never counts itself among its neighbours
+    assert ApplicabilityDomain(k=10).fit(X_train[:4]).k == 3
+    with pytest.raises(ValueError):
+        ApplicabilityDomain(methods=['bounds', 'mahalanobis'])
+    with pytest.raises(ValueError):
+        ApplicabilityDomain().score(X_train)
+    with pytest.raises(ValueError):
+        ApplicabilityDomain().fit(X_train[:1])
+
+def test_arrays_round_trip(tmp_path):
+    rng = np.random.default_rng(2)
+    X_train = rng.normal(size=(50, 4))
+    X = rng.normal(scale=2.0, size=(20, 4))
+    domain = ApplicabilityDomain(k=3, bounds_tolerance=0.1).fit(X_train)
+    
+    path = str(tmp_path / 'domain.npz')
+    np.savez(path, **domain.to_arrays())
+    with np.load(path) as data:
+        loaded = ApplicabilityDomain.from_arrays(data)
+    assert loaded.methods == domain.methods and loaded.k == 3 and loaded.bounds_tolerance == 0.1
+    
+    expected, scores = domain.score(X), loaded.score(X)
+    assert set(scores) == set(expected)
+    for name in expected:
+        np.testing.assert_array_equal(scores[name], expected[name])
+
+def test_model_domain_uses_transformed_features(regression_data):
+    X, y = regression_data
+    model = EnhancedQSARModel('ridge', 'regression')
+    # prepare_data returns scaled splits; predict and applicability take raw rows
+    X_train, _, y_train, _ = model.prepare_data(X, y, test_size=0.25)
+    model.train(X_train, y_train, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=1)
+    
+    rows = np.vstack([X, X[:10] + 10.0])
+    predictions, scores = model.predict(rows, return_domain=True)
+    np.testing.assert_array_equal(predictions, model.predict(rows))
+    assert not scores['in_domain'][len(X):].any()
+    assert scores['in_domain'][:len(X)].mean() > 0.5
+    
+    expected = ApplicabilityDomain().fit(X_train).score(model.scaler.transform(rows))
+    applicability = model.applicability(rows)
+    assert set(applicability) == set(expected)
+    for name in expected:
+        np.testing.assert_allclose(applicability[name], expected[name], rtol=1e-6)
+    
+    untracked = EnhancedQSARModel('ridge', 'regression')
+    untracked.prepare_data(X, y, test_size=0.25)
+    untracked.train(X_train, y_train, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=1,
+                    applicability_domain=False)
+    with pytest.raises(ValueError):
+        untracked.predict(X, return_domain=True)
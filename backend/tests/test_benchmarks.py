@@ -0,0 +1,50 @@
+"""
+Tests for the benchmark timing and comparison helpers
+"""
+
+import json
+
+import pytest
+
+from benchmarks.reference_molecules import REFERENCE_SETS, get_reference_set
+from benchmarks.run_benchmarks import compare, main
+from benchmarks.timing import summarize
+
+def _document(items_per_second, p99_ms):
+    return {'results': {'descriptors/small': {'items_per_second': items_per_second, 'p50_ms': 1.0,
+                                              'p99_ms': p99_ms, 'peak_rss_mb': 100.0}}}
+
+def test_summarize_reports_throughput_and_percentiles():
+    summary = summarize([0.001] * 99 + [0.101], items=200)
+    assert summary['calls'] == 100 and summary['items'] == 200
+    assert summary['items_per_second'] == pytest.approx(200 / 0.2)
+    assert summary['p50_ms'] == pytest.approx(1.0)
+    assert summary['p99_ms'] > 1.0
+    assert summarize([])['items_per_second'] == 0.0
+
+def test_compare_flags_regressions_in_both_directions():
+    rows = {row['metric']: row for row in compare(_document(100.0, 10.0), _document(85.0, 10.5))}
+    assert rows['items_per_second']['regression']
+    assert not rows['p99_ms']['regression']
+    assert not rows['p50_ms']['regression']
+    
+    rows = {row['metric']: row for row in compare(_document(100.0, 10.0), _document(120.0, 12.0))}
+    assert not rows['items_per_second']['regression']
+    assert rows['p99_ms']['regression']
+
+def test_compare_command_exit_code(tmp_path, capsys):
+    paths = []
+    for name, document in [('baseline', _document(100.0, 10.0)), ('faster', _document(150.0, 8.0)),
+                           ('slower', _document(50.0, 20.0))]:
+        path = tmp_path / f'{name}.json'
+        path.write_text(json.dumps(document))
+        paths.append(str(path))
+    
+    assert main(['--compare', paths[0], paths[1]]) == 0
+    assert main(['--compare', paths[0], paths[2]]) == 1
+    assert 'REGRESSION' in capsys.readouterr().out
+
+def test_reference_sets():
+    assert get_reference_set('invalid_mix', repeat=2) == REFERENCE_SETS['invalid_mix'] * 2
+    with pytest.raises(ValueError):
+        get_reference_set('missing')
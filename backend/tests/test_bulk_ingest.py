@@ -0,0 +1,109 @@
+"""
+Tests for streaming bulk ingest into Parquet parts
+"""
+
+import gzip
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from rdkit import Chem
+
+from qsar_core.bulk_ingest import BulkIngest, read_compound_file
+from qsar_core.enhanced_descriptors import EnhancedDescriptors
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+FEATURES = ['MolWt', 'LogP', 'TPSA']
+
+class InterruptedIngest(BulkIngest):
+    """Ingest that crashes while writing a given part"""
+    
+    def __init__(self, fail_at, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_at = fail_at
+    
+    def _write_part(self, output_dir, index, chunk):
+        if index == self.fail_at:
+            open(self._part_path(output_dir, index) + '.tmp', 'w').close()
+            raise RuntimeError('interrupted')
+        return super()._write_part(output_dir, index, chunk)
+
+def _write_smiles(path, smiles_list):
+    with open(path, 'w') as f:
+        f.write('# library\n')
+        for number, smiles in enumerate(smiles_list):
+            f.write(f'{smiles} mol{number}\n')
+
+def _read_output(output_dir):
+    parts = sorted(name for name in os.listdir(output_dir) if name.endswith('.parquet'))
+    tables = [pq.read_table(os.path.join(output_dir, name)).to_pandas() for name in parts]
+    return parts, tables
+
+def test_ingest_matches_calculate_batch(tmp_path, smiles_list):
+    library = smiles_list + ['not_a_smiles']
+    _write_smiles(str(tmp_path / 'library.smi'), library)
+    summary = BulkIngest(features=FEATURES, chunk_rows=5).run(str(tmp_path / 'library.smi'), str(tmp_path / 'out'))
+    assert summary['rows'] == len(library) and summary['errors'] == 1 and len(summary['parts']) == 4
+    
+    parts, tables = _read_output(str(tmp_path / 'out'))
+    frame = pd.concat(tables, ignore_index=True)
+    assert frame['id'].tolist() == [f'mol{number}' for number in range(len(library))]
+    assert list(frame.columns) == ['id', 'smiles', 'error'] + FEATURES
+    
+    values, errors = EnhancedDescriptors().calculate_batch(library, False, features=FEATURES)
+    np.testing.assert_array_equal(frame[FEATURES].to_numpy(), values)
+    assert frame['error'].isna().tolist() == [error is None for error in errors]
+
+def test_resume_after_interruption_gives_the_same_output(tmp_path, smiles_list):
+    input_path = str(tmp_path / 'library.smi')
+    _write_smiles(input_path, smiles_list)
+    BulkIngest(features=FEATURES, chunk_rows=4).run(input_path, str(tmp_path / 'reference'))
+    
+    output_dir = str(tmp_path / 'out')
+    with pytest.raises(RuntimeError):
+        InterruptedIngest(2, features=FEATURES, chunk_rows=4).run(input_path, output_dir)
+    assert sorted(os.listdir(output_dir)) == ['_ingest.json', 'part-00000.parquet', 'part-00001.parquet',
+                                              'part-00002.parquet.tmp']
+    
+    summary = BulkIngest(features=FEATURES, chunk_rows=4).run(input_path, output_dir, resume=True)
+    assert summary['rows'] == len(smiles_list) and len(summary['parts']) == 4
+    assert not any(name.endswith('.tmp') for name in os.listdir(output_dir))
+    
+    reference_parts, reference_tables = _read_output(str(tmp_path / 'reference'))
+    parts, tables = _read_output(output_dir)
+    assert parts == reference_parts
+    for table, reference in zip(tables, reference_tables):
+        assert table.equals(reference)
+
+def test_resume_with_changed_settings_raises(tmp_path, smiles_list):
+    input_path = str(tmp_path / 'library.smi')
+    _write_smiles(input_path, smiles_list)
+    output_dir = str(tmp_path / 'out')
+    BulkIngest(features=FEATURES, chunk_rows=4).run(input_path, output_dir)
+    
+    with pytest.raises(ValueError, match='chunk_rows'):
+        BulkIngest(features=FEATURES, chunk_rows=8).run(input_path, output_dir)
+    summary = BulkIngest(features=FEATURES, chunk_rows=8).run(input_path, output_dir, resume=False)
+    assert len(summary['parts']) == 2 and len(_read_output(output_dir)[0]) == 2
+
+def test_csv_and_gzipped_sdf_readers(tmp_path):
+    with open(str(tmp_path / 'library.csv'), 'w') as f:
+        f.write('name,smiles\nethanol,CCO\nblank,\nphenol,c1ccccc1O\n')
+    records = list(read_compound_file(str(tmp_path / 'library.csv'), id_column='name'))
+    assert records == [('ethanol', 'CCO', None), ('blank', None, 'Missing SMILES'), ('phenol', 'c1ccccc1O', None)]
+    assert list(read_compound_file(str(tmp_path / 'library.csv'), skip=2)) == [('2', 'c1ccccc1O', None)]
+    with pytest.raises(ValueError):
+        list(read_compound_file(str(tmp_path / 'library.csv'), smiles_column='structure'))
+    
+    with gzip.open(str(tmp_path / 'library.sdf.gz'), 'wt') as f:
+        for name, smiles in [('ethanol', 'CCO'), ('', 'c1ccccc1O')]:
+            mol = Chem.MolFromSmiles(smiles)
+            mol.SetProp('_Name', name)
+            mol.SetProp('CAS', f'cas-{smiles}')
+            f.write(Chem.MolToMolBlock(mol) + '> <CAS>\n' + mol.GetProp('CAS') + '\n\n$$$$\n')
+    assert list(read_compound_file(str(tmp_path / 'library.sdf.gz'))) == [('ethanol', 'CCO', None),
+                                                                          ('1', 'Oc1ccccc1', None)]
+    records = list(read_compound_file(str(tmp_path / 'library.sdf.gz'), id_property='CAS', skip=1))
+    assert records == [('cas-c1ccccc1O', 'Oc1ccccc1', None)]
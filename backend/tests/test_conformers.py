@@ -0,0 +1,71 @@
+"""
+Tests for budgeted conformer generation and the 3D descriptor block
+"""
+
+import numpy as np
+from rdkit import Chem
+
+from qsar_core.conformers import ConformerGenerator
+from qsar_core.enhanced_descriptors import EnhancedDescriptors, largest_fragment
+
+def test_largest_fragment_drops_counter_ions():
+    fragment = largest_fragment(Chem.MolFromSmiles('CC(=O)[O-].[Na+]'))
+    assert Chem.MolToSmiles(fragment) == 'CC(=O)[O-]'
+
+def test_salt_fragment_is_optimized_with_mmff():
+    result = ConformerGenerator().generate(largest_fragment(Chem.MolFromSmiles('CC(=O)[O-].[Na+]')))
+    assert result.strategy == 'etkdg+mmff'
+    assert result.energies is not None and np.isfinite(result.energies).all()
+
+def test_size_limit_skips_embedding():
+    result = ConformerGenerator(max_heavy_atoms=2).generate(Chem.MolFromSmiles('CCCC'))
+    assert result.strategy == 'skipped:size'
+    assert result.mol is None
+
+def test_hydrate_uses_largest_fragment_for_3d_descriptors():
+    calculator = EnhancedDescriptors()
+    hydrate = calculator.calculate_descriptors('CCCCCC1CCCCC1.O', True)
+    assert calculator.last_conformer_strategy == 'etkdg+mmff'
+    assert np.isfinite(hydrate['GETAWAY1'])
+    assert not any(name.startswith('WHIM') and int(name[4:]) > 7 for name in hydrate)
+
+def test_requested_3d_positions_only():
+    calculator = EnhancedDescriptors()
+    descriptors = calculator.calculate_descriptors('CCO', True, features=['WHIM3', 'GETAWAY2'])
+    assert set(descriptors) == {'WHIM3', 'GETAWAY2'}
+
+def _reference_shape(coords):
+    """Per-conformer moments (descending) and plane-of-best-fit distance, one conformer at a time"""
+    centered = coords - coords.mean(axis=0)
+    inertia = np.zeros((3, 3))
+    for x, y, z in centered:
+        inertia += np.array([[y * y + z * z, -x * y, -x * z],
+                             [-x * y, x * x + z * z, -y * z],
+                             [-x * z, -y * z, x * x + y * y]])
+    moments = np.sort(np.linalg.eigvals(inertia).real)[::-1]
+    normal = np.linalg.svd(centered)[2][2]
+    return np.append(moments, np.abs(centered @ normal).mean())
+
+def test_ensemble_shape_descriptors_match_per_conformer_reference():
+    mol = ConformerGenerator(num_conformers=3).generate(Chem.MolFromSmiles('CC(C)Cc1ccc(C(C)C(=O)O)cc1')).mol
+    assert mol.GetNumConformers() == 3
+    reference = np.array([_reference_shape(conf.GetPositions()) for conf in mol.GetConformers()])
+    energies = np.array([0.0, 0.5, 2.0])
+    
+    for aggregation, expected in [('mean', reference.mean(axis=0)), ('lowest', reference[0])]:
+        calculator = EnhancedDescriptors(num_conformers=3, conformer_aggregation=aggregation)
+        descriptors = calculator._calculate_pmi_descriptors(mol, energies)
+        actual = [descriptors['PMI1'], descriptors['PMI2'], descriptors['PMI3'], descriptors['PBF']]
+        np.testing.assert_allclose(actual, expected, rtol=1e-8)
+    
+    # A single conformer reproduces the one-conformer calculation
+    single = Chem.Mol(mol, confId=mol.GetConformer(1).GetId())
+    descriptors = EnhancedDescriptors()._calculate_pmi_descriptors(single)
+    np.testing.assert_allclose([descriptors['PMI1'], descriptors['PMI2'], descriptors['PMI3'],
+                                descriptors['PlaneOfBestFit']], reference[1], rtol=1e-8)
+
+def test_boltzmann_weights_favour_low_energy_conformers():
+    calculator = EnhancedDescriptors(num_conformers=3)
+    weights = calculator._conformer_weights(3, np.array([0.0, 1.0, 5.0]))
+    assert np.isclose(weights.sum(), 1.0) and weights[0] > weights[1] > weights[2]
+    assert np.allclose(EnhancedDescriptors(conformer_aggregation='mean')._conformer_weights(3, None), 1 / 3)
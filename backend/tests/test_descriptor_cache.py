@@ -0,0 +1,44 @@
+"""
+Tests for the persistent content-addressed descriptor cache
+"""
+
+import numpy as np
+
+from qsar_core.descriptor_cache import DescriptorCache
+from qsar_core.enhanced_descriptors import EnhancedDescriptors
+
+def test_cache_hits_match_fresh_calculation(tmp_path, smiles_list):
+    path = str(tmp_path / 'descriptors.sqlite')
+    fresh, _ = EnhancedDescriptors().calculate_batch(smiles_list[:6], True)
+    
+    cached_calculator = EnhancedDescriptors(cache=DescriptorCache(path))
+    first, _ = cached_calculator.calculate_batch(smiles_list[:6], True)
+    second, _ = cached_calculator.calculate_batch(smiles_list[:6], True)
+    assert cached_calculator.cache.stats()['memory_hits'] > 0
+    
+    # A new process-level cache reads the same entries back from disk
+    reopened = EnhancedDescriptors(cache=DescriptorCache(path, memory_entries=0))
+    third, _ = reopened.calculate_batch(smiles_list[:6], True)
+    assert reopened.cache.stats()['disk_hits'] > 0 and reopened.cache.stats()['misses'] == 0
+    
+    for result in (first, second, third):
+        np.testing.assert_array_equal(result, fresh)
+
+def test_keys_depend_on_block_and_version():
+    cache = DescriptorCache()
+    cache.put('CCO', '2d', '1', {'MolWt': 46.07})
+    assert cache.get('CCO', '2d', '1') == {'MolWt': 46.07}
+    assert cache.get('CCO', '3d', '1') is None
+    assert cache.get('CCO', '2d', '2') is None
+
+def test_overwrites_do_not_count_towards_max_entries(tmp_path):
+    cache = DescriptorCache(str(tmp_path / 'descriptors.sqlite'), max_entries=3, memory_entries=0)
+    for value in range(10):
+        cache.put('CCO', '2d', '1', {'MolWt': float(value)})
+    assert cache.stats()['evictions'] == 0
+    assert cache.get('CCO', '2d', '1') == {'MolWt': 9.0}
+    
+    for smiles in ('C', 'CC', 'CCC', 'CCCC'):
+        cache.put(smiles, '2d', '1', {'MolWt': 1.0})
+    assert cache.stats()['evictions'] > 0
+    assert cache.get('CCCC', '2d', '1') == {'MolWt': 1.0}
@@ -0,0 +1,56 @@
+"""
+Tests for batch descriptor calculation with EnhancedDescriptors
+"""
+
+import numpy as np
+import pytest
+
+from qsar_core.enhanced_descriptors import EnhancedDescriptors, calculate_descriptor_matrix
+
+def test_batch_rows_match_single_molecule_calculation(smiles_list):
+    calculator = EnhancedDescriptors()
+    values, errors = calculator.calculate_batch(smiles_list[:4], False)
+    columns = calculator.get_feature_names(False)
+    assert values.shape == (4, len(columns)) and values.dtype == np.float32
+    assert all(error is None for error in errors)
+    
+    for row, smiles in enumerate(smiles_list[:4]):
+        descriptors = calculator.calculate_descriptors(smiles, False)
+        expected = np.array([descriptors.get(name, np.nan) for name in columns], dtype=np.float32)
+        np.testing.assert_array_equal(values[row], expected)
+
+def test_invalid_smiles_become_nan_rows():
+    values, errors = EnhancedDescriptors().calculate_batch(['CCO', 'not a smiles', 'c1ccccc1'], False)
+    assert np.isnan(values[1]).all()
+    assert not np.isnan(values[0]).all() and not np.isnan(values[2]).all()
+    assert errors[0] is None and errors[2] is None
+    assert 'Invalid SMILES' in errors[1]
+
+def test_frame_columns_are_stable():
+    calculator = EnhancedDescriptors()
+    frame, _ = calculator.calculate_batch(['CCO'], False, as_frame=True)
+    assert list(frame.columns) == calculator.get_feature_names(False)
+    matrix, _ = calculate_descriptor_matrix(['CCO'], include_3d=False, as_frame=False)
+    np.testing.assert_array_equal(matrix, frame.to_numpy())
+
+def test_parallel_batch_matches_serial(smiles_list):
+    smiles_list = smiles_list + ['not a smiles']
+    calculator = EnhancedDescriptors()
+    serial, serial_errors = calculator.calculate_batch(smiles_list, False)
+    parallel, parallel_errors = calculator.calculate_batch(smiles_list, False, n_jobs=2, chunk_size=3)
+    np.testing.assert_array_equal(parallel, serial)
+    assert [error is None for error in parallel_errors] == [error is None for error in serial_errors]
+
+def test_planned_features_match_full_calculation(smiles_list):
+    calculator = EnhancedDescriptors()
+    features = ['TPSA', 'fr_benzene', 'Morgan_FP', 'EState_VSA3', 'MolWt', 'fr_Ar_OH']
+    plan = calculator.build_plan(features)
+    assert set(plan.groups) == {'2d', 'fragment', 'fingerprint', 'estate'} and not plan.needs_3d
+    
+    full, _ = calculator.calculate_batch(smiles_list, False, as_frame=True)
+    planned, _ = calculator.calculate_batch(smiles_list, False, features=features)
+    np.testing.assert_array_equal(planned, full[features].to_numpy())
+
+def test_unknown_feature_names_are_rejected():
+    with pytest.raises(ValueError, match='NotADescriptor'):
+        EnhancedDescriptors().build_plan(['MolWt', 'NotADescriptor'])
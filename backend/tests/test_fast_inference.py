@@ -0,0 +1,72 @@
+"""
+Tests for compiled forest inference
+"""
+
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.ensemble import ExtraTreesRegressor
+from sklearn.linear_model import Ridge
+
+from qsar_core.enhanced_modeling import EnhancedQSARModel
+from qsar_core.fast_inference import CompiledForest, load_compiled_model
+
+def _train(model_type, task_type, X, y, k=None):
+    model = EnhancedQSARModel(model_type, task_type)
+    X_train, _, y_train, _ = model.prepare_data(X, y)
+    if k is not None:
+        X_train = model.feature_selection(X_train, y_train, method='kbest', k=k)
+    model.train(X_train, y_train, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=1,
+                applicability_domain=False)
+    return model
+
+def test_compiled_regression_forest_matches_predict(regression_data):
+    X, y = regression_data
+    model = _train('random_forest', 'regression', X, y)
+    compiled = model.compile()
+    
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(compiled.predict(X, batch_size=7), model.predict(X), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(compiled.predict(sparse.csr_matrix(X)), model.predict(X), rtol=1e-12, atol=1e-12)
+
+def test_compiled_forest_with_feature_selection_takes_all_or_selected_inputs(regression_data):
+    X, y = regression_data
+    model = _train('random_forest', 'regression', X, y, k=3)
+    compiled = model.compile()
+    assert len(compiled.input_indices) == 3
+    
+    expected = model.predict(X)
+    np.testing.assert_allclose(compiled.predict(X), expected, rtol=1e-12, atol=1e-12)
+    selected = X[:, model.feature_selector.get_support()]
+    np.testing.assert_allclose(compiled.predict(selected), expected, rtol=1e-12, atol=1e-12)
+
+def test_compiled_classification_forest_matches_predict_proba(classification_data):
+    X, y = classification_data
+    model = _train('random_forest', 'classification', X, y)
+    compiled = model.compile()
+    
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=1e-12, atol=1e-12)
+
+def test_compiled_extra_trees_matches_estimator(regression_data):
+    X, y = regression_data
+    estimator = ExtraTreesRegressor(n_estimators=20, random_state=0).fit(X, y)
+    np.testing.assert_allclose(CompiledForest.from_estimator(estimator).predict(X), estimator.predict(X),
+                               rtol=1e-12, atol=1e-12)
+
+@pytest.mark.parametrize('mmap_mode', [None, 'r'])
+def test_compiled_forest_save_load_round_trip(regression_data, tmp_path, mmap_mode):
+    X, y = regression_data
+    model = _train('random_forest', 'regression', X, y)
+    path = str(tmp_path / 'forest.npz')
+    compiled = model.compile(path)
+    
+    loaded = load_compiled_model(path, mmap_mode=mmap_mode)
+    if mmap_mode:
+        assert isinstance(loaded.value, np.memmap)
+    np.testing.assert_array_equal(loaded.predict(X), compiled.predict(X))
+
+def test_non_forest_models_cannot_be_compiled(regression_data):
+    X, y = regression_data
+    with pytest.raises(ValueError):
+        CompiledForest.from_estimator(Ridge().fit(X, y))
@@ -0,0 +1,39 @@
+"""
+Tests for full-bit fingerprint matrices
+"""
+
+import numpy as np
+import pytest
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator
+
+from qsar_core.enhanced_descriptors import EnhancedDescriptors
+from qsar_core.fingerprints import (FINGERPRINT_TYPES, calculate_packed_fingerprints, fingerprint_length,
+                                    packed_to_csr, unpack_fingerprints)
+
+def test_packed_bits_match_rdkit_generator(smiles_list):
+    packed, errors = calculate_packed_fingerprints(smiles_list, 'morgan', n_bits=1024, radius=2)
+    generator = rdFingerprintGenerator.GetMorganGenerator(radius=2, fpSize=1024)
+    expected = np.array([generator.GetFingerprintAsNumPy(Chem.MolFromSmiles(smiles)) for smiles in smiles_list])
+    np.testing.assert_array_equal(unpack_fingerprints(packed, 1024), expected)
+    assert all(error is None for error in errors)
+
+@pytest.mark.parametrize('fp_type', FINGERPRINT_TYPES)
+def test_csr_matches_unpacked_bits(smiles_list, fp_type):
+    n_bits = fingerprint_length(fp_type, 512)
+    packed, _ = calculate_packed_fingerprints(smiles_list, fp_type, n_bits=512)
+    dense = unpack_fingerprints(packed, n_bits)
+    csr = packed_to_csr(packed, n_bits)
+    assert csr.shape == (len(smiles_list), n_bits)
+    np.testing.assert_array_equal(csr.toarray(), dense)
+
+def test_invalid_rows_are_zero_and_reported():
+    packed, errors = calculate_packed_fingerprints(['CCO', 'not a smiles'], 'morgan', n_bits=256)
+    assert packed[1].sum() == 0 and packed[0].sum() > 0
+    assert errors[0] is None and errors[1] is not None
+
+def test_parallel_fingerprint_matrix_matches_serial(smiles_list):
+    calculator = EnhancedDescriptors()
+    serial, _ = calculator.calculate_fingerprint_matrix(smiles_list, output='csr')
+    parallel, _ = calculator.calculate_fingerprint_matrix(smiles_list, output='csr', n_jobs=2, chunk_size=4)
+    assert (serial != parallel).nnz == 0
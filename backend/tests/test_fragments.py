@@ -0,0 +1,62 @@
+"""
+Tests for precompiled fragment descriptor counts
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+from rdkit import Chem
+from rdkit.Chem import Descriptors
+
+from qsar_core.fragments import FragmentMatcher, calculate_fragment_counts, get_fragment_matcher
+
+EXTRA_SMILES = [
+    'CC(=O)Nc1ccc(S(N)(=O)=O)cc1', 'O=C1NC(=O)C(c2ccccc2)(c2ccccc2)N1', 'C=CC(=O)OC', 'CSSC',
+    'N#Cc1ccccc1', 'CC(C)(C)OC(=O)N[C@@H](Cc1c[nH]c2ccccc12)C(=O)O', 'O=[N+]([O-])OCC', 'c1ccc2[nH]ccc2c1',
+    'BrCC(Cl)I', 'CC1=NN(C(=O)C1)c1ccccc1', 'OP(=O)(O)OCC', 'C1CO1', 'NC(=N)N', 'CC(=O)C=C', 'S=C=Nc1ccccc1'
+]
+
+def _rdkit_counts(mols, names):
+    return np.array([[getattr(Descriptors, name)(mol) for name in names] for mol in mols], dtype=np.float32)
+
+def test_fragment_counts_match_rdkit(smiles_list):
+    mols = [Chem.MolFromSmiles(smiles) for smiles in smiles_list + EXTRA_SMILES]
+    matcher = get_fragment_matcher()
+    assert all(name.startswith('fr_') for name in matcher.names)
+    expected = _rdkit_counts(mols, matcher.names)
+    
+    np.testing.assert_array_equal(matcher.count_matrix(mols), expected)
+    for mol, row in zip(mols, expected):
+        assert list(matcher.count(mol).values()) == row.tolist()
+
+def test_prefilter_keeps_every_matching_pattern(smiles_list):
+    mols = [Chem.MolFromSmiles(smiles) for smiles in smiles_list + EXTRA_SMILES]
+    matcher = get_fragment_matcher()
+    candidates = matcher.candidate_matrix(mols)
+    assert not (_rdkit_counts(mols, matcher.names) > 0)[~candidates].any()
+    assert not candidates.all()
+    for mol, row in zip(mols, candidates):
+        np.testing.assert_array_equal(matcher.candidates(mol), row)
+
+def test_selected_fragments_follow_requested_order():
+    mol = Chem.MolFromSmiles('CC(=O)Oc1ccccc1C(=O)O')
+    names = ['fr_ester', 'fr_benzene', 'fr_COO']
+    counts = get_fragment_matcher().count(mol, names)
+    assert list(counts) == names
+    assert list(counts.values()) == [getattr(Descriptors, name)(mol) for name in names]
+    with pytest.raises(ValueError):
+        get_fragment_matcher().count(mol, ['fr_missing'])
+
+def test_invalid_rows_and_pickling():
+    counts, errors = calculate_fragment_counts(['c1ccccc1O', 'not a smiles'], names=['fr_phenol', 'fr_benzene'])
+    np.testing.assert_array_equal(counts, [[1, 1], [0, 0]])
+    assert errors[0] is None and 'Invalid SMILES' in errors[1]
+    
+    matcher = pickle.loads(pickle.dumps(FragmentMatcher([('fr_phenol', '[OX2H]-c1ccccc1')])))
+    assert len(matcher) == 1 and 'fr_phenol' in matcher
+    assert matcher.count(Chem.MolFromSmiles('Oc1ccccc1O')) == {'fr_phenol': 2}
+
+def test_invalid_smarts_raises():
+    with pytest.raises(ValueError):
+        FragmentMatcher([('fr_bad', '[C')])
@@ -0,0 +1,83 @@
+"""
+Tests for stage timing instrumentation and its exports
+"""
+
+import json
+import pickle
+
+import pytest
+
+from qsar_core.enhanced_descriptors import EnhancedDescriptors
+from qsar_core.instrumentation import NULL_INSTRUMENTATION, Instrumentation, StageHistogram
+
+def test_stage_records_durations_and_failures():
+    instrumentation = Instrumentation()
+    calls = []
+    instrumentation.add_callback(lambda name, seconds, failed: calls.append((name, failed)))
+    
+    with instrumentation.stage('parse'):
+        pass
+    with pytest.raises(RuntimeError):
+        with instrumentation.stage('parse'):
+            raise RuntimeError('boom')
+    
+    stage = instrumentation.snapshot()['stages']['parse']
+    assert stage['count'] == 2 and stage['failures'] == 1
+    assert sum(stage['bucket_counts']) == 2
+    assert calls == [('parse', False), ('parse', True)]
+
+def test_histogram_quantiles_are_bucket_upper_bounds():
+    histogram = StageHistogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float('inf')
+    assert StageHistogram().quantile(0.5) == 0.0
+
+def test_merge_adds_worker_snapshots():
+    parent, worker = Instrumentation(), pickle.loads(pickle.dumps(Instrumentation()))
+    parent.record('2d', 0.01)
+    worker.record('2d', 0.02, failed=True)
+    worker.increment('cache', result='hit')
+    
+    parent.merge(worker.collect())
+    parent.merge(None)
+    snapshot = parent.snapshot()
+    assert snapshot['stages']['2d']['count'] == 2 and snapshot['stages']['2d']['failures'] == 1
+    assert snapshot['counters'] == [{'name': 'cache', 'labels': {'result': 'hit'}, 'value': 1}]
+    assert worker.snapshot() == {'stages': {}, 'counters': []}
+
+def test_prometheus_and_json_export():
+    instrumentation = Instrumentation(namespace='test', buckets=(0.1, 1.0))
+    instrumentation.record('fit', 0.05)
+    instrumentation.record('fit', 0.5, failed=True)
+    instrumentation.increment('invalid_smiles')
+    instrumentation.increment('cache', block='2d', result='say "hi"')
+    
+    text = instrumentation.to_prometheus()
+    assert 'test_stage_duration_seconds_bucket{stage="fit",le="0.1"} 1' in text
+    assert 'test_stage_duration_seconds_bucket{stage="fit",le="+Inf"} 2' in text
+    assert 'test_stage_duration_seconds_count{stage="fit"} 2' in text
+    assert 'test_stage_failures_total{stage="fit"} 1' in text
+    assert 'test_invalid_smiles_total 1' in text
+    assert 'test_cache_total{block="2d",result="say \\"hi\\""} 1' in text
+    assert json.loads(instrumentation.to_json()) == instrumentation.snapshot()
+
+def test_null_instrumentation_records_nothing():
+    with NULL_INSTRUMENTATION.stage('parse'):
+        NULL_INSTRUMENTATION.increment('invalid_smiles')
+    assert NULL_INSTRUMENTATION.snapshot() == {'stages': {}, 'counters': []}
+    assert NULL_INSTRUMENTATION.collect() is None
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_descriptor_pipeline_stages_are_counted(smiles_list, n_jobs):
+    instrumentation = Instrumentation()
+    calculator = EnhancedDescriptors(instrumentation=instrumentation)
+    calculator.calculate_batch(smiles_list[:6] + ['not a smiles'], False, n_jobs=n_jobs, chunk_size=2)
+    
+    snapshot = instrumentation.snapshot()
+    for stage in ('parse', '2d', 'fingerprint', 'fragment', 'estate'):
+        assert snapshot['stages'][stage]['count'] >= 6
+    assert '3d' not in snapshot['stages']
+    assert {'name': 'invalid_smiles', 'labels': {}, 'value': 1} in snapshot['counters']
@@ -0,0 +1,78 @@
+"""
+Tests for versioned model artifacts
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from qsar_core.enhanced_modeling import EnhancedQSARModel
+from qsar_core.model_artifact import ESTIMATOR_FILE, MANIFEST_FILE, FixedFeatureMask, is_artifact
+
+def _trained_model(X, y):
+    model = EnhancedQSARModel('ridge', 'regression')
+    X_train, _, y_train, _ = model.prepare_data(X, y, feature_names=[f'd{i}' for i in range(X.shape[1])])
+    X_train = model.feature_selection(X_train, y_train, method='kbest', k=4)
+    model.train(X_train, y_train, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=1)
+    return model
+
+def test_artifact_round_trip_restores_preprocessing(tmp_path, regression_data):
+    X, y = regression_data
+    model = _trained_model(X, y)
+    path = str(tmp_path / 'ridge_regression_20260101_000000')
+    model.save_model(path)
+    assert is_artifact(path)
+    
+    loaded = EnhancedQSARModel.load_model(path)
+    assert isinstance(loaded.feature_selector, FixedFeatureMask)
+    assert loaded.feature_names == model.feature_names
+    assert loaded.input_feature_names == model.input_feature_names
+    assert loaded.descriptor_set_version == model.descriptor_set_version
+    
+    predictions, domain = model.predict(X, return_domain=True)
+    loaded_predictions, loaded_domain = loaded.predict(X, return_domain=True)
+    np.testing.assert_array_equal(loaded_predictions, predictions)
+    for name in domain:
+        np.testing.assert_array_equal(loaded_domain[name], domain[name])
+    
+    interval = model.predict_uncertainty(X[:10])
+    loaded_interval = loaded.predict_uncertainty(X[:10])
+    np.testing.assert_array_equal(loaded_interval['lower'], interval['lower'])
+    np.testing.assert_array_equal(loaded_interval['upper'], interval['upper'])
+
+def test_artifact_checksum_mismatch_is_rejected(tmp_path, regression_data):
+    X, y = regression_data
+    path = str(tmp_path / 'model')
+    _trained_model(X, y).save_model(path)
+    
+    with open(os.path.join(path, ESTIMATOR_FILE), 'ab') as f:
+        f.write(b'\0')
+    with pytest.raises(ValueError, match='Checksum mismatch'):
+        EnhancedQSARModel.load_model(path)
+    EnhancedQSARModel.load_model(path, verify=False)
+
+def test_artifact_format_version_is_checked(tmp_path, regression_data):
+    X, y = regression_data
+    path = str(tmp_path / 'model')
+    _trained_model(X, y).save_model(path)
+    
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest['format_version'] = 999
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match='format version'):
+        EnhancedQSARModel.load_model(path)
+
+def test_saving_over_an_artifact_replaces_it(tmp_path, regression_data):
+    X, y = regression_data
+    path = str(tmp_path / 'model')
+    _trained_model(X, y).save_model(path)
+    model = _trained_model(X, 2 * y)
+    model.save_model(path)
+    
+    assert sorted(os.listdir(tmp_path)) == ['model']
+    np.testing.assert_array_equal(EnhancedQSARModel.load_model(path).predict(X), model.predict(X))
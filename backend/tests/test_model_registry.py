@@ -0,0 +1,103 @@
+"""
+Tests for the model registry: indexing, version resolution, legacy round-trips, memory mapping, LRU eviction and concurrent loading
+"""
+
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from qsar_core.enhanced_modeling import EnhancedQSARModel
+from qsar_core.fast_inference import CompiledForest
+from qsar_core.model_registry import ModelRegistry
+
+def _save_ridge(directory, name, X, y):
+    path = os.path.join(directory, f'{name}_20260101_000000.joblib')
+    joblib.dump(Ridge().fit(X, y), path)
+    return path
+
+def test_legacy_joblib_model_round_trip(tmp_path, regression_data):
+    X, y = regression_data
+    model = EnhancedQSARModel('ridge', 'regression')
+    model.train(X, y, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=1,
+                applicability_domain=False)
+    model.save_model(str(tmp_path / 'ridge_regression_20260101_000000.joblib'))
+    
+    registry = ModelRegistry(str(tmp_path))
+    entry = registry.resolve('ridge_regression')
+    assert entry.task_type == 'regression' and entry.metadata_path.endswith('_metadata.json')
+    loaded = registry.get('ridge_regression')
+    assert isinstance(loaded, EnhancedQSARModel)
+    np.testing.assert_allclose(loaded.model.predict(X[:5]), model.model.predict(X[:5]))
+
+def test_resolve_latest_and_pinned_versions(tmp_path, regression_data):
+    X, y = regression_data
+    for version in ('20250101_000000', '20260101_000000'):
+        joblib.dump(Ridge().fit(X, y), str(tmp_path / f'ridge_regression_{version}.joblib'))
+    registry = ModelRegistry(str(tmp_path))
+    
+    assert registry.resolve('ridge_regression').version == '20260101_000000'
+    assert registry.resolve('ridge_regression', 'latest', task_type='regression').version == '20260101_000000'
+    assert registry.resolve('ridge_regression', '20250101_000000').version == '20250101_000000'
+    with pytest.raises(ValueError):
+        registry.resolve('ridge_regression', task_type='classification')
+    with pytest.raises(ValueError):
+        registry.resolve('missing')
+
+def test_compiled_forest_is_memory_mapped(tmp_path, regression_data):
+    X, y = regression_data
+    forest = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    CompiledForest.from_estimator(forest).save(str(tmp_path / 'forest_regression_20260101_000000.npz'))
+    
+    loaded = ModelRegistry(str(tmp_path)).get('forest_regression')
+    assert isinstance(loaded, CompiledForest) and isinstance(loaded.threshold, np.memmap)
+    np.testing.assert_allclose(loaded.predict(X), forest.predict(X))
+
+def test_cache_hits_and_lru_eviction(tmp_path, regression_data):
+    X, y = regression_data
+    for name in ('first', 'second'):
+        _save_ridge(str(tmp_path), name, X, y)
+    registry = ModelRegistry(str(tmp_path), max_memory_bytes=1)
+    
+    first = registry.get('first')
+    assert registry.get('first') is first
+    registry.get('second')
+    stats = registry.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 2
+    assert stats['loaded_models'] == ['second@20260101_000000'] and stats['evictions'] == 1
+
+def test_cold_load_does_not_block_other_models(tmp_path, regression_data):
+    X, y = regression_data
+    for name in ('fast', 'slow'):
+        _save_ridge(str(tmp_path), name, X, y)
+    registry = ModelRegistry(str(tmp_path))
+    registry.get('fast')
+    
+    load = registry._load
+    calls = []
+    
+    def slow_load(entry):
+        calls.append(entry.name)
+        if entry.name == 'slow':
+            time.sleep(1.0)
+        return load(entry)
+    
+    registry._load = slow_load
+    threads = [threading.Thread(target=registry.get, args=('slow',)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    
+    started = time.perf_counter()
+    registry.get('fast')
+    assert time.perf_counter() - started < 0.5
+    
+    for thread in threads:
+        thread.join()
+    assert calls == ['slow']
+    assert registry.stats()['misses'] == 2
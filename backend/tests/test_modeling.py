@@ -0,0 +1,138 @@
+"""
+Tests for the data path, feature selection, hyperparameter tuning and parallel cross-validation in EnhancedQSARModel
+"""
+
+import json
+
+import numpy as np
+from sklearn.feature_selection import RFE, f_regression
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import cross_val_score
+
+from qsar_core import enhanced_modeling
+from qsar_core.enhanced_modeling import MAX_ESTIMATORS, EnhancedQSARModel, f_regression_blocked
+
+def test_rfe_default_step_matches_single_feature_elimination(regression_data):
+    X, y = regression_data
+    model = EnhancedQSARModel('ridge', 'regression')
+    model.feature_selection(X, y, method='rfe', k=3)
+    reference = RFE(Ridge(), n_features_to_select=3, step=1).fit(X, y)
+    np.testing.assert_array_equal(model.feature_selector.get_support(), reference.get_support())
+    assert model.feature_selector.step == 1
+
+def test_rfe_fractional_and_scheduled_steps(regression_data):
+    X, y = regression_data
+    fractional = EnhancedQSARModel('ridge', 'regression')
+    assert fractional.feature_selection(X, y, method='rfe', k=3, step=0.25).shape == (len(X), 3)
+    scheduled = EnhancedQSARModel('ridge', 'regression')
+    assert scheduled.feature_selection(X, y, method='rfe', k=2, step=[6, 4]).shape == (len(X), 2)
+
+def test_parallel_cross_validation_matches_serial(regression_data):
+    X, y = regression_data
+    scores = []
+    for n_jobs in (1, 2):
+        model = EnhancedQSARModel('ridge', 'regression')
+        model.train(X, y, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=n_jobs,
+                    applicability_domain=False)
+        scores.append(model.cv_scores)
+    np.testing.assert_allclose(scores[0], scores[1])
+
+def test_parallel_training_over_shared_memmap_matches_serial():
+    # Large enough for train to hand workers a memory-mapped copy
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(2000, 150))
+    y = X[:, 0] - 0.5 * X[:, 3] + 0.1 * rng.normal(size=2000)
+    models = []
+    for n_jobs in (1, 2):
+        model = EnhancedQSARModel('ridge', 'regression')
+        model.train(X, y, selection_method='rfe', selection_step=50, hyperparameter_tuning=False, cv=3,
+                    n_jobs=n_jobs, applicability_domain=False)
+        models.append(model)
+    
+    serial, parallel = models
+    np.testing.assert_array_equal(parallel.feature_selector.get_support(), serial.feature_selector.get_support())
+    np.testing.assert_allclose(parallel.cv_scores, serial.cv_scores)
+    np.testing.assert_allclose(parallel.model.coef_, serial.model.coef_)
+
+def test_residual_cross_validation_matches_cross_val_score(regression_data):
+    X, y = regression_data
+    model = EnhancedQSARModel('ridge', 'regression', dtype=None)
+    model.train(X, y, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=1,
+                applicability_domain=False)
+    expected = cross_val_score(Ridge(), X, y, cv=3, scoring='neg_mean_squared_error')
+    np.testing.assert_allclose(model.cv_scores, expected)
+    assert len(model.calibration_residuals) == len(y)
+    assert np.all(np.diff(model.calibration_residuals) >= 0)
+
+def test_halving_search_history_seeds_neighbourhood(regression_data, tmp_path):
+    X, y = regression_data
+    history_path = str(tmp_path / 'history.json')
+    
+    first = EnhancedQSARModel('svr', 'regression').hyperparameter_tuning(
+        X, y, method='halving', cv=3, n_jobs=1, history_path=history_path)
+    assert not first['seeded_from_history']
+    
+    model = EnhancedQSARModel('svr', 'regression')
+    second = model.hyperparameter_tuning(X, y, method='halving', cv=3, n_jobs=1, history_path=history_path)
+    assert second['seeded_from_history']
+    assert model.best_params == second['best_params']
+    
+    # The seeded search only visits the previous optimum and its grid neighbours
+    neighbourhood = model._neighbourhood_grid(model._get_param_grid(), first['best_params'])
+    for params in second['cv_results']['params']:
+        assert all(value in neighbourhood[name] for name, value in params.items())
+    
+    with open(history_path) as f:
+        history = json.load(f)
+    runs = history['regression:svr']
+    assert [run['method'] for run in runs] == ['halving', 'halving']
+    assert runs[0]['best_params'] == first['best_params']
+
+def test_neighbourhood_grid_keeps_adjacent_values():
+    model = EnhancedQSARModel('random_forest', 'regression')
+    grid = model._neighbourhood_grid({'max_depth': [None, 10, 20, 30], 'min_samples_leaf': [1, 2, 4]},
+                                     {'max_depth': 20, 'min_samples_leaf': 8})
+    assert grid == {'max_depth': [10, 20, 30], 'min_samples_leaf': [8]}
+
+def test_grow_estimators_stays_within_bounds(regression_data):
+    X, y = regression_data
+    n_estimators = EnhancedQSARModel('random_forest', 'regression')._grow_estimators(X, y, {'max_depth': 10}, n_jobs=1)
+    assert 50 <= n_estimators <= MAX_ESTIMATORS
+
+def test_float32_features_are_not_copied(regression_data):
+    X, _ = regression_data
+    model = EnhancedQSARModel('ridge', 'regression')
+    X32 = np.ascontiguousarray(X, dtype=np.float32)
+    assert model._as_features(X32) is X32
+    assert model._as_features(X).dtype == np.float32
+    assert EnhancedQSARModel('ridge', 'regression', dtype=None)._as_features(X) is X
+
+def test_float32_data_path_matches_sklearn_transform(regression_data):
+    X, y = regression_data
+    model = EnhancedQSARModel('ridge', 'regression')
+    X_train, X_test, y_train, _ = model.prepare_data(X, y)
+    assert X_train.dtype == np.float32 and X_test.dtype == np.float32
+    X_selected = model.feature_selection(X_train, y_train, method='kbest', k=4)
+    
+    expected = model.feature_selector.transform(model.scaler.transform(X.astype(np.float32)))
+    np.testing.assert_allclose(model._transform_features(X), expected, rtol=1e-6, atol=1e-6)
+    np.testing.assert_array_equal(X_selected, X_train[:, model.feature_selector.get_support()])
+
+def test_blocked_f_regression_matches_sklearn(regression_data, monkeypatch):
+    X, y = regression_data
+    monkeypatch.setattr(enhanced_modeling, 'SCORE_BLOCK_BYTES', 8 * len(X) * 3)
+    X32 = X.astype(np.float32)
+    X32[:, 5] = 1.0
+    f_statistic, p_values = f_regression_blocked(X32, y)
+    expected_f, expected_p = f_regression(X32.astype(np.float64), y, force_finite=True)
+    np.testing.assert_allclose(f_statistic, expected_f, rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(p_values, expected_p, rtol=1e-6, atol=1e-12)
+
+def test_track_memory_records_each_stage(regression_data):
+    X, y = regression_data
+    model = EnhancedQSARModel('ridge', 'regression', track_memory=True)
+    X_train, _, y_train, _ = model.prepare_data(X, y)
+    model.train(X_train, y_train, hyperparameter_tuning=False, cv=3, n_jobs=1)
+    memory = model.training_history['memory']
+    assert {'prepare_data', 'feature_selection', 'cross_validation', 'fit', 'applicability_domain'} <= set(memory)
+    assert all(isinstance(value, int) and value >= 0 for value in memory.values())
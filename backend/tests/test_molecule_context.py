@@ -0,0 +1,68 @@
+"""
+Tests for MoleculeContext memoization and shared calculator reuse
+"""
+
+import numpy as np
+import pytest
+from rdkit import Chem
+from rdkit.Chem import rdPartialCharges
+
+from qsar_core import enhanced_descriptors
+from qsar_core.enhanced_descriptors import (FINGERPRINT_FUNCTIONS, EnhancedDescriptors,
+                                            calculate_molecular_descriptors, get_descriptor_calculator)
+from qsar_core.molecule_context import MoleculeContext
+from qsar_core.structural_alerts import AlertScreener
+
+def test_values_are_computed_once():
+    context = MoleculeContext.from_smiles('CCO')
+    calls = []
+    for _ in range(3):
+        assert context.get('key', lambda: calls.append(1) or 42) == 42
+    assert calls == [1] and 'key' in context
+    context.clear()
+    assert 'key' not in context
+    assert MoleculeContext.coerce(context) is context
+    with pytest.raises(ValueError):
+        MoleculeContext.from_smiles('not a smiles')
+
+def test_context_descriptors_match_smiles_descriptors(smiles_list):
+    calculator = EnhancedDescriptors()
+    for smiles in smiles_list[:6]:
+        context = MoleculeContext.from_smiles(smiles)
+        from_context = calculator.calculate_descriptors(context, include_3d=False)
+        from_smiles = calculator.calculate_descriptors(smiles, include_3d=False)
+        assert list(from_context) == list(from_smiles)
+        np.testing.assert_array_equal(list(from_context.values()), list(from_smiles.values()))
+        assert all(('fingerprint', name) in context for name in FINGERPRINT_FUNCTIONS)
+
+def test_all_fingerprint_columns_are_filled(smiles_list):
+    mol = Chem.MolFromSmiles(smiles_list[1])
+    descriptors = EnhancedDescriptors().calculate_descriptors(smiles_list[1], include_3d=False)
+    assert len(FINGERPRINT_FUNCTIONS) == 8
+    for name, function in FINGERPRINT_FUNCTIONS.items():
+        assert descriptors[name] == function(mol).GetNumOnBits() > 0
+
+def test_gasteiger_charges_match_rdkit():
+    context = MoleculeContext.from_smiles('CC(=O)Oc1ccccc1C(=O)O')
+    mol = Chem.MolFromSmiles('CC(=O)Oc1ccccc1C(=O)O')
+    rdPartialCharges.ComputeGasteigerCharges(mol)
+    expected = [float(atom.GetProp('_GasteigerCharge')) for atom in mol.GetAtoms()]
+    np.testing.assert_allclose(context.gasteiger_charges, expected)
+    assert context.gasteiger_charges is context.gasteiger_charges
+
+def test_alert_screening_reuses_the_memoized_pattern_fingerprint():
+    context = MoleculeContext.from_smiles('O=[N+]([O-])c1ccc(N)cc1')
+    EnhancedDescriptors().calculate_descriptors(context, include_3d=False)
+    pattern_fp = context.fingerprint('Pattern_FP', Chem.PatternFingerprint)
+    
+    screener = AlertScreener()
+    hits = screener.screen_molecule(context)
+    assert context.fingerprint('Pattern_FP', Chem.PatternFingerprint) is pattern_fp
+    np.testing.assert_array_equal(hits, screener.screen_molecule('O=[N+]([O-])c1ccc(N)cc1'))
+
+def test_convenience_functions_share_one_calculator(monkeypatch):
+    monkeypatch.setattr(enhanced_descriptors, '_shared_calculator', None)
+    calculator = get_descriptor_calculator()
+    assert get_descriptor_calculator() is calculator
+    descriptors = calculate_molecular_descriptors('CCO', include_3d=False)
+    assert descriptors == pytest.approx(calculator.calculate_descriptors('CCO', include_3d=False), nan_ok=True)
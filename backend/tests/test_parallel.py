@@ -0,0 +1,76 @@
+"""
+Tests for chunked process-pool execution with crash and timeout isolation
+"""
+
+import os
+import time
+
+import numpy as np
+
+from qsar_core.parallel import run_chunked, shared_array
+
+def _square(chunk, log_path=None, delays=None):
+    for item in chunk:
+        if log_path is not None:
+            with open(log_path, 'a') as f:
+                f.write(f"{item}\n")
+        if delays is not None:
+            time.sleep(delays.get(item, 0.0))
+    return [item * item for item in chunk]
+
+def _crash_on_three(chunk):
+    if 3 in chunk:
+        os._exit(1)
+    return [item * item for item in chunk]
+
+def _collect(items, worker, **kwargs):
+    results = {}
+    failures = {}
+    
+    def on_result(start, block):
+        for offset, value in enumerate(block):
+            results[start + offset] = value
+    
+    def on_failure(index, message):
+        failures[index] = message
+    
+    run_chunked(worker, items, on_result, on_failure, **kwargs)
+    return results, failures
+
+def test_results_match_serial():
+    items = list(range(37))
+    results, failures = _collect(items, _square, n_jobs=2, chunk_size=5)
+    assert failures == {}
+    assert [results[i] for i in range(len(items))] == [item * item for item in items]
+
+def test_crashing_item_is_isolated():
+    items = list(range(8))
+    results, failures = _collect(items, _crash_on_three, n_jobs=2, chunk_size=4)
+    assert set(failures) == {3}
+    assert {index: value for index, value in results.items()} == {i: i * i for i in items if i != 3}
+
+def test_hung_item_times_out():
+    items = list(range(4))
+    results, failures = _collect(items, _square, args=(None, {2: 5.0}), n_jobs=2, chunk_size=1, timeout=0.5)
+    assert set(failures) == {2}
+    assert set(results) == {0, 1, 3}
+
+def test_queued_chunks_are_not_timed_while_waiting(tmp_path):
+    # One worker: chunk 1 waits in the executor's call queue while chunk 0 runs
+    log_path = str(tmp_path / 'calls.log')
+    items = list(range(3))
+    results, failures = _collect(items, _square, args=(log_path, {0: 0.6, 1: 0.6, 2: 0.6}),
+                                 n_jobs=1, chunk_size=1, timeout=1.0)
+    assert failures == {}
+    assert set(results) == set(items)
+    with open(log_path) as f:
+        assert sorted(int(line) for line in f) == items
+
+def test_shared_array_is_read_only_memmap():
+    X = np.arange(400000, dtype=np.float64).reshape(-1, 4)
+    with shared_array(X, n_jobs=2) as shared:
+        assert isinstance(shared, np.memmap)
+        assert not shared.flags.writeable
+        np.testing.assert_array_equal(shared, X)
+    with shared_array(X, n_jobs=1) as serial:
+        assert serial is X
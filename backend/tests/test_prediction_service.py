@@ -0,0 +1,105 @@
+"""
+Tests for the asynchronous micro-batching prediction service
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from qsar_core.enhanced_descriptors import EnhancedDescriptors
+from qsar_core.enhanced_modeling import EnhancedQSARModel
+from qsar_core.prediction_service import PredictionService, ServiceOverloadedError, _predict_rows
+
+FEATURES = ['MolWt', 'LogP', 'TPSA', 'NumHDonors']
+
+class SlowModel:
+    """Model wrapper that takes a while to predict"""
+    
+    def __init__(self, model, delay):
+        self.model = model
+        self.delay = delay
+        self.input_feature_names = model.input_feature_names
+    
+    def predict(self, X):
+        time.sleep(self.delay)
+        return self.model.predict(X)
+
+@pytest.fixture
+def trained_model(smiles_list):
+    values, _ = EnhancedDescriptors().calculate_batch(smiles_list, False, features=FEATURES)
+    model = EnhancedQSARModel('ridge', 'regression')
+    X_train, _, y_train, _ = model.prepare_data(values, values[:, 1] - 0.01 * values[:, 2], test_size=0.25,
+                                                feature_names=FEATURES)
+    model.train(X_train, y_train, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=1,
+                applicability_domain=False)
+    return model
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_service_predictions_match_direct_prediction(trained_model, smiles_list, executor):
+    requests = smiles_list + ['not a smiles']
+    
+    async def run():
+        async with PredictionService(trained_model, executor=executor, max_workers=2, max_batch_size=4) as service:
+            results = await service.predict_many(requests)
+            return results, service.stats()
+    
+    results, stats = asyncio.run(run())
+    values, _ = EnhancedDescriptors().calculate_batch(smiles_list, False, features=FEATURES)
+    expected = trained_model.predict(values)
+    
+    assert [result['smiles'] for result in results] == requests
+    np.testing.assert_allclose([result['prediction'] for result in results[:-1]], expected, rtol=1e-6)
+    assert all(result['error'] is None for result in results[:-1])
+    assert results[-1]['prediction'] is None and 'Invalid SMILES' in results[-1]['error']
+    assert stats['requests'] == len(requests) and stats['batches'] < len(requests)
+
+def test_stop_fails_queued_requests(trained_model):
+    async def run():
+        service = PredictionService(SlowModel(trained_model, 0.3), executor='thread', max_workers=1,
+                                    max_batch_size=1)
+        await service.start()
+        running = asyncio.create_task(service.predict('CCO'))
+        await asyncio.sleep(0.1)
+        queued = [asyncio.create_task(service.predict(smiles)) for smiles in ('CCN', 'CCC')]
+        await asyncio.sleep(0.01)
+        await service.stop()
+        return await running, await asyncio.gather(*queued, return_exceptions=True)
+    
+    result, queued = asyncio.run(run())
+    assert result['error'] is None and result['prediction'] is not None
+    assert all(isinstance(error, RuntimeError) and 'stopped' in str(error) for error in queued)
+
+def test_full_queue_rejects_requests(trained_model):
+    async def run():
+        service = PredictionService(SlowModel(trained_model, 0.3), executor='thread', max_workers=1,
+                                    max_batch_size=1, max_queue_size=1, max_queue_wait=0)
+        async with service:
+            running = asyncio.create_task(service.predict('CCO'))
+            await asyncio.sleep(0.1)
+            queued = asyncio.create_task(service.predict('CCN'))
+            await asyncio.sleep(0.01)
+            with pytest.raises(ServiceOverloadedError):
+                await service.predict('CCC')
+            await asyncio.gather(running, queued)
+            return service.stats()
+    
+    assert asyncio.run(run())['rejected'] == 1
+
+def test_predict_rows_skips_non_finite_rows(trained_model):
+    values = np.array([[46.07, -0.0014, 20.23, 1.0], [np.nan, 1.0, 2.0, 0.0], [78.1, 1.69, 0.0, 0.0],
+                       [np.inf, 0.0, 0.0, 0.0]])
+    errors = np.array([None, None, None, 'Invalid SMILES: x'], dtype=object)
+    results = _predict_rows(trained_model, ['CCO', 'bad', 'c1ccccc1', 'x'], values, errors, False)
+    
+    expected = trained_model.predict(values[[0, 2]])
+    assert [result['prediction'] for result in results[::2]] == pytest.approx(expected.tolist())
+    assert results[1]['prediction'] is None and results[1]['error'] == "Non-finite descriptor values"
+    assert results[3]['error'] == 'Invalid SMILES: x'
+
+def test_service_requires_feature_names():
+    with pytest.raises(ValueError):
+        PredictionService(object())
+    with pytest.raises(ValueError):
+        PredictionService(object(), features=FEATURES, executor='gpu')
@@ -0,0 +1,82 @@
+"""
+Tests for the fingerprint similarity index against brute-force Tanimoto
+"""
+
+import numpy as np
+import pytest
+from rdkit import Chem, DataStructs
+from rdkit.Chem import rdFingerprintGenerator
+
+from qsar_core import similarity_index
+from qsar_core.similarity_index import SimilarityIndex, build_similarity_index, load_similarity_index
+
+def _random_packed(n_rows, n_bits, seed):
+    rng = np.random.default_rng(seed)
+    densities = rng.uniform(0.01, 0.3, size=(n_rows, 1))
+    return np.packbits(rng.random((n_rows, n_bits)) < densities, axis=1)
+
+def _brute_force(packed, query):
+    bits = np.unpackbits(packed, axis=1).astype(bool)
+    query = np.unpackbits(query).astype(bool)
+    common = (bits & query).sum(axis=1)
+    union = (bits | query).sum(axis=1)
+    return np.divide(common, union, out=np.zeros(len(bits)), where=union > 0)
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Force many scan blocks and threaded scans on a small library
+    monkeypatch.setattr(similarity_index, 'SCAN_BLOCK_ROWS', 37)
+    monkeypatch.setattr(similarity_index, 'PARALLEL_MIN_ROWS', 50)
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_top_k_and_threshold_match_brute_force(small_blocks, n_jobs):
+    packed = _random_packed(1500, 256, seed=0)
+    packed[:3] = 0
+    index = SimilarityIndex.from_packed(packed, n_bits=256, n_jobs=n_jobs)
+    queries = [packed[10], packed[700], _random_packed(1, 256, seed=1)[0], np.zeros(32, dtype=np.uint8)]
+    
+    for query in queries:
+        expected = _brute_force(packed, query)
+        for k, threshold in [(1, 0.0), (10, 0.0), (25, 0.3), (len(packed) + 5, 0.0)]:
+            indices, similarities = index.search(query, k=k, threshold=threshold)
+            reference = np.sort(expected[expected >= threshold])[::-1][:k]
+            np.testing.assert_allclose(similarities, reference)
+            np.testing.assert_allclose(expected[indices], similarities)
+        
+        for threshold in (0.2, 0.5, 1.0):
+            indices, similarities = index.search(query, k=None, threshold=threshold)
+            assert sorted(indices.tolist()) == np.flatnonzero(expected >= threshold).tolist()
+            np.testing.assert_allclose(expected[indices], similarities)
+            assert np.all(np.diff(similarities) <= 0)
+    index.close()
+
+def test_morgan_index_matches_rdkit_tanimoto(smiles_list, tmp_path):
+    library = smiles_list + ['not a smiles']
+    index, errors = SimilarityIndex.build(library)
+    assert errors[-1] is not None and len(index) == len(smiles_list)
+    
+    generator = rdFingerprintGenerator.GetMorganGenerator(radius=2, fpSize=2048)
+    fingerprints = [generator.GetFingerprint(Chem.MolFromSmiles(smiles)) for smiles in smiles_list]
+    query = 'CC(=O)Oc1ccccc1C(=O)N'
+    expected = np.array(DataStructs.BulkTanimotoSimilarity(generator.GetFingerprint(Chem.MolFromSmiles(query)),
+                                                           fingerprints))
+    
+    indices, similarities = index.search(query, k=5)
+    np.testing.assert_allclose(similarities, np.sort(expected)[::-1][:5])
+    np.testing.assert_allclose(expected[indices], similarities)
+    assert index.ids[indices[0]] == 'CC(=O)Oc1ccccc1C(=O)O'
+    
+    path = str(tmp_path / 'library.npz')
+    build_similarity_index(library, filepath=path)
+    loaded = load_similarity_index(path)
+    assert isinstance(loaded.fingerprints, np.memmap)
+    loaded_indices, loaded_similarities = loaded.search(query, k=5)
+    np.testing.assert_array_equal(loaded_indices, indices)
+    np.testing.assert_array_equal(loaded_similarities, similarities)
+
+def test_invalid_queries():
+    index = SimilarityIndex.from_packed(_random_packed(20, 64, seed=2), n_bits=64)
+    with pytest.raises(ValueError):
+        index.search('not a smiles')
+    (indices, similarities), = index.search_many(['not a smiles'])
+    assert len(indices) == 0 and len(similarities) == 0
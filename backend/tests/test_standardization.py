@@ -0,0 +1,62 @@
+"""
+Tests for structure standardization and duplicate collapsing
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from qsar_core.enhanced_descriptors import EnhancedDescriptors
+from qsar_core.standardization import Standardizer
+
+PYRIDONE_TAUTOMERS = ['Oc1ccccn1', 'O=c1cccc[nH]1']
+
+def test_salt_forms_collapse_to_parent():
+    unique, inverse, errors = Standardizer().deduplicate(['CC(=O)O', 'CC(=O)[O-].[Na+]', 'CC(=O)O.O'])
+    assert unique == ['CC(=O)O']
+    assert inverse.tolist() == [0, 0, 0]
+    assert all(error is None for error in errors)
+
+def test_salt_removal_and_neutralization_are_optional():
+    # The uncharger leaves charge-balanced salts alone
+    assert Standardizer(remove_salts=False).standardize('CC(=O)[O-].[Na+]')[0] == 'CC(=O)[O-].[Na+]'
+    assert Standardizer(neutralize=False).standardize('CC(=O)[O-].[Na+]')[0] == 'CC(=O)[O-]'
+    assert Standardizer().standardize('C[NH3+].[Cl-]')[0] == 'CN'
+
+def test_settings_survive_pickling():
+    standardizer = pickle.loads(pickle.dumps(Standardizer(neutralize=False, canonicalize_tautomers=True)))
+    assert (standardizer.neutralize, standardizer.canonicalize_tautomers, standardizer.key) == (False, True, 'inchikey')
+    assert standardizer.standardize(PYRIDONE_TAUTOMERS[0]) == standardizer.standardize(PYRIDONE_TAUTOMERS[1])
+    with pytest.raises(ValueError):
+        Standardizer(key='formula')
+
+def test_invalid_smiles_are_reported():
+    unique, inverse, errors = Standardizer().deduplicate(['CCO', 'not a smiles'])
+    assert unique == ['CCO']
+    assert inverse.tolist() == [0, -1]
+    assert errors[1] is not None
+
+def test_tautomers_stay_distinct_by_default():
+    for key in (None, 'smiles', 'inchikey'):
+        unique, inverse, _ = Standardizer(key=key).deduplicate(PYRIDONE_TAUTOMERS)
+        assert len(unique) == 2 and inverse.tolist() == [0, 1]
+
+def test_canonical_tautomers_collapse():
+    unique, inverse, _ = Standardizer(canonicalize_tautomers=True).deduplicate(PYRIDONE_TAUTOMERS)
+    assert len(unique) == 1 and inverse.tolist() == [0, 0]
+
+def test_deduplicated_descriptors_match_plain_calculation():
+    features = ['TPSA', 'fr_Ar_OH', 'MolWt']
+    plain, _ = EnhancedDescriptors().calculate_batch(PYRIDONE_TAUTOMERS, False, features=features)
+    standardized, _ = EnhancedDescriptors(standardizer=Standardizer()).calculate_batch(
+        PYRIDONE_TAUTOMERS, False, features=features)
+    np.testing.assert_array_equal(standardized, plain)
+    assert plain[0, 1] != plain[1, 1]
+
+def test_parallel_deduplicate_matches_serial(smiles_list):
+    smiles_list = smiles_list * 40
+    serial = Standardizer().deduplicate(smiles_list)
+    parallel = Standardizer().deduplicate(smiles_list, n_jobs=2)
+    assert serial[0] == parallel[0]
+    np.testing.assert_array_equal(serial[1], parallel[1])
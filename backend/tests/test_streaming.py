@@ -0,0 +1,87 @@
+"""
+Tests for shard streaming and out-of-core training
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from qsar_core.enhanced_modeling import EnhancedQSARModel
+from qsar_core.streaming import ShardDataset, list_shards, save_npz_shards
+
+def _collect(dataset, **kwargs):
+    chunks = list(dataset.iter_chunks(**kwargs))
+    return np.vstack([X for X, _ in chunks]), np.concatenate([y for _, y in chunks])
+
+def test_npz_shards_stream_all_rows_in_order(tmp_path, regression_data):
+    X, y = regression_data
+    paths = save_npz_shards(X, y, str(tmp_path), shard_rows=50)
+    assert len(paths) == 3 and list_shards(str(tmp_path)) == paths
+    
+    dataset = ShardDataset(str(tmp_path), chunk_rows=16)
+    assert all(len(y_chunk) <= 16 for _, y_chunk in dataset)
+    X_streamed, y_streamed = _collect(dataset)
+    assert X_streamed.dtype == np.float32
+    np.testing.assert_array_equal(X_streamed, X.astype(np.float32))
+    np.testing.assert_array_equal(y_streamed, y)
+    
+    # Shuffling permutes rows but keeps them paired with their targets
+    X_shuffled, y_shuffled = _collect(dataset, shuffle=True, random_state=0)
+    order = np.argsort(y_shuffled)
+    np.testing.assert_array_equal(X_shuffled[order], X_streamed[np.argsort(y_streamed)])
+
+def test_npy_and_parquet_shards(tmp_path, regression_data):
+    X, y = regression_data
+    np.save(str(tmp_path / 'part.npy'), X)
+    np.save(str(tmp_path / 'part_y.npy'), y)
+    X_streamed, y_streamed = _collect(ShardDataset(str(tmp_path / 'part.npy'), dtype=np.float64))
+    np.testing.assert_array_equal(X_streamed, X)
+    np.testing.assert_array_equal(y_streamed, y)
+    
+    pytest.importorskip('pyarrow')
+    frame = pd.DataFrame(X, columns=[f'd{i}' for i in range(X.shape[1])]).assign(target=y)
+    frame.to_parquet(str(tmp_path / 'part.parquet'))
+    dataset = ShardDataset(str(tmp_path / 'part.parquet'), chunk_rows=32, dtype=np.float64)
+    assert dataset.feature_names == [f'd{i}' for i in range(X.shape[1])]
+    X_streamed, y_streamed = _collect(dataset)
+    np.testing.assert_array_equal(X_streamed, X)
+    np.testing.assert_array_equal(y_streamed, y)
+
+def test_mismatched_shard_targets_raise(tmp_path, regression_data):
+    X, y = regression_data
+    np.savez(str(tmp_path / 'bad.npz'), X=X, y=y[:-1])
+    with pytest.raises(ValueError):
+        _collect(ShardDataset(str(tmp_path / 'bad.npz')))
+    with pytest.raises(ValueError):
+        ShardDataset(str(tmp_path / 'missing_*.npz'))
+
+def test_streaming_regression_matches_in_memory_scaling(tmp_path, regression_data):
+    X, y = regression_data
+    save_npz_shards(X[:100], y[:100], str(tmp_path / 'train'), shard_rows=40)
+    save_npz_shards(X[100:], y[100:], str(tmp_path / 'valid'), shard_rows=40)
+    
+    model = EnhancedQSARModel('sgd', 'regression')
+    result = model.train_streaming(str(tmp_path / 'train'), epochs=20,
+                                   validation_data=str(tmp_path / 'valid'))
+    assert result['n_samples'] == 100
+    assert model.training_history['streaming']['n_shards'] == 3
+    assert result['validation_scores'][-1]['r2'] > 0.9
+    
+    reference = StandardScaler().fit(X[:100].astype(np.float32))
+    np.testing.assert_allclose(model.scaler.mean_, reference.mean_, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(model.scaler.scale_, reference.scale_, rtol=1e-5)
+
+def test_streaming_classification_collects_classes(tmp_path, classification_data):
+    X, y = classification_data
+    save_npz_shards(X, y, str(tmp_path), shard_rows=30)
+    model = EnhancedQSARModel('sgd', 'classification')
+    result = model.train_streaming(str(tmp_path), epochs=10, validation_data=str(tmp_path))
+    np.testing.assert_array_equal(model.model.classes_, [0, 1])
+    assert result['validation_scores'][-1]['accuracy'] > 0.8
+
+def test_streaming_requires_partial_fit(tmp_path, regression_data):
+    X, y = regression_data
+    save_npz_shards(X, y, str(tmp_path))
+    with pytest.raises(ValueError):
+        EnhancedQSARModel('random_forest', 'regression').train_streaming(str(tmp_path))
@@ -0,0 +1,66 @@
+"""
+Tests for structural alert screening against brute-force substructure matching
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+from rdkit import Chem
+
+from qsar_core.structural_alerts import (DEFAULT_ALERTS, AlertScreener, load_alert_library,
+                                         screen_structural_alerts)
+
+ALERT_SMILES = [
+    'C1CO1', 'ClCCN(CCCl)C', 'O=CC=C', 'CN(C)N=O', 'c1ccc2cc3ccccc3cc2c1', 'O=C1C=CC(=O)C=C1',
+    'CC(=O)CBr', 'CCOS(=O)(=O)C', 'c1ccccc1N=Nc1ccccc1', 'CN=C=O', 'OO', 'Nc1ccccc1NO'
+]
+
+def _brute_force(smiles_list, alerts):
+    patterns = [Chem.MolFromSmarts(alert[1]) for alert in alerts]
+    return np.array([[Chem.MolFromSmiles(smiles).HasSubstructMatch(pattern) for pattern in patterns]
+                     for smiles in smiles_list])
+
+@pytest.mark.parametrize('use_fingerprint', [None, True, False])
+def test_hits_match_brute_force(smiles_list, use_fingerprint):
+    library = smiles_list + ALERT_SMILES
+    expected = _brute_force(library, DEFAULT_ALERTS)
+    screener = AlertScreener(use_fingerprint=use_fingerprint)
+    
+    hits, errors = screener.screen(library)
+    np.testing.assert_array_equal(hits.toarray().astype(bool), expected)
+    assert all(error is None for error in errors)
+    for smiles, row in zip(library, expected):
+        np.testing.assert_array_equal(screener.screen_molecule(smiles), row)
+    assert expected[len(smiles_list):].any(axis=1).all()
+
+def test_parallel_screen_matches_serial(smiles_list):
+    library = (smiles_list + ALERT_SMILES + ['not a smiles']) * 10
+    screener = AlertScreener()
+    serial_hits, serial_errors = screener.screen(library)
+    parallel_hits, parallel_errors = screener.screen(library, n_jobs=2, chunk_size=16)
+    
+    assert (serial_hits != parallel_hits).nnz == 0
+    assert [error is None for error in parallel_errors] == [error is None for error in serial_errors]
+    assert serial_errors[len(smiles_list) + len(ALERT_SMILES)] is not None
+    assert serial_hits[len(smiles_list) + len(ALERT_SMILES)].nnz == 0
+
+def test_custom_library_pickling_and_summary(tmp_path):
+    path = str(tmp_path / 'alerts.csv')
+    with open(path, 'w') as f:
+        f.write('name,smarts,description\nepoxide,C1OC1,Epoxide\n#skipped,C,\nphenol,c[OH],\n')
+    alerts = load_alert_library(path)
+    assert alerts == [('epoxide', 'C1OC1', 'Epoxide'), ('phenol', 'c[OH]', '')]
+    
+    screener = pickle.loads(pickle.dumps(AlertScreener(alerts, use_fingerprint=True)))
+    assert screener.names == ['epoxide', 'phenol'] and screener.use_fingerprint is True
+    hits, _ = screener.screen(['C1CO1', 'c1ccccc1O', 'CCO'])
+    assert screener.summarize(hits) == {'epoxide': 1, 'phenol': 1}
+    
+    assert screen_structural_alerts('O=[N+]([O-])c1ccc(N)cc1') == [
+        {'name': 'aromatic_nitro', 'description': 'Aromatic nitro group'},
+        {'name': 'aromatic_amine', 'description': 'Primary or secondary aromatic amine'}]
+    with open(path, 'w') as f:
+        f.write('label,pattern\nx,C\n')
+    with pytest.raises(ValueError):
+        load_alert_library(path)
@@ -0,0 +1,62 @@
+"""
+Tests for per-prediction uncertainty and conformal intervals
+"""
+
+import numpy as np
+import pytest
+
+from qsar_core.enhanced_modeling import EnhancedQSARModel
+
+def _train(model_type, task_type, X, y):
+    model = EnhancedQSARModel(model_type, task_type)
+    X_train, _, y_train, _ = model.prepare_data(X, y, test_size=0.25)
+    model.train(X_train, y_train, feature_selection=False, hyperparameter_tuning=False, cv=3, n_jobs=1,
+                applicability_domain=False)
+    return model
+
+def test_forest_spread_matches_per_tree_predictions(regression_data):
+    X, y = regression_data
+    model = _train('random_forest', 'regression', X, y)
+    quantiles = (0.05, 0.5, 0.95)
+    result = model.predict_uncertainty(X, quantiles=quantiles, batch_size=7)
+    
+    tree_values = np.stack([tree.predict(model.scaler.transform(X)) for tree in model.model.estimators_], axis=1)
+    np.testing.assert_allclose(result['mean'], model.predict(X), rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(result['std'], tree_values.std(axis=1), rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(result['quantiles'], np.quantile(tree_values, quantiles, axis=1).T,
+                               rtol=1e-6, atol=1e-9)
+    assert result['quantiles'].shape == (len(X), len(quantiles))
+    
+    radius = model.conformal_radius(0.1)
+    np.testing.assert_allclose(result['lower'], result['mean'] - radius)
+    np.testing.assert_allclose(result['upper'], result['mean'] + radius)
+
+def test_conformal_intervals_cover_new_rows(regression_data):
+    X, y = regression_data
+    model = _train('ridge', 'regression', X, y)
+    result = model.predict_uncertainty(X[:5])
+    assert set(result) == {'mean', 'lower', 'upper'}
+    np.testing.assert_array_equal(result['mean'], model.predict(X[:5]))
+    
+    # Fresh rows from the regression_data generator
+    rng = np.random.default_rng(5)
+    X_new = rng.normal(size=(2000, 8))
+    y_new = 2.0 * X_new[:, 0] - X_new[:, 1] + 0.1 * rng.normal(size=2000)
+    for alpha in (0.1, 0.3):
+        interval = model.predict_uncertainty(X_new, alpha=alpha)
+        covered = np.mean((y_new >= interval['lower']) & (y_new <= interval['upper']))
+        assert covered >= 1 - alpha - 0.05
+    
+    radii = [model.conformal_radius(alpha) for alpha in (0.5, 0.2, 0.1, 0.05)]
+    assert radii == sorted(radii)
+    assert model.conformal_radius(0.001) == np.inf
+    assert set(model.predict_uncertainty(X[:5], alpha=None)) == {'mean'}
+
+def test_uncertainty_requires_trained_regression_model(classification_data):
+    X, y = classification_data
+    with pytest.raises(ValueError):
+        _train('random_forest', 'classification', X, y).predict_uncertainty(X)
+    with pytest.raises(ValueError):
+        EnhancedQSARModel('random_forest', 'regression').predict_uncertainty(X)
+    with pytest.raises(ValueError):
+        EnhancedQSARModel('ridge', 'regression').conformal_radius()